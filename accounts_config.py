@@ -16,7 +16,7 @@ ACCOUNTS = [
         password=os.getenv("PASSWORD", ""),
         server=os.getenv("SERVER", "Deriv-Server"),
         name="Compte Principal",
-        risk_multiplier=1.0,
+        risk_multiplier=1.0,   # × RISK_PER_TRADE du solde de ce compte
         enabled=True
     ),
     
@@ -9,9 +9,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from pymongo import MongoClient
 from accounts_config import ACCOUNTS
+from config import DB_NAME, COLLECTION_NAME, STORAGE_SCHEMA
+from database import safe_symbol, trades_query
 
 load_dotenv()
 
@@ -40,6 +44,19 @@ st.markdown("""
 
 # ── Connexion MongoDB ──────────────────────────────────────────
 
+# Nombre maximum de lignes transférées pour le tableau détaillé
+TABLE_LIMIT = 500
+
+# Relecture incrémentale : fenêtre de recouvrement sous le dernier updated_at vu
+# (écritures concurrentes validées dans le désordre, horloges serveur)
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+DISPLAY_COLS = [
+    "ticket", "market", "type", "open_time", "open_price",
+    "close_time", "close_price", "profit", "status"
+]
+
+
 @st.cache_resource
 def get_mongo_client():
     uri = os.getenv("MONGODB_URI")
@@ -50,34 +67,386 @@ def get_account_db(client, account_number: int):
     return client[f"trading_bot_{account_number}"]
 
 
-def load_data(client, account_number: int, market_filter: str = "Tous") -> pd.DataFrame:
-    db          = get_account_db(client, account_number)
-    collections = db.list_collection_names()
-    all_trades  = []
-
-    for col_name in collections:
-        if market_filter != "Tous" and col_name != market_filter:
-            continue
-        trades = list(db[col_name].find().sort("open_time", -1))
-        for t in trades:
-            t["market"] = col_name
-            all_trades.append(t)
-
-    if not all_trades:
-        return pd.DataFrame()
-
-    df = pd.DataFrame(all_trades)
-
+def get_trades_collection(client):
+    return client[DB_NAME][COLLECTION_NAME]
+
+
+def list_markets(client, account_number: int) -> list:
+    if STORAGE_SCHEMA == "UNIFIED":
+        symbols = get_trades_collection(client).distinct("symbol", {"account": account_number})
+        return sorted(safe_symbol(s) for s in symbols if s)
+    return sorted(get_account_db(client, account_number).list_collection_names())
+
+
+# ── Requêtes côté serveur ──────────────────────────────────────
+
+def period_bounds(periode: str, now: datetime) -> tuple:
+    """Retourne (début, fin) de la période ; None = borne ouverte."""
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if periode == "Aujourd'hui":
+        return midnight, None
+    if periode == "Hier":
+        return midnight - timedelta(days=1), midnight
+    if periode == "Cette Semaine":
+        return midnight - timedelta(days=now.weekday()), None
+    if periode == "Ce Mois":
+        return midnight.replace(day=1), None
+    if periode == "Cette Année":
+        return midnight.replace(month=1, day=1), None
+    return None, None
+
+
+def _time_match(start, end) -> dict:
+    window = {}
+    if start is not None:
+        window["$gte"] = start
+    if end is not None:
+        window["$lt"] = end
+    return {"open_time": window} if window else {}
+
+
+def trades_source(client, account_number: int, market_filter: str,
+                  start=None, end=None) -> tuple:
+    """
+    Retourne (collection, étapes) : l'agrégation collection.aggregate(étapes + ...)
+    produit les trades du compte filtrés par marché et période, avec un champ 'market'.
+    Le filtre de période est appliqué dans MongoDB, avant tout transfert.
+    """
+    if STORAGE_SCHEMA == "UNIFIED":
+        col   = get_trades_collection(client)
+        query = trades_query(account_number, start=start, end=end)
+        if market_filter != "Tous":
+            symbols = col.distinct("symbol", {"account": account_number})
+            query["symbol"] = {"$in": [s for s in symbols if safe_symbol(s) == market_filter]}
+        market = {"$replaceAll": {"input": {"$toLower": "$symbol"}, "find": " ", "replacement": "_"}}
+        return col, [{"$match": query}, {"$addFields": {"market": market}}]
+
+    # Schéma PER_SYMBOL : une collection par marché, réunies par $unionWith
+    db    = get_account_db(client, account_number)
+    names = [n for n in list_markets(client, account_number)
+             if market_filter == "Tous" or n == market_filter]
+    if not names:
+        return None, []
+
+    match = _time_match(start, end)
+
+    def stages(name):
+        return [{"$match": match}, {"$addFields": {"market": name}}]
+
+    pipeline = stages(names[0])
+    for name in names[1:]:
+        pipeline.append({"$unionWith": {"coll": name, "pipeline": stages(name)}})
+    return db[names[0]], pipeline
+
+
+def _frame(docs: list) -> pd.DataFrame:
+    df = pd.DataFrame(docs)
+    if df.empty:
+        return df
     if "open_time"  in df.columns:
         df["open_time"]  = pd.to_datetime(df["open_time"])
     if "close_time" in df.columns:
         df["close_time"] = pd.to_datetime(df["close_time"])
     if "profit"     in df.columns:
         df["profit"]     = pd.to_numeric(df["profit"], errors="coerce").fillna(0.0)
-
     return df
 
 
+def equity_unit(periode: str) -> str:
+    """Granularité des points de la courbe d'équité selon la période affichée."""
+    return "minute" if periode in ("Aujourd'hui", "Hier") else "hour" if periode == "Cette Semaine" else "day"
+
+
+def load_dashboard(client, account_number: int, market_filter: str,
+                   start=None, end=None, unit: str = "day") -> dict | None:
+    """
+    Une seule agrégation $facet : KPIs, courbe d'équité agrégée par intervalle,
+    histogramme des P&L et répartition par marché. Seules quelques centaines
+    de lignes sont transférées, quelle que soit la taille de l'historique.
+    """
+    col, source = trades_source(client, account_number, market_filter, start, end)
+    if col is None:
+        return None
+
+    profit = {"$ifNull": ["$profit", 0]}
+    closed = {"$eq": ["$status", "CLOSED"]}
+    pipeline = source + [
+        {"$project": {c: 1 for c in DISPLAY_COLS if c != "profit"} | {"_id": 0, "profit": profit}},
+        {"$facet": {
+            "kpis": [{"$group": {
+                "_id":        None,
+                "trades":     {"$sum": 1},
+                "closed":     {"$sum": {"$cond": [closed, 1, 0]}},
+                "open":       {"$sum": {"$cond": [{"$eq": ["$status", "OPEN"]}, 1, 0]}},
+                "wins":       {"$sum": {"$cond": [{"$and": [closed, {"$gt": ["$profit", 0]}]}, 1, 0]}},
+                "losses":     {"$sum": {"$cond": [{"$and": [closed, {"$lt": ["$profit", 0]}]}, 1, 0]}},
+                "sum_win":    {"$sum": {"$cond": [{"$and": [closed, {"$gt": ["$profit", 0]}]}, "$profit", 0]}},
+                "sum_loss":   {"$sum": {"$cond": [{"$and": [closed, {"$lt": ["$profit", 0]}]}, "$profit", 0]}},
+                "net":        {"$sum": {"$cond": [closed, "$profit", 0]}},
+            }}],
+            "equity": [
+                {"$match": {"status": "CLOSED", "close_time": {"$ne": None}}},
+                {"$group": {
+                    "_id":    {"$dateTrunc": {"date": "$close_time", "unit": unit}},
+                    "profit": {"$sum": "$profit"},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+            "histogram": [
+                {"$match": {"status": "CLOSED"}},
+                {"$bucketAuto": {"groupBy": "$profit", "buckets": 20}},
+            ],
+            "markets": [{"$group": {"_id": "$market", "count": {"$sum": 1}}}],
+        }},
+    ]
+    result = next(col.aggregate(pipeline, allowDiskUse=True), None)
+    if not result or not result["kpis"]:
+        return None
+
+    k = result["kpis"][0]
+    avg_win  = k["sum_win"] / k["wins"]     if k["wins"]   else 0
+    avg_loss = k["sum_loss"] / k["losses"]  if k["losses"] else 0
+    kpis = {
+        "trades":        k["trades"],
+        "closed":        k["closed"],
+        "open":          k["open"],
+        "win_rate":      (k["wins"] / k["closed"] * 100) if k["closed"] else 0,
+        "net":           k["net"],
+        "profit_factor": abs(avg_win / avg_loss) if avg_loss != 0 else float("inf"),
+    }
+
+    equity = pd.DataFrame(
+        [{"close_time": e["_id"], "profit": e["profit"]} for e in result["equity"]]
+    )
+    if not equity.empty:
+        equity["cum_profit"] = equity["profit"].cumsum()
+
+    histogram = pd.DataFrame([
+        {"profit": (b["_id"]["min"] + b["_id"]["max"]) / 2, "count": b["count"]}
+        for b in result["histogram"]
+    ])
+    markets = pd.DataFrame(
+        [{"market": m["_id"], "count": m["count"]} for m in result["markets"]]
+    )
+
+    return {
+        "kpis":      kpis,
+        "equity":    equity,
+        "histogram": histogram,
+        "markets":   markets,
+    }
+
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def load_dashboard_cached(_client, account_number: int, market_filter: str,
+                          start, end, unit: str, version: int) -> dict | None:
+    """
+    Agrégation mémorisée par version du cache incrémental : tant qu'aucun trade
+    n'a changé, les refresh ne relancent pas l'agrégation.
+    """
+    return load_dashboard(_client, account_number, market_filter, start, end, unit)
+
+
+# ── Cache incrémental ──────────────────────────────────────────
+
+class TradeCache:
+    """
+    DataFrame des trades d'un compte conservé en mémoire entre les refresh.
+    Chaque refresh ne récupère que les documents insérés ou modifiés depuis
+    le dernier passage (champ 'updated_at' posé par le serveur à l'écriture,
+    index dédié) ; les positions fermées entre-temps sont mises à jour sur
+    place (clé : ticket). Chaque lecture recouvre REFRESH_OVERLAP sous le
+    dernier updated_at vu ; les documents déjà intégrés sont écartés.
+    """
+
+    def __init__(self, account_number: int):
+        self.account_number = account_number
+        self.df             = pd.DataFrame(columns=DISPLAY_COLS).set_index("ticket", drop=False)
+        self.version        = 0
+        self._last_seen     = None    # max(updated_at) déjà intégré
+        self._seen_recent   = {}      # ticket → updated_at intégré, dans la fenêtre de recouvrement
+        self._lock          = threading.Lock()
+
+    def refresh(self, client) -> bool:
+        """Intègre les changements depuis le dernier appel. Retourne True si modifié."""
+        with self._lock:
+            col, source = trades_source(client, self.account_number, "Tous")
+            if col is None:
+                return False
+
+            # Premier chargement : tout l'historique (y compris les documents
+            # antérieurs au champ updated_at) ; ensuite uniquement le delta.
+            delta = {} if self._last_seen is None else \
+                {"updated_at": {"$gte": self._last_seen - REFRESH_OVERLAP}}
+            pipeline = source + [
+                {"$match": delta},
+                {"$project": {c: 1 for c in DISPLAY_COLS} | {"_id": 0, "updated_at": 1}},
+            ]
+            docs = [
+                d for d in col.aggregate(pipeline, allowDiskUse=True)
+                if d.get("updated_at") is None
+                or self._seen_recent.get(d["ticket"]) != d["updated_at"]
+            ]
+            if self._last_seen is None:
+                self._last_seen = datetime(1970, 1, 1)
+            if not docs:
+                return False
+
+            stamps = [d["updated_at"] for d in docs if d.get("updated_at")]
+            if stamps:
+                self._last_seen = max(self._last_seen, max(stamps))
+                self._seen_recent.update({d["ticket"]: d["updated_at"]
+                                          for d in docs if d.get("updated_at")})
+                horizon = self._last_seen - REFRESH_OVERLAP
+                self._seen_recent = {t: u for t, u in self._seen_recent.items() if u >= horizon}
+
+            new      = _frame(docs).drop(columns=["updated_at"], errors="ignore")
+            new      = new.set_index("ticket", drop=False)
+            existing = new.index.intersection(self.df.index)
+            if len(existing):
+                self.df.loc[existing, new.columns] = new.loc[existing]
+            added = new.loc[new.index.difference(self.df.index)]
+            if not added.empty:
+                self.df = added if self.df.empty else pd.concat([self.df, added])
+            self.version += 1
+            return True
+
+    def view(self, market_filter: str = "Tous", start=None, end=None) -> pd.DataFrame:
+        """Trades filtrés par marché et période (aucun accès base)."""
+        df   = self.df
+        mask = pd.Series(True, index=df.index)
+        if market_filter != "Tous":
+            mask &= df["market"] == market_filter
+        if start is not None:
+            mask &= df["open_time"] >= start
+        if end is not None:
+            mask &= df["open_time"] < end
+        return df[mask]
+
+
+@st.cache_resource
+def get_trade_cache(account_number: int) -> TradeCache:
+    return TradeCache(account_number)
+
+
+# ── Vue portefeuille (tous les comptes) ────────────────────────
+
+PORTFOLIO_LABEL = "🌐 Tous les comptes"
+
+
+def refresh_all_caches(client, account_numbers: list) -> list:
+    """Rafraîchit les caches de tous les comptes en parallèle (I/O MongoDB)."""
+    caches = [get_trade_cache(n) for n in account_numbers]
+    with ThreadPoolExecutor(max_workers=min(8, max(1, len(caches)))) as pool:
+        list(pool.map(lambda c: c.refresh(client), caches))
+    return caches
+
+
+def portfolio_stats(closed: pd.DataFrame) -> tuple:
+    """
+    KPIs et courbes du portefeuille en une passe vectorisée.
+    closed : trades fermés de tous les comptes (colonnes account, close_time, profit).
+    Returns: (kpis_par_compte, courbes) — courbes contient une série par compte
+             et une série 'Portefeuille' (profit cumulé + drawdown).
+    """
+    closed = closed.sort_values("close_time", kind="stable")
+    by_acc = closed.groupby("account", sort=False)["profit"]
+
+    curves = closed[["account", "close_time", "profit"]].copy()
+    curves["cum_profit"] = by_acc.cumsum()
+    curves["drawdown"]   = curves["cum_profit"] - curves.groupby("account")["cum_profit"].cummax().clip(lower=0)
+
+    combined = closed[["close_time", "profit"]].copy()
+    combined["account"]    = "Portefeuille"
+    combined["cum_profit"] = combined["profit"].cumsum()
+    combined["drawdown"]   = combined["cum_profit"] - combined["cum_profit"].cummax().clip(lower=0)
+    max_dd = curves.groupby("account")["drawdown"].min()
+    curves = pd.concat([curves.assign(account=curves["account"].astype(str)), combined])
+
+    win  = closed["profit"].where(closed["profit"] > 0)
+    loss = closed["profit"].where(closed["profit"] < 0)
+    agg  = pd.DataFrame({
+        "trades":   by_acc.size(),
+        "wins":     win.groupby(closed["account"]).count(),
+        "avg_win":  win.groupby(closed["account"]).mean(),
+        "avg_loss": loss.groupby(closed["account"]).mean(),
+        "net":      by_acc.sum(),
+        "max_dd":   max_dd,
+    })
+    total = pd.DataFrame({
+        "trades":   [len(closed)],
+        "wins":     [win.count()],
+        "avg_win":  [win.mean()],
+        "avg_loss": [loss.mean()],
+        "net":      [closed["profit"].sum()],
+        "max_dd":   [combined["drawdown"].min()],
+    }, index=["Portefeuille"])
+    kpis = pd.concat([agg.rename(index=str), total])
+    kpis["win_rate"]      = kpis["wins"] / kpis["trades"] * 100
+    kpis["profit_factor"] = (kpis["avg_win"] / kpis["avg_loss"]).abs().fillna(0)
+    kpis.loc[kpis["avg_loss"].isna() & (kpis["wins"] > 0), "profit_factor"] = float("inf")
+    return kpis, curves
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def load_portfolio_cached(_caches: list, start, end, versions: tuple) -> tuple | None:
+    """Agrégats du portefeuille, recalculés uniquement quand un cache a changé."""
+    frames = [
+        c.view("Tous", start, end).assign(account=c.account_number)
+        for c in _caches
+    ]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return None
+    df     = pd.concat(frames, ignore_index=True)
+    closed = df[(df["status"] == "CLOSED") & df["close_time"].notna()]
+    if closed.empty:
+        return None
+    kpis, curves = portfolio_stats(closed)
+    kpis["open"] = df[df["status"] == "OPEN"].groupby("account").size().rename(index=str)
+    kpis.loc["Portefeuille", "open"] = (df["status"] == "OPEN").sum()
+    kpis["open"] = kpis["open"].fillna(0).astype(int)
+    return kpis, curves
+
+
+def render_portfolio(client, periode: str):
+    caches     = refresh_all_caches(client, [a.account_number for a in ACCOUNTS])
+    start, end = period_bounds(periode, datetime.now())
+    result     = load_portfolio_cached(caches, start, end,
+                                       tuple(c.version for c in caches))
+    if result is None:
+        st.info(f"Aucun trade fermé pour la période : {periode}")
+        return
+    kpis, curves = result
+    names = {str(a.account_number): f"{a.name} ({a.account_number})" for a in ACCOUNTS}
+
+    total = kpis.loc["Portefeuille"]
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    col1.metric("Trades fermés",      int(total["trades"]))
+    col2.metric("Positions ouvertes", int(total["open"]))
+    col3.metric("Win Rate",           f"{total['win_rate']:.1f}%")
+    col4.metric("Profit Net",         f"{total['net']:+.2f} $")
+    col5.metric("Profit Factor",      f"{total['profit_factor']:.2f}")
+    col6.metric("Drawdown max",       f"{total['max_dd']:.2f} $")
+
+    curves = curves.assign(account=curves["account"].map(lambda a: names.get(a, a)))
+    fig_eq = px.line(curves, x="close_time", y="cum_profit", color="account",
+                     title="Profits Cumulés par Compte")
+    fig_eq.update_layout(xaxis_title="Date", yaxis_title="Profit cumulé ($)")
+    st.plotly_chart(fig_eq, use_container_width=True)
+
+    fig_dd = px.area(curves[curves["account"] == "Portefeuille"],
+                     x="close_time", y="drawdown", title="Drawdown du Portefeuille",
+                     color_discrete_sequence=["#EF553B"])
+    st.plotly_chart(fig_dd, use_container_width=True)
+
+    st.subheader("Comparatif des Comptes")
+    table = kpis.rename(index=lambda a: names.get(a, a))[
+        ["trades", "open", "win_rate", "net", "profit_factor", "max_dd"]
+    ]
+    st.dataframe(table.round(2), use_container_width=True)
+
+
 # ── Sidebar ────────────────────────────────────────────────────
 
 with st.sidebar:
@@ -85,14 +454,16 @@ with st.sidebar:
     st.caption("Stratégie : EMA 20/50 | 2% risque | R:R 1:2")
 
     account_options        = {f"{a.name} ({a.account_number})": a.account_number for a in ACCOUNTS}
+    if len(ACCOUNTS) > 1:
+        account_options = {PORTFOLIO_LABEL: None} | account_options
     selected_account_name  = st.selectbox("👤 Compte", list(account_options.keys()))
     selected_account_id    = account_options[selected_account_name]
 
     client             = get_mongo_client()
-    db                 = get_account_db(client, selected_account_id)
-    available_markets  = ["Tous"] + sorted(db.list_collection_names())
 
-    selected_market = st.selectbox("📈 Marché", available_markets)
+    if selected_account_id is not None:
+        available_markets  = ["Tous"] + list_markets(client, selected_account_id)
+        selected_market    = st.selectbox("📈 Marché", available_markets)
 
     st.divider()
 
@@ -101,7 +472,8 @@ with st.sidebar:
         ["Aujourd'hui", "Hier", "Cette Semaine", "Ce Mois", "Cette Année", "Tout"]
     )
 
-    st.info(f"Compte ID : {selected_account_id}")
+    if selected_account_id is not None:
+        st.info(f"Compte ID : {selected_account_id}")
 
 # ── Refresh ────────────────────────────────────────────────────
 st_autorefresh(interval=30_000, key="data_update")
@@ -109,63 +481,36 @@ st_autorefresh(interval=30_000, key="data_update")
 # ── Titre ──────────────────────────────────────────────────────
 st.title(f"Journal de Trading : {selected_account_name}")
 
-# ── Chargement et filtrage ─────────────────────────────────────
-df_raw = load_data(client, selected_account_id, selected_market)
-
-if df_raw.empty:
-    st.warning("Aucune donnée trouvée pour ce compte / marché.")
+if selected_account_id is None:
+    render_portfolio(client, periode)
     st.stop()
 
-df  = df_raw.copy()
-now = datetime.now()
-
-if   periode == "Aujourd'hui":
-    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    df    = df[df["open_time"] >= start]
-elif periode == "Hier":
-    start = (now - timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-    end   = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    df    = df[(df["open_time"] >= start) & (df["open_time"] < end)]
-elif periode == "Cette Semaine":
-    start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-    df    = df[df["open_time"] >= start]
-elif periode == "Ce Mois":
-    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    df    = df[df["open_time"] >= start]
-elif periode == "Cette Année":
-    start = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    df    = df[df["open_time"] >= start]
-
-if df.empty:
+# ── Chargement : delta incrémental + agrégation mémorisée ──────
+cache = get_trade_cache(selected_account_id)
+cache.refresh(client)
+
+start, end = period_bounds(periode, datetime.now())
+data = load_dashboard_cached(client, selected_account_id, selected_market,
+                             start, end, equity_unit(periode), cache.version)
+
+if data is None:
     st.info(f"Aucun trade pour la période : {periode}")
     st.stop()
 
-# ── KPIs ───────────────────────────────────────────────────────
-closed = df[df["status"] == "CLOSED"].copy()    # .copy() → évite SettingWithCopyWarning
-open_  = df[df["status"] == "OPEN"].copy()
-
-wins   = (closed["profit"] > 0).sum()
-losses = (closed["profit"] < 0).sum()
-wr     = (wins / len(closed) * 100) if len(closed) > 0 else 0
-total_profit = closed["profit"].sum()
-avg_win      = closed[closed["profit"] > 0]["profit"].mean() if wins > 0  else 0
-avg_loss     = closed[closed["profit"] < 0]["profit"].mean() if losses > 0 else 0
-profit_factor = abs(avg_win / avg_loss) if avg_loss != 0 else float("inf")
+kpis = data["kpis"]
 
+# ── KPIs ───────────────────────────────────────────────────────
 col1, col2, col3, col4, col5 = st.columns(5)
-col1.metric("Trades fermés",    len(closed))
-col2.metric("Positions ouvertes", len(open_))
-col3.metric("Win Rate",         f"{wr:.1f}%")
-col4.metric("Profit Net",       f"{total_profit:+.2f} $")
-col5.metric("Profit Factor",    f"{profit_factor:.2f}")
+col1.metric("Trades fermés",    kpis["closed"])
+col2.metric("Positions ouvertes", kpis["open"])
+col3.metric("Win Rate",         f"{kpis['win_rate']:.1f}%")
+col4.metric("Profit Net",       f"{kpis['net']:+.2f} $")
+col5.metric("Profit Factor",    f"{kpis['profit_factor']:.2f}")
 
 # ── Courbe d'équité ────────────────────────────────────────────
-if not closed.empty and "close_time" in closed.columns:
-    closed_sorted = closed.sort_values("close_time")
-    closed_sorted["cum_profit"] = closed_sorted["profit"].cumsum()
-
+if not data["equity"].empty:
     fig_eq = px.line(
-        closed_sorted, x="close_time", y="cum_profit",
+        data["equity"], x="close_time", y="cum_profit",
         title="Évolution des Profits Cumulés",
         markers=True, color_discrete_sequence=["#00CC96"]
     )
@@ -173,32 +518,33 @@ if not closed.empty and "close_time" in closed.columns:
     st.plotly_chart(fig_eq, use_container_width=True)
 
 # ── Distribution des profits ───────────────────────────────────
-if not closed.empty:
+if kpis["closed"] > 0:
     col_a, col_b = st.columns(2)
 
     with col_a:
-        fig_hist = px.histogram(
-            closed, x="profit", nbins=20,
+        fig_hist = px.bar(
+            data["histogram"], x="profit", y="count",
             title="Distribution des P&L",
             color_discrete_sequence=["#636EFA"]
         )
         st.plotly_chart(fig_hist, use_container_width=True)
 
     with col_b:
-        if "market" in df.columns:
-            fig_pie = px.pie(df, names="market", title="Trades par Marché")
+        if not data["markets"].empty:
+            fig_pie = px.pie(data["markets"], names="market", values="count",
+                             title="Trades par Marché")
             st.plotly_chart(fig_pie, use_container_width=True)
 
 # ── Tableau détaillé ───────────────────────────────────────────
 st.subheader("Historique des Trades")
 
-display_cols = [
-    "ticket", "market", "type", "open_time", "open_price",
-    "close_time", "close_price", "profit", "status"
-]
-final_cols = [c for c in display_cols if c in df.columns]
+df = cache.view(selected_market, start, end)
+final_cols = [c for c in DISPLAY_COLS if c in df.columns]
 
 st.dataframe(
-    df[final_cols].sort_values("open_time", ascending=False),
-    use_container_width=True
+    df[final_cols].sort_values("open_time", ascending=False).head(TABLE_LIMIT),
+    use_container_width=True,
+    hide_index=True
 )
+if kpis["trades"] > TABLE_LIMIT:
+    st.caption(f"{TABLE_LIMIT} trades les plus récents affichés sur {kpis['trades']}.")
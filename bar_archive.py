@@ -0,0 +1,292 @@
+"""
+Archive disque des barres clôturées, lisible par memory-map.
+Un fichier binaire par (symbole, timeframe) — enregistrements de taille fixe
+BAR_DTYPE (48 octets), triés et dédoublonnés par heure d'ouverture — plus un
+petit index JSON (nombre de barres, première/dernière heure).
+Le fichier binaire fait foi ; l'index n'est qu'un cache, fusionné sous verrou
+fichier pour que plusieurs processus puissent partager le répertoire.
+
+Usages :
+  - démarrage à chaud : le magasin de barres (bar_store) est amorcé depuis
+    l'archive, seules les barres manquantes sont ensuite lues au terminal ;
+  - outils hors ligne (backtest, optimisation) : `BarArchive().load(sym, mt5.TIMEFRAME_M1)`
+    retourne un np.memmap en lecture seule, sans parsing ;
+  - remplissage des trous depuis le terminal :
+        python bar_archive.py backfill --days 365 --tf M1 M15 M30
+        python bar_archive.py info
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import MetaTrader5 as mt5
+
+from config import BAR_ARCHIVE_DIR, MT5_TERMINAL_PATH, SYMBOL
+
+BAR_DTYPE = np.dtype([
+    ("time",        "<i8"),
+    ("open",        "<f8"),
+    ("high",        "<f8"),
+    ("low",         "<f8"),
+    ("close",       "<f8"),
+    ("tick_volume", "<i8"),
+])
+
+TIMEFRAMES = {
+    "M1":  mt5.TIMEFRAME_M1,
+    "M5":  mt5.TIMEFRAME_M5,
+    "M15": mt5.TIMEFRAME_M15,
+    "M30": mt5.TIMEFRAME_M30,
+    "H1":  mt5.TIMEFRAME_H1,
+    "H4":  mt5.TIMEFRAME_H4,
+    "D1":  mt5.TIMEFRAME_D1,
+}
+TF_NAMES = {tf: name for name, tf in TIMEFRAMES.items()}
+
+INDEX_FILE     = "index.json"
+INDEX_LOCK     = "index.json.lock"
+BACKFILL_CHUNK = 50_000     # barres par requête copy_rates_range
+
+
+def to_records(rates) -> np.ndarray:
+    """Convertit des barres MT5 (ou un dict de colonnes) au format BAR_DTYPE."""
+    out = np.empty(len(rates["time"]), BAR_DTYPE)
+    for name in BAR_DTYPE.names:
+        out[name] = rates[name]
+    return out
+
+
+class BarArchive:
+    """Fichiers de barres en ajout seul + index JSON (écrit de façon atomique)."""
+
+    def __init__(self, root: str = BAR_ARCHIVE_DIR):
+        self.root  = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index = self._read_index()
+
+    # ── Index ────────────────────────────────────────────────────
+    @staticmethod
+    def key(symbol: str, timeframe: int) -> str:
+        return f"{symbol}|{TF_NAMES.get(timeframe, timeframe)}"
+
+    def path(self, symbol: str, timeframe: int) -> str:
+        safe = symbol.replace(" ", "_").replace("/", "_")
+        return os.path.join(self.root, f"{safe}_{TF_NAMES.get(timeframe, timeframe)}.bin")
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @contextmanager
+    def _index_lock(self):
+        """Verrou fichier inter-processus sur l'index (shards, outils hors ligne)."""
+        with open(os.path.join(self.root, INDEX_LOCK), "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:     # LK_LOCK abandonne après ~10 s : on réessaie
+                        pass
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _update_index(self, symbol: str, timeframe: int):
+        """
+        Relit l'index sous verrou, remplace l'entrée (symbole, timeframe) puis le
+        réécrit : les entrées des autres processus sont conservées.
+        """
+        data  = self.load(symbol, timeframe)
+        entry = {
+            "symbol":    symbol,
+            "timeframe": TF_NAMES.get(timeframe, timeframe),
+            "file":      os.path.basename(self.path(symbol, timeframe)),
+            "count":     len(data),
+            "first":     int(data["time"][0]) if len(data) else 0,
+            "last":      int(data["time"][-1]) if len(data) else 0,
+        }
+        with self._index_lock():
+            index = self._read_index()
+            index[self.key(symbol, timeframe)] = entry
+            tmp = os.path.join(self.root, f"{INDEX_FILE}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+            os.replace(tmp, os.path.join(self.root, INDEX_FILE))
+        self._index = index
+
+    def info(self) -> dict:
+        self._index = self._read_index()
+        return dict(self._index)
+
+    def last_time(self, symbol: str, timeframe: int) -> int:
+        """Heure de la dernière barre archivée, lue en fin de fichier (l'index peut être en retard)."""
+        data = self.load(symbol, timeframe, bars=1)
+        return int(data["time"][-1]) if len(data) else 0
+
+    # ── Lecture ──────────────────────────────────────────────────
+    def load(self, symbol: str, timeframe: int, bars: int | None = None) -> np.ndarray:
+        """Barres archivées (np.memmap en lecture seule) ; les `bars` dernières si précisé."""
+        path = self.path(symbol, timeframe)
+        try:
+            count = os.path.getsize(path) // BAR_DTYPE.itemsize
+        except OSError:
+            count = 0
+        if count == 0:
+            return np.empty(0, BAR_DTYPE)
+        data = np.memmap(path, dtype=BAR_DTYPE, mode="r", shape=(count,))
+        return data if bars is None else data[max(0, count - bars):]
+
+    # ── Écriture ─────────────────────────────────────────────────
+    def append(self, symbol: str, timeframe: int, rates) -> int:
+        """
+        Ajoute des barres clôturées triées ; seules celles postérieures à la
+        dernière barre archivée sont écrites. Retourne le nombre de barres ajoutées.
+        """
+        if rates is None or len(rates["time"]) == 0:
+            return 0
+        with self._lock:
+            last  = self.last_time(symbol, timeframe)
+            times = np.asarray(rates["time"], dtype=np.int64)
+            new   = to_records(rates)[times > last]
+            if len(new) == 0:
+                return 0
+            path = self.path(symbol, timeframe)
+            self._drop_partial_record(path)
+            with open(path, "ab") as f:
+                f.write(new.tobytes())
+            self._update_index(symbol, timeframe)
+            return len(new)
+
+    @staticmethod
+    def _drop_partial_record(path: str):
+        """Tronque un enregistrement incomplet (arrêt pendant une écriture) avant un ajout."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size % BAR_DTYPE.itemsize:
+            logging.warning(f"⚠️ Archive {os.path.basename(path)} : enregistrement incomplet tronqué")
+            os.truncate(path, size - size % BAR_DTYPE.itemsize)
+
+    def merge(self, symbol: str, timeframe: int, rates) -> int:
+        """
+        Fusionne des barres quelconques (y compris antérieures ou dans un trou) :
+        réécrit le fichier trié et dédoublonné. Réservé au backfill.
+        Retourne le nombre de barres ajoutées.
+        """
+        if rates is None or len(rates["time"]) == 0:
+            return 0
+        with self._lock:
+            path     = self.path(symbol, timeframe)
+            existing = np.array(self.load(symbol, timeframe))
+            merged   = np.concatenate([existing, to_records(rates)])
+            # Dernière occurrence conservée : une barre relue au terminal fait foi
+            _, idx   = np.unique(merged["time"][::-1], return_index=True)
+            merged   = merged[::-1][idx]
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(merged.tobytes())
+            os.replace(tmp, path)
+            self._update_index(symbol, timeframe)
+            return len(merged) - len(existing)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BACKFILL DEPUIS LE TERMINAL
+# ═══════════════════════════════════════════════════════════════
+
+def fetch_range(symbol: str, timeframe: int, start: datetime, end: datetime):
+    """Lit les barres [start, end] par tranches de BACKFILL_CHUNK."""
+    chunks = []
+    period = timedelta(seconds=mt5_period_seconds(timeframe))
+    cursor = start
+    while cursor < end:
+        stop  = min(end, cursor + period * BACKFILL_CHUNK)
+        rates = mt5.copy_rates_range(symbol, timeframe, cursor, stop)
+        if rates is not None and len(rates):
+            chunks.append(to_records(rates))
+        cursor = stop
+    if not chunks:
+        return np.empty(0, BAR_DTYPE)
+    # Les bornes de tranches sont incluses des deux côtés : dédoublonnage par heure
+    rates = np.concatenate(chunks)
+    _, idx = np.unique(rates["time"], return_index=True)
+    return rates[idx]
+
+
+def mt5_period_seconds(timeframe: int) -> int:
+    name = TF_NAMES.get(timeframe, "M1")
+    unit, n = name[0], int(name[1:])
+    return n * {"M": 60, "H": 3600, "D": 86400}[unit]
+
+
+def backfill(archive: BarArchive, symbol: str, timeframe: int, days: int) -> int:
+    """Complète l'archive sur les `days` derniers jours (barre en formation exclue)."""
+    end   = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    rates = fetch_range(symbol, timeframe, start, end)
+    rates = rates[:-1]    # Barre en formation
+    if len(rates) == 0:
+        return 0
+    data  = archive.load(symbol, timeframe)
+    if len(data) and int(rates["time"][0]) > int(data["time"][-1]):
+        return archive.append(symbol, timeframe, rates)
+    return archive.merge(symbol, timeframe, rates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive de barres (memory-map)")
+    sub    = parser.add_subparsers(dest="command", required=True)
+
+    fill = sub.add_parser("backfill", help="Remplir l'archive depuis le terminal")
+    fill.add_argument("--days", type=int, default=30)
+    fill.add_argument("--tf", nargs="+", default=["M1", "M15", "M30"], choices=list(TIMEFRAMES))
+    fill.add_argument("--symbols", nargs="+", default=None,
+                      help="Symboles (défaut : config.SYMBOL)")
+    sub.add_parser("info", help="Afficher l'index de l'archive")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+    archive = BarArchive()
+
+    if args.command == "info":
+        for key, entry in sorted(archive.info().items()):
+            first = datetime.fromtimestamp(entry["first"], timezone.utc)
+            last  = datetime.fromtimestamp(entry["last"], timezone.utc)
+            logging.info(f"{key:<30} {entry['count']:>9} barres  {first:%Y-%m-%d %H:%M} → {last:%Y-%m-%d %H:%M}")
+        return
+
+    if not mt5.initialize(path=MT5_TERMINAL_PATH):
+        logging.error(f"❌ Init MT5 échoué : {mt5.last_error()}")
+        return
+    try:
+        for symbol in args.symbols or SYMBOL:
+            for tf_name in args.tf:
+                added = backfill(archive, symbol, TIMEFRAMES[tf_name], args.days)
+                logging.info(f"📦 {symbol:<25} {tf_name:<4} +{added} barre(s)")
+    finally:
+        mt5.shutdown()
+
+
+if __name__ == "__main__":
+    main()
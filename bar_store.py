@@ -0,0 +1,334 @@
+"""
+Magasin de barres en mémoire, partagé entre threads.
+Une série par (symbole, timeframe) : colonnes NumPy préallouées
+(time, open, high, low, close, tick_volume), écriture en ajout seul.
+
+Les lecteurs reçoivent des vues en lecture seule, sans copie ; un DataFrame
+construit par frame() partage la mémoire des colonnes. Lorsque la capacité est
+atteinte, la série bascule sur de nouveaux tableaux (les vues déjà distribuées
+restent valides et inchangées). Seule la dernière ligne — la barre en formation —
+peut être rafraîchie sur place.
+
+Les rafraîchissements ne lisent au terminal que les barres nouvelles, et un
+même (symbole, timeframe) n'est pas relu plus d'une fois par REFRESH_INTERVAL :
+l'analyse et la surveillance des positions partagent ainsi les mêmes lectures.
+
+Avec une archive attachée (bar_archive), une série vide est amorcée depuis le
+disque et les barres clôturées y sont ajoutées au fil de l'eau.
+
+Rééchantillonnage (RESAMPLE_ENABLED=1) : une fois amorcées, les séries M15/M30
+sont agrégées localement depuis la série M1 (bornes alignées sur l'heure du
+broker) ; un seul flux M1 par symbole alimente alors tous les timeframes.
+verify_resampling() compare au démarrage l'agrégat aux barres du terminal ;
+en cas d'écart, le couple (symbole, timeframe) repasse en lecture directe.
+"""
+import datetime as dt
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+import MetaTrader5 as mt5
+
+import clock
+from metrics import terminal_timer
+
+COLUMNS = {
+    "time":        np.int64,     # secondes (heure serveur)
+    "open":        np.float64,
+    "high":        np.float64,
+    "low":         np.float64,
+    "close":       np.float64,
+    "tick_volume": np.int64,
+}
+
+DEFAULT_CAPACITY = 4096
+REFRESH_INTERVAL = 1.0    # secondes entre deux lectures terminal d'une même série
+BASE_BARS        = 150    # barres M1 entretenues pour le rééchantillonnage
+CHECK_BARS       = 20     # barres clôturées comparées par verify_resampling
+
+
+def resample(cols, period: int) -> dict:
+    """
+    Agrège des barres triées (colonnes COLUMNS) en barres de `period` secondes,
+    alignées sur les multiples de period en heure serveur (comme MT5).
+    """
+    times = np.asarray(cols["time"], dtype=np.int64)
+    if len(times) == 0:
+        return {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+    keys  = times - times % period
+    start = np.r_[0, np.flatnonzero(np.diff(keys)) + 1]
+    ends  = np.r_[start[1:], len(times)]
+    return {
+        "time":        keys[start],
+        "open":        np.asarray(cols["open"])[start],
+        "high":        np.maximum.reduceat(np.asarray(cols["high"]), start),
+        "low":         np.minimum.reduceat(np.asarray(cols["low"]), start),
+        "close":       np.asarray(cols["close"])[ends - 1],
+        "tick_volume": np.add.reduceat(np.asarray(cols["tick_volume"], dtype=np.int64), start),
+    }
+
+
+class BarSeries:
+    """Colonnes d'une série (symbole, timeframe), en ajout seul."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity     = capacity
+        self._cols        = {name: np.empty(capacity, dtype) for name, dtype in COLUMNS.items()}
+        self._len         = 0
+        self._lock        = threading.Lock()
+        self.last_refresh = 0.0      # clock.monotonic() de la dernière lecture terminal
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def last_time(self) -> int:
+        return int(self._cols["time"][self._len - 1]) if self._len else 0
+
+    def append(self, rates) -> int:
+        """
+        Intègre des barres triées (tableau structuré MT5 ou dict de colonnes).
+        Une barre de même heure que la dernière la remplace (barre en formation),
+        les barres plus anciennes sont ignorées. Retourne le nombre de barres ajoutées.
+        """
+        if rates is None or len(rates["time"]) == 0:
+            return 0
+        with self._lock:
+            times = np.asarray(rates["time"], dtype=np.int64)
+            last  = self.last_time
+            start = int(np.searchsorted(times, last, side="left")) if self._len else 0
+
+            if self._len and start < len(times) and times[start] == last:
+                # Rafraîchissement de la barre en formation
+                for name in COLUMNS:
+                    self._cols[name][self._len - 1] = rates[name][start]
+                start += 1
+
+            count = len(times) - start
+            if count <= 0:
+                return 0
+            if self._len + count > self.capacity:
+                self._grow(count)
+
+            end = self._len + count
+            for name in COLUMNS:
+                self._cols[name][self._len:end] = rates[name][start:]
+            self._len = end
+            return count
+
+    def _grow(self, incoming: int):
+        """Bascule sur de nouveaux tableaux en ne gardant que la moitié récente."""
+        keep     = min(self._len, self.capacity // 2)
+        capacity = max(self.capacity, keep + incoming)
+        fresh    = {name: np.empty(capacity, dtype) for name, dtype in COLUMNS.items()}
+        for name in COLUMNS:
+            fresh[name][:keep] = self._cols[name][self._len - keep:self._len]
+        self._cols, self._len, self.capacity = fresh, keep, capacity
+
+    def view(self, bars: int | None = None) -> dict:
+        """Dernières `bars` lignes : dict de vues NumPy en lecture seule (aucune copie)."""
+        with self._lock:
+            cols, n = self._cols, self._len
+        start = 0 if bars is None else max(0, n - bars)
+        out = {}
+        for name, arr in cols.items():
+            v = arr[start:n]
+            v.flags.writeable = False
+            out[name] = v
+        return out
+
+    def frame(self, bars: int | None = None) -> pd.DataFrame:
+        """DataFrame partageant la mémoire des colonnes ('time' en datetime64[s])."""
+        cols = self.view(bars)
+        if len(cols["time"]) == 0:
+            return pd.DataFrame()
+        cols["time"] = cols["time"].view("datetime64[s]")
+        return pd.DataFrame(cols, copy=False)
+
+
+class BarStore:
+    """Séries partagées par (symbole, timeframe) + rafraîchissement incrémental."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY,
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.capacity         = capacity
+        self.refresh_interval = refresh_interval
+        self._series: dict    = {}
+        self._lock            = threading.Lock()
+        self._fetch_locks     = {}
+        self.archive          = None
+        self._derived: dict   = {}     # timeframe → (timeframe de base, durée en s)
+        self._direct: set     = set()  # (symbole, timeframe) exclus du rééchantillonnage
+
+    def enable_resampling(self, timeframes: dict, base: int = mt5.TIMEFRAME_M1):
+        """timeframes : {timeframe: durée en secondes} à dériver de la série `base`."""
+        self._derived = {tf: (base, period) for tf, period in timeframes.items()}
+
+    def attach_archive(self, archive):
+        """Démarrage à chaud depuis `archive` (BarArchive) et archivage des barres clôturées."""
+        self.archive = archive
+
+    def series(self, symbol: str, timeframe: int) -> BarSeries:
+        key = (symbol, timeframe)
+        s   = self._series.get(key)
+        if s is None:
+            with self._lock:
+                s = self._series.setdefault(key, BarSeries(self.capacity))
+                self._fetch_locks.setdefault(key, threading.Lock())
+        return s
+
+    def clear(self):
+        """Oublie toutes les séries (nouvelle simulation)."""
+        with self._lock:
+            self._series.clear()
+            self._fetch_locks.clear()
+
+    def preload(self, symbol: str, timeframe: int, bars: int) -> int:
+        """
+        Amorce une série vide depuis l'archive, sans appel terminal (démarrage,
+        en parallèle de la connexion) ; le premier refresh ne lit que le trou.
+        """
+        if self.archive is None:
+            return 0
+        s = self.series(symbol, timeframe)
+        with self._fetch_locks[(symbol, timeframe)]:
+            if len(s):
+                return 0
+            try:
+                return s.append(self.archive.load(symbol, timeframe, bars))
+            except Exception as e:
+                logging.error(f"BarStore.preload [{symbol}] tf={timeframe} : {e}")
+                return 0
+
+    def refresh(self, symbol: str, timeframe: int, bars: int) -> BarSeries:
+        """Met la série à jour (agrégation M1 si le timeframe est dérivé, sinon terminal)."""
+        if timeframe in self._derived and (symbol, timeframe) not in self._direct:
+            return self._refresh_derived(symbol, timeframe, bars)
+        return self._refresh_direct(symbol, timeframe, bars)
+
+    def _refresh_derived(self, symbol: str, timeframe: int, bars: int) -> BarSeries:
+        """
+        Prolonge la série dérivée depuis la série de base : la barre en formation
+        est recalculée sur les barres de base depuis son ouverture.
+        L'amorçage (historique) reste lu au terminal ou dans l'archive.
+        """
+        s = self.series(symbol, timeframe)
+        if len(s) < bars:
+            return self._refresh_direct(symbol, timeframe, bars)
+
+        key = (symbol, timeframe)
+        if clock.monotonic() - s.last_refresh < self.refresh_interval:
+            return s
+
+        base_tf, period = self._derived[timeframe]
+        cols = self.refresh(symbol, base_tf, BASE_BARS).view()
+        if len(cols["time"]) == 0 or cols["time"][0] > s.last_time:
+            # Série de base trop courte pour couvrir la barre en formation
+            return self._refresh_direct(symbol, timeframe, bars)
+
+        with self._fetch_locks[key]:
+            i     = int(np.searchsorted(cols["time"], s.last_time, "left"))
+            added = s.append(resample({name: col[i:] for name, col in cols.items()}, period))
+            s.last_refresh = clock.monotonic()
+            if added and self.archive is not None:
+                self._archive_closed(symbol, timeframe, s, added)
+        return s
+
+    def verify_resampling(self, symbol: str, timeframe: int, bars: int = CHECK_BARS) -> bool:
+        """
+        Compare les `bars` dernières barres clôturées du terminal à l'agrégat des
+        barres de base correspondantes. En cas d'écart, le timeframe est lu
+        directement au terminal pour ce symbole.
+        """
+        base_tf, period = self._derived[timeframe]
+        try:
+            with terminal_timer("copy_rates_from_pos", symbol):
+                ref = mt5.copy_rates_from_pos(symbol, timeframe, 1, bars)
+            if ref is None or len(ref) == 0:
+                raise ValueError("pas de barres de référence")
+            start = dt.datetime.fromtimestamp(int(ref["time"][0]), dt.timezone.utc)
+            end   = dt.datetime.fromtimestamp(int(ref["time"][-1]) + period - 1, dt.timezone.utc)
+            with terminal_timer("copy_rates_range", symbol):
+                base = mt5.copy_rates_range(symbol, base_tf, start, end)
+            if base is None or len(base) == 0:
+                raise ValueError("pas de barres de base")
+
+            ours = resample(base, period)
+            same = len(ours["time"]) == len(ref) and all(
+                np.array_equal(ours[name], np.asarray(ref[name], dtype=COLUMNS[name]))
+                for name in COLUMNS
+            )
+        except Exception as e:
+            logging.error(f"verify_resampling [{symbol}] tf={timeframe} : {e}")
+            same = False
+
+        if same:
+            self._direct.discard((symbol, timeframe))
+            logging.info(f"✅ [{symbol}] Rééchantillonnage tf={timeframe} identique au terminal ({bars} barres)")
+        else:
+            self._direct.add((symbol, timeframe))
+            logging.warning(f"⚠️ [{symbol}] Rééchantillonnage tf={timeframe} différent du terminal "
+                            f"→ lecture directe conservée")
+        return same
+
+    def _refresh_direct(self, symbol: str, timeframe: int, bars: int) -> BarSeries:
+        """
+        Met la série à jour depuis le terminal :
+          - cas courant : lecture des 2 dernières barres, élargie en cas de trou ;
+          - série vide, trop courte ou trou trop grand : relecture complète
+            dans une nouvelle série (les vues déjà distribuées restent valides).
+        """
+        s   = self.series(symbol, timeframe)
+        key = (symbol, timeframe)
+        with self._fetch_locks[key]:
+            if clock.monotonic() - s.last_refresh < self.refresh_interval and len(s) >= bars:
+                return s
+            try:
+                if not len(s) and self.archive is not None and not s.last_refresh:
+                    s.append(self.archive.load(symbol, timeframe, bars))
+                rates = None
+                if len(s) >= bars:
+                    rates = self._fetch(symbol, timeframe, 2)
+                    if rates is not None and len(rates) and rates["time"][0] > s.last_time:
+                        # Trou depuis la dernière lecture : relecture de la partie manquante
+                        period = int(rates["time"][-1] - rates["time"][0]) or 60
+                        gap    = int((rates["time"][-1] - s.last_time) // period) + 1
+                        rates  = self._fetch(symbol, timeframe, gap) if gap <= self.capacity // 2 else None
+                        if rates is None or not len(rates) or rates["time"][0] > s.last_time:
+                            rates = None
+                if rates is None:
+                    # Série vide, trop courte ou discontinue : relecture complète
+                    rates = self._fetch(symbol, timeframe, max(bars, len(s)))
+                    if len(s):
+                        s = self._reset(key)
+                added = s.append(rates)
+                s.last_refresh = clock.monotonic()
+                if added and self.archive is not None:
+                    self._archive_closed(symbol, timeframe, s, added)
+            except Exception as e:
+                logging.error(f"BarStore.refresh [{symbol}] tf={timeframe} : {e}")
+        return s
+
+    def _archive_closed(self, symbol: str, timeframe: int, s: BarSeries, added: int):
+        """Archive les barres clôturées par ce rafraîchissement (la barre en formation est exclue)."""
+        cols = s.view(added + 1)
+        self.archive.append(symbol, timeframe, {name: col[:-1] for name, col in cols.items()})
+
+    def _reset(self, key: tuple) -> BarSeries:
+        with self._lock:
+            self._series[key] = BarSeries(self.capacity)
+            return self._series[key]
+
+    @staticmethod
+    def _fetch(symbol: str, timeframe: int, count: int):
+        with terminal_timer("copy_rates_from_pos", symbol):
+            return mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+
+    def frame(self, symbol: str, timeframe: int, bars: int) -> pd.DataFrame:
+        """Les `bars` dernières barres (barre en formation incluse), sans copie."""
+        return self.refresh(symbol, timeframe, bars).frame(bars)
+
+
+# ── Instance globale ────────────────────────────────────────────
+BAR_STORE = BarStore()
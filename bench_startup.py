@@ -0,0 +1,213 @@
+"""
+Banc de démarrage : temps d'import et temps jusqu'à la première évaluation
+de signal, sur le chemin de démarrage réel (main.main) branché sur un
+terminal simulé (sim_terminal.py) alimenté par des ticks synthétiques.
+
+    python bench_startup.py                    # mesure + garde-fous
+    python bench_startup.py --max-seconds 3    # seuil absolu plus strict
+    python bench_startup.py --runs 5           # médiane sur 5 processus
+    python bench_startup.py --update-baseline  # enregistre la médiane comme référence
+
+Garde-fous (code de sortie 1) : médiane au-delà de --max-seconds, ou au-delà
+de la référence versionnée (bench_startup_baseline.json) + --tolerance.
+L'historique local des mesures est ajouté à data/bench_startup.jsonl.
+Archive de barres, journal DB et MongoDB sont redirigés vers des emplacements
+temporaires : le banc ne touche pas aux données. Sans le paquet MetaTrader5
+(hors Windows), le terminal simulé tient lieu de module MetaTrader5.
+"""
+import time
+
+_T0 = time.perf_counter()   # Avant tout import : l'import du bot fait partie de la mesure
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import types
+
+RESULTS_FILE  = os.path.join("data", "bench_startup.jsonl")
+RESULT_MARK   = "BENCH_RESULT "   # préfixe de la ligne de mesure (stdout partagé avec les logs)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_startup_baseline.json")
+DAYS         = 5            # historique synthétique (200 barres M30 ≈ 4,2 jours)
+TICK_STEP_MS = 5_000
+
+
+def _isolate(workdir: str):
+    """Redirige toutes les ressources persistantes avant le chargement de config.py."""
+    os.environ.update({
+        "BAR_ARCHIVE_DIR":  os.path.join(workdir, "bars"),
+        "DB_JOURNAL_PATH":  os.path.join(workdir, "db_journal.jsonl"),
+        "MONGODB_URI":      "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=500",
+        "TELEGRAM_TOKEN":   "",
+        "METRICS_PORT":     "0",
+        "TICK_RECORDER":    "0",
+        "LOG_ANALYSIS_JSONL": "0",
+        "PROFILE_TRIGGER_FILE": os.path.join(workdir, "profile.request"),
+    })
+
+
+def _terminal_module():
+    """
+    Module MetaTrader5 : le vrai paquet s'il est installé, sinon un module de
+    substitution enregistré avant les imports du bot, relié ensuite au terminal simulé.
+    """
+    try:
+        import MetaTrader5
+        return None
+    except ImportError:
+        proxy = types.ModuleType("MetaTrader5")
+        sys.modules["MetaTrader5"] = proxy
+        return proxy
+
+
+def _synthetic_terminal(symbols: list):
+    import numpy as np
+    from sim_terminal import SimulatedTerminal
+    from tick_recorder import TICK_DTYPE
+
+    end   = int(time.time()) * 1000
+    count = DAYS * 86_400_000 // TICK_STEP_MS
+    rng   = np.random.default_rng(0)
+    ticks = {}
+    for i, symbol in enumerate(symbols):
+        t = np.empty(count, TICK_DTYPE)
+        t["time_msc"] = end - (count - np.arange(count)) * TICK_STEP_MS
+        t["bid"]      = 1000.0 * (i + 1) + np.cumsum(rng.normal(0, 0.5, count))
+        t["ask"]      = t["bid"] + 0.1
+        t["last"]     = 0.0
+        t["volume"]   = 0.0
+        t["flags"]    = 6
+        ticks[symbol] = t
+    terminal = SimulatedTerminal(ticks)
+    terminal.advance(end)
+    return terminal
+
+
+def run_once(symbols: list | None):
+    """
+    Une mesure dans le processus courant (sous-processus --child) : le bot
+    démarre dans le thread principal (gestionnaires de signaux), la mesure est
+    écrite sur stdout à la première évaluation puis le processus se termine.
+    """
+    _isolate(tempfile.mkdtemp(prefix="bench_startup_"))
+    proxy = _terminal_module()
+
+    from config import SYMBOL
+    from sim_terminal import patch_mt5
+    symbols  = symbols or SYMBOL
+    terminal = _synthetic_terminal(symbols)
+    if proxy is not None:
+        proxy.__getattr__ = lambda name: getattr(terminal, name)   # constantes et API
+
+    t0 = time.perf_counter()
+    import main
+    import orchestrator
+    import strategy
+    t_import = time.perf_counter() - t0
+    heavy    = {name: name in sys.modules for name in ("pandas_ta", "telegram")}
+
+    first    = threading.Event()
+    stamp    = {}
+    original = strategy.is_volatility_good
+
+    def timed_volatility(symbol):
+        result = original(symbol)
+        if not first.is_set():
+            stamp["t"] = time.perf_counter()
+            first.set()
+        return result
+
+    def report():
+        if not first.wait(120):
+            print("aucune évaluation de signal en 120 s", file=sys.stderr, flush=True)
+            os._exit(1)
+        result = json.dumps({
+            "ts":             time.time(),
+            "symbols":        len(symbols),
+            "import_s":       round(t_import, 3),
+            "first_eval_s":   round(stamp["t"] - _T0, 3),
+            "boot_to_eval_s": round(stamp["t"] - t_main, 3),
+            "lazy_pandas_ta": not heavy["pandas_ta"],
+            "lazy_telegram":  not heavy["telegram"],
+        })
+        # Une seule écriture : la ligne ne peut pas être entrecoupée par la console des logs
+        sys.stdout.write(f"\n{RESULT_MARK}{result}\n")
+        sys.stdout.flush()
+        os._exit(0)   # Sortie immédiate : le bot tourne encore
+
+    main.is_volatility_good = orchestrator.is_volatility_good = timed_volatility
+    threading.Thread(target=report, name="Bench-Report", daemon=True).start()
+
+    with patch_mt5(terminal):
+        t_main = time.perf_counter()
+        try:
+            main.main(symbols=symbols, multi_account=False, log_suffix="-bench")
+        finally:
+            first.wait(1)
+            os._exit(1)   # main() terminé avant la première évaluation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps de démarrage jusqu'à la première évaluation")
+    parser.add_argument("--runs", type=int, default=3, help="Processus mesurés (médiane)")
+    parser.add_argument("--max-seconds", type=float, default=5.0,
+                        help="Seuil absolu de la médiane first_eval_s (code de sortie 1 au-delà)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Dépassement admis de la référence versionnée (0.5 = +50 %%)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help=f"Enregistre la médiane dans {os.path.basename(BASELINE_FILE)}")
+    parser.add_argument("--symbols", nargs="+", default=None, help="Symboles (défaut : config.SYMBOL)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_once(args.symbols)
+
+    # Un processus neuf par mesure : imports à froid, comme un vrai démarrage
+    cmd = [sys.executable, os.path.abspath(__file__), "--child"]
+    if args.symbols:
+        cmd += ["--symbols", *args.symbols]
+    results = []
+    for i in range(args.runs):
+        out = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+        line = [l[len(RESULT_MARK):] for l in out.stdout.splitlines()
+                if l.startswith(RESULT_MARK)] if out.returncode == 0 else []
+        if not line:
+            print(out.stderr[-2000:], file=sys.stderr)
+            sys.exit(f"Mesure {i + 1} échouée (code {out.returncode})")
+        results.append(json.loads(line[0]))
+        r = results[-1]
+        print(f"#{i + 1}  import={r['import_s']:.2f}s  première évaluation={r['first_eval_s']:.2f}s  "
+              f"(main→éval {r['boot_to_eval_s']:.2f}s)  "
+              f"pandas_ta différé={r['lazy_pandas_ta']}  telegram différé={r['lazy_telegram']}")
+
+    median = statistics.median(r["first_eval_s"] for r in results)
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+        for r in results:
+            f.write(json.dumps({**r, "max_seconds": args.max_seconds}) + "\n")
+
+    limit = args.max_seconds
+    if args.update_baseline:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"first_eval_s": round(median, 3), "runs": len(results),
+                       "symbols": results[0]["symbols"], "ts": int(time.time())}, f, indent=2)
+            f.write("\n")
+        print(f"Référence enregistrée : {median:.2f}s → {os.path.basename(BASELINE_FILE)}")
+    elif os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)["first_eval_s"]
+        limit = min(limit, baseline * (1 + args.tolerance))
+        print(f"Référence versionnée : {baseline:.2f}s (+{args.tolerance:.0%} → {limit:.2f}s)")
+
+    verdict = "OK" if median <= limit else "TROP LENT"
+    print(f"Médiane première évaluation : {median:.2f}s (seuil {limit:.2f}s) → {verdict}")
+    sys.exit(0 if median <= limit else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Horloge injectable des boucles du bot (attentes, horodatages, délais).
+
+    import clock
+    clock.sleep(10)                     # au lieu de time.sleep(10)
+    clock.wait(event, 5)                # au lieu de event.wait(5)
+    clock.monotonic(), clock.now(), clock.utcnow()
+
+Par défaut : horloge réelle (Clock). Pour la simulation :
+
+    with clock.install(VirtualClock(start)):
+        ...
+
+VirtualClock — temps simulé à événements discrets :
+  - les threads « participants » (lancés par VirtualClock.spawn) s'exécutent
+    un par un ; une attente les met en file (réveil, ordre d'arrivée) ;
+  - quand plus aucun participant ne s'exécute, l'horloge saute directement
+    au prochain réveil (rappel on_advance : ex. terminal simulé avancé) ;
+  - exécution sérialisée et ordre de réveil fixe : une journée simulée se
+    rejoue à l'identique, en quelques secondes.
+Les threads non participants (writer DB, Telegram…) gardent des attentes réelles.
+"""
+import contextlib
+import heapq
+import threading
+import time as _time
+from datetime import datetime
+
+
+class Clock:
+    """Horloge réelle."""
+
+    def time(self) -> float:
+        return _time.time()
+
+    def monotonic(self) -> float:
+        return _time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def utcnow(self) -> datetime:
+        return datetime.utcnow()
+
+    def sleep(self, seconds: float):
+        _time.sleep(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """Attend `event` au plus `timeout` secondes ; retourne son état."""
+        return event.wait(timeout)
+
+
+class VirtualClock(Clock):
+    """Temps simulé (secondes epoch, heure serveur du terminal simulé)."""
+
+    def __init__(self, start: float, on_advance=None):
+        self._now       = float(start)
+        self.on_advance = on_advance      # callable(now) appelé à chaque saut de temps
+        self._lock      = threading.Lock()
+        self._queue     = []              # tas (réveil, n° d'ordre, threading.Event)
+        self._seq       = 0
+        self._active    = 0               # participants en cours d'exécution
+        self._members   = set()           # idents des threads participants
+        self._until     = None
+        self.finished   = threading.Event()
+
+    # ── Lecture ──────────────────────────────────────────────────
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self._now)
+
+    def utcnow(self) -> datetime:
+        return datetime.utcfromtimestamp(self._now)
+
+    # ── Attentes ─────────────────────────────────────────────────
+    def sleep(self, seconds: float):
+        if threading.get_ident() not in self._members:
+            _time.sleep(seconds)          # Thread hors simulation : attente réelle
+            return
+        wake = threading.Event()
+        with self._lock:
+            self._schedule(self._now + max(0.0, seconds), wake)
+            self._active -= 1
+            if self._active == 0:
+                self._dispatch()
+        wake.wait()
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        # Pas de réveil anticipé en simulation : l'ordre reste déterministe
+        if threading.get_ident() not in self._members:
+            return event.wait(timeout)
+        if not event.is_set():
+            self.sleep(timeout)
+        return event.is_set()
+
+    # ── Participants ─────────────────────────────────────────────
+    def spawn(self, target, *args, name: str = None) -> threading.Thread:
+        """Lance `target(*args)` en participant, démarré à l'instant simulé courant."""
+        start = threading.Event()
+
+        def runner():
+            start.wait()
+            self._members.add(threading.get_ident())
+            try:
+                target(*args)
+            finally:
+                with self._lock:
+                    self._members.discard(threading.get_ident())
+                    self._active -= 1
+                    if self._active == 0:
+                        self._dispatch()
+
+        with self._lock:
+            self._schedule(self._now, start)
+        thread = threading.Thread(target=runner, name=name, daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, until: float, timeout: float = None) -> bool:
+        """
+        Fait avancer la simulation jusqu'à `until` (bloquant). Les participants
+        restent en attente au-delà ; retourne False si `timeout` (réel) expire.
+        """
+        with self._lock:
+            self._until = until
+            self.finished.clear()
+            if self._active == 0:
+                self._dispatch()
+        return self.finished.wait(timeout)
+
+    # ── Ordonnancement (sous verrou) ─────────────────────────────
+    def _schedule(self, at: float, wake: threading.Event):
+        heapq.heappush(self._queue, (at, self._seq, wake))
+        self._seq += 1
+
+    def _dispatch(self):
+        """Aucun participant actif : réveille le suivant, en avançant le temps si besoin."""
+        if not self._queue or self._until is None or self._queue[0][0] > self._until:
+            if self._until is not None:
+                self.finished.set()
+            return
+        at, _, wake = heapq.heappop(self._queue)
+        if at > self._now:
+            self._now = at
+            if self.on_advance is not None:
+                self.on_advance(at)
+        self._active += 1
+        wake.set()
+
+
+_clock: Clock = Clock()
+
+
+def get() -> Clock:
+    return _clock
+
+
+@contextlib.contextmanager
+def install(new_clock: Clock):
+    """Remplace l'horloge du bot le temps du bloc (simulation, tests)."""
+    global _clock
+    previous, _clock = _clock, new_clock
+    try:
+        yield new_clock
+    finally:
+        _clock = previous
+
+
+# ── Raccourcis : délèguent à l'horloge installée ────────────────
+def time() -> float:
+    return _clock.time()
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def now() -> datetime:
+    return _clock.now()
+
+
+def utcnow() -> datetime:
+    return _clock.utcnow()
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def wait(event: threading.Event, timeout: float) -> bool:
+    return _clock.wait(event, timeout)
@@ -9,6 +9,12 @@ PASSWORD = os.getenv("PASSWORD", "")
 SERVER = os.getenv("SERVER", "")
 MT5_TERMINAL_PATH = r"C:\Program Files\MetaTrader 5\terminal64.exe"
 
+# Mode supervisé (supervisor.py) : une installation de terminal par shard, séparées par ";"
+# ex. MT5_TERMINAL_PATHS=C:\MT5-1\terminal64.exe;C:\MT5-2\terminal64.exe
+MT5_TERMINAL_PATHS = [p for p in os.getenv("MT5_TERMINAL_PATHS", "").split(";") if p.strip()]
+SHARD_HEARTBEAT_INTERVAL = float(os.getenv("SHARD_HEARTBEAT_INTERVAL", "5"))
+SHARD_HEARTBEAT_TIMEOUT = float(os.getenv("SHARD_HEARTBEAT_TIMEOUT", "60"))
+
 SYMBOL = ["Volatility 25 Index", "Volatility 50 Index", "Volatility 75 Index", "Volatility 100 Index"]
 LOT_SIZE = 1.0  # Volume fixe pour le test
 MAGIC_NUMBER = 123456
@@ -17,7 +23,68 @@ MAGIC_NUMBER = 123456
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
 
+# Logging : enregistrements d'analyse structurés (logs/analysis.jsonl, même rotation que les logs)
+LOG_ANALYSIS_JSONL = os.getenv("LOG_ANALYSIS_JSONL", "0") == "1"
+# Rotation quotidienne : nombre de jours conservés (fichiers compressés en .gz)
+LOG_RETENTION_DAYS = int(os.getenv("LOG_RETENTION_DAYS", "14"))
+# Niveaux de log : console et fichier (LOG_FILE_LEVEL=DEBUG active les traces DEBUG,
+# échantillonnées selon LOG_DEBUG_SAMPLE_RATE ; le niveau racine suit le plus verbeux)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "INFO").upper()
+# Échantillonnage des logs DEBUG dans le fichier : 1.0 = tout, 0.1 = 1 sur 10
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+
+# Instrumentation des latences (metrics.py) ; résumé écrit dans les logs toutes les N s (0 = jamais)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_DUMP_INTERVAL = float(os.getenv("METRICS_DUMP_INTERVAL", "300"))
+# Endpoint Prometheus /metrics (0 = désactivé) — écoute locale par défaut
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Profiler à chaud (profiler.py) : créer ce fichier (contenu = durée en s) pour lancer un profil
+PROFILE_TRIGGER_FILE = os.getenv("PROFILE_TRIGGER_FILE", "profile.request")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_POLL_INTERVAL = float(os.getenv("PROFILE_POLL_INTERVAL", "2"))
+# Threads profilés : préfixes de noms séparés par des virgules (ex. "Thread-,Monitor-") ;
+# vide = tous les threads du bot (symboles, moniteurs, ordonnanceur, carnet, asyncio)
+PROFILE_THREADS = os.getenv("PROFILE_THREADS", "")
+
+# Runtime asyncio (orchestrator.py) : pipelines et moniteurs en tâches, terminal sur un seul thread
+ASYNC_RUNTIME = os.getenv("ASYNC_RUNTIME", "0") == "1"
+
+# Carnet de positions (positions.py) : un positions_get() pour tout le bot toutes les N s
+POSITION_REFRESH_INTERVAL = float(os.getenv("POSITION_REFRESH_INTERVAL", "1"))
+
+# Ordonnanceur des ordres (order_scheduler.py) : débit par compte, en ordres/s et en rafale
+ORDER_RATE = float(os.getenv("ORDER_RATE", "2"))
+ORDER_BURST = float(os.getenv("ORDER_BURST", "5"))
+
+# Archive disque des barres clôturées (bar_archive.py) : démarrage à chaud du magasin de barres
+BAR_ARCHIVE_ENABLED = os.getenv("BAR_ARCHIVE_ENABLED", "1") == "1"
+BAR_ARCHIVE_DIR = os.getenv("BAR_ARCHIVE_DIR", os.path.join("data", "bars"))
+
+# Rééchantillonnage : M15/M30 agrégés localement depuis le flux M1 (vérifiés au démarrage)
+RESAMPLE_ENABLED = os.getenv("RESAMPLE_ENABLED", "0") == "1"
+
+# Enregistrement des ticks (tick_recorder.py) : tranches compressées pour le rejeu (sim_terminal.py)
+TICK_RECORDER = os.getenv("TICK_RECORDER", "0") == "1"
+TICK_DIR = os.getenv("TICK_DIR", os.path.join("data", "ticks"))
+TICK_CHUNK_SIZE = int(os.getenv("TICK_CHUNK_SIZE", "50000"))
+TICK_CHUNK_SECONDS = float(os.getenv("TICK_CHUNK_SECONDS", "300"))
+TICK_POLL_INTERVAL = float(os.getenv("TICK_POLL_INTERVAL", "0.25"))
+
 # MongoDB
 MONGODB_URI = os.getenv("MONGODB_URI", "")
 DB_NAME = os.getenv("MONGODB_DB", "trading_bot_V100")
 COLLECTION_NAME = "trades_v100"
+
+# Schéma de stockage des trades :
+#   "PER_SYMBOL" : trading_bot_{compte} / {symbole} (historique)
+#   "UNIFIED"    : DB_NAME / COLLECTION_NAME — une seule collection indexée par
+#                  (account, symbol, open_time) et (account, status)
+STORAGE_SCHEMA = os.getenv("STORAGE_SCHEMA", "PER_SYMBOL").upper()
+
+# Écritures différées : les événements de trade passent par un journal local
+# (append-only) puis sont écrits en lots par un thread dédié
+DB_WRITE_BEHIND = os.getenv("DB_WRITE_BEHIND", "1") == "1"
+DB_JOURNAL_PATH = os.getenv("DB_JOURNAL_PATH", os.path.join("data", "db_journal.jsonl"))
@@ -1,15 +1,20 @@
 # connexion.py - Connexion MT5
 import MetaTrader5 as mt5
 import logging
+import random
+import threading
 import time
 
 from config import ACCOUNT_NUMBER, PASSWORD, SERVER, MT5_TERMINAL_PATH
-from utils import send_telegram_alert
+from metrics import inc
+from utils import send_telegram_alert, shutdown_telegram
 
+_launch_alert_sent = False
 
-def connect_to_mt5(max_retries=3, delay=5):
-    """Connexion MT5 avec retries"""
-    terminal_path = MT5_TERMINAL_PATH
+
+def connect_to_mt5(max_retries=3, delay=5, terminal_path=None):
+    """Connexion MT5 avec retries (terminal_path : installation dédiée, ex. un shard)"""
+    terminal_path = terminal_path or MT5_TERMINAL_PATH
 
     for attempt in range(1, max_retries + 1):
         try:
@@ -36,7 +41,10 @@ def connect_to_mt5(max_retries=3, delay=5):
                 return False
 
             logging.info(f"Connecté compte {ACCOUNT_NUMBER}")
-            send_telegram_alert(f"✅ Bot lancé ! Compte {ACCOUNT_NUMBER}", force=True)  # Alert launch
+            global _launch_alert_sent
+            if not _launch_alert_sent:                 # Alerte au premier lancement seulement
+                send_telegram_alert(f"✅ Bot lancé ! Compte {ACCOUNT_NUMBER}", force=True)
+                _launch_alert_sent = True
             return True
 
         except Exception as e:
@@ -46,12 +54,122 @@ def connect_to_mt5(max_retries=3, delay=5):
     return False
 
 
+# ═══════════════════════════════════════════════════════════════
+# SUPERVISION DE LA CONNEXION
+# ═══════════════════════════════════════════════════════════════
+
+class ConnectionSupervisor:
+    """
+    Surveille la connexion terminal pour tout le process (un seul thread) :
+      - `connected` (threading.Event) : les boucles attendent dessus au lieu
+        d'interroger terminal_info chacune de leur côté ;
+      - coupure : re-login simple (terminal conservé), puis redémarrage complet
+        de la session si le re-login échoue, avec backoff exponentiel + jitter ;
+      - reprise : caches (barres, régimes) et moniteurs conservent leur état,
+        seules les barres manquantes sont relues.
+    """
+
+    def __init__(self, terminal_path: str = None, check_interval: float = 2.0,
+                 base_delay: float = 1.0, max_delay: float = 60.0,
+                 soft_attempts: int = 2):
+        self.terminal_path  = terminal_path
+        self.check_interval = check_interval
+        self.base_delay     = base_delay
+        self.max_delay      = max_delay
+        self.soft_attempts  = soft_attempts
+        self.connected      = threading.Event()
+        self.reconnects     = 0
+        self.down_since     = None
+        self._lock          = None      # verrou terminal partagé (strategy._mt5_lock)
+        self._thread        = None
+        self._stop          = threading.Event()
+
+    def start(self, terminal_path: str = None, terminal_lock=None):
+        if self._thread and self._thread.is_alive():
+            return
+        self.terminal_path = terminal_path or self.terminal_path
+        self._lock = terminal_lock
+        if self._is_connected():
+            self.connected.set()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="MT5-Connection", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def is_connected(self) -> bool:
+        # Non démarré (outils, rejeu) : connexion supposée, comportement historique
+        return self._thread is None or self.connected.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Bloque jusqu'à ce que le terminal soit connecté (ou timeout)."""
+        return self._thread is None or self.connected.wait(timeout)
+
+    def _call(self, fn, *args, **kwargs):
+        if self._lock is None:
+            return fn(*args, **kwargs)
+        with self._lock:
+            return fn(*args, **kwargs)
+
+    def _is_connected(self) -> bool:
+        try:
+            info = self._call(mt5.terminal_info)
+            return bool(info and info.connected)
+        except Exception:
+            return False
+
+    def _run(self):
+        while not self._stop.wait(self.check_interval):
+            if self._is_connected():
+                continue
+            self.connected.clear()
+            self.down_since = time.monotonic()
+            logging.warning("⚠️ Terminal MT5 déconnecté → reconnexion")
+            self._reconnect()
+
+    def _reconnect(self):
+        attempt = 0
+        while not self._stop.is_set():
+            soft = attempt < self.soft_attempts
+            ok   = self._soft_relogin() if soft else self._full_restart()
+            if ok and self._is_connected():
+                downtime = time.monotonic() - self.down_since
+                self.reconnects += 1
+                self.connected.set()
+                inc("terminal_reconnects_total", mode="login" if soft else "restart")
+                logging.info(f"✅ Terminal reconnecté ({'re-login' if soft else 'redémarrage'}) "
+                             f"après {downtime:.1f}s")
+                return
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+            attempt += 1
+            self._stop.wait(delay)
+
+    def _soft_relogin(self) -> bool:
+        """Le terminal tourne encore : simple re-login, sans shutdown/initialize."""
+        try:
+            if self._call(mt5.terminal_info) is None:
+                return False
+            return bool(self._call(mt5.login, ACCOUNT_NUMBER, password=PASSWORD, server=SERVER))
+        except Exception as e:
+            logging.error(f"Re-login échoué : {e}")
+            return False
+
+    def _full_restart(self) -> bool:
+        return self._call(connect_to_mt5, max_retries=1, delay=0, terminal_path=self.terminal_path)
+
+
+CONNECTION = ConnectionSupervisor()
+
+
 def disconnect():
     """Déconnexion"""
+    CONNECTION.stop()
     try:
         if mt5.terminal_info():
             mt5.shutdown()
         logging.info("Bot arrêté")
         send_telegram_alert("🛑 Bot arrêté", force=True)  # Alert close
+        shutdown_telegram()                                # Vide la file d'alertes
     except Exception as e:
         logging.error(f"Erreur déconnexion : {e}")
\ No newline at end of file
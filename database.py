@@ -1,18 +1,39 @@
 """
 Couche de persistance MongoDB — multi-comptes
-Structure : trading_bot_{account_number} / {symbol_safe} / documents
+Deux schémas de stockage (config.STORAGE_SCHEMA) :
+  - PER_SYMBOL : trading_bot_{account_number} / {symbol_safe} / documents
+  - UNIFIED    : {DB_NAME} / {COLLECTION_NAME} / documents (champ 'account')
+
+Écritures différées (config.DB_WRITE_BEHIND) : save_open / save_close ne font
+qu'ajouter l'événement au journal local ; TradeJournal les écrit en lots.
 """
+import asyncio
+import json
 import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, UpdateOne
 from pymongo.errors import DuplicateKeyError
-from config import MONGODB_URI
+import clock
+from metrics import observe
+from config import (MONGODB_URI, DB_NAME, COLLECTION_NAME, STORAGE_SCHEMA,
+                    DB_WRITE_BEHIND, DB_JOURNAL_PATH)
+
+
+def safe_symbol(symbol: str) -> str:
+    """Nom de collection dérivé du symbole ('Volatility 25 Index' → 'volatility_25_index')."""
+    return symbol.replace(" ", "_").lower()
 
 
 class DatabaseManager:
     def __init__(self, uri: str):
         self.client = MongoClient(uri, serverSelectionTimeoutMS=5000)
         self.uri    = uri
+        self._trades_indexed = False
 
     def get_db(self, account_number: int):
         """Retourne la base de données propre au compte."""
@@ -24,13 +45,65 @@ class DatabaseManager:
         Crée l'index unique sur 'ticket' si nécessaire (empêche les doublons).
         """
         db          = self.get_db(account_number)
-        safe_symbol = symbol.replace(" ", "_").lower()
-        col         = db[safe_symbol]
+        col         = db[safe_symbol(symbol)]
 
         # Index unique sur ticket — opération idempotente, inoffensive si déjà présent
         col.create_index([("ticket", ASCENDING)], unique=True, background=True)
+        # Index sur updated_at — lecture incrémentale du dashboard
+        col.create_index([("updated_at", ASCENDING)], background=True)
         return col
 
+    def get_trades_collection(self):
+        """
+        Retourne la collection unique des trades (schéma UNIFIED).
+        Les index composés sont créés une seule fois par processus.
+        """
+        col = self.client[DB_NAME][COLLECTION_NAME]
+        if not self._trades_indexed:
+            ensure_trades_indexes(col)
+            self._trades_indexed = True
+        return col
+
+
+def ensure_trades_indexes(col):
+    """
+    Index de la collection unifiée :
+      - (account, ticket) unique   → upserts idempotents, pas de doublons
+      - (account, symbol, open_time) → filtres compte / marché / période
+      - (account, status)          → positions ouvertes, KPIs sur trades fermés
+      - (account, updated_at)      → lecture incrémentale du dashboard
+    """
+    col.create_index([("account", ASCENDING), ("ticket", ASCENDING)],
+                     unique=True, background=True, name="account_ticket")
+    col.create_index([("account", ASCENDING), ("symbol", ASCENDING), ("open_time", ASCENDING)],
+                     background=True, name="account_symbol_open_time")
+    col.create_index([("account", ASCENDING), ("status", ASCENDING)],
+                     background=True, name="account_status")
+    col.create_index([("account", ASCENDING), ("updated_at", ASCENDING)],
+                     background=True, name="account_updated_at")
+
+
+def trades_query(account_number: int, symbol: str | None = None,
+                 start: datetime | None = None, end: datetime | None = None,
+                 status: str | None = None) -> dict:
+    """
+    Construit le filtre MongoDB pour la collection unifiée.
+    L'ordre des champs suit l'index (account, symbol, open_time).
+    """
+    query: dict = {"account": account_number}
+    if symbol:
+        query["symbol"] = symbol
+    if start is not None or end is not None:
+        window = {}
+        if start is not None:
+            window["$gte"] = start
+        if end is not None:
+            window["$lt"] = end
+        query["open_time"] = window
+    if status:
+        query["status"] = status
+    return query
+
 
 # ── Instance globale ────────────────────────────────────────────
 _db_manager: DatabaseManager | None = None
@@ -43,43 +116,332 @@ def _get_manager() -> DatabaseManager:
     return _db_manager
 
 
+def _locate(account_number: int, symbol: str, ticket: int) -> tuple:
+    """Retourne (collection, filtre) selon le schéma de stockage configuré."""
+    mgr = _get_manager()
+    if STORAGE_SCHEMA == "UNIFIED":
+        return mgr.get_trades_collection(), {"account": account_number, "ticket": ticket}
+    return mgr.get_collection(account_number, symbol), {"ticket": ticket}
+
+
+# ═══════════════════════════════════════════════════════════════
+# CONSTRUCTION DES ÉCRITURES
+# ═══════════════════════════════════════════════════════════════
+
+def _build_write(event: dict) -> tuple:
+    """Traduit un événement de trade en (collection, filtre, update)."""
+    account_number = event["account"]
+    symbol         = event["symbol"]
+    ticket         = event["ticket"]
+    ts             = event["ts"]
+    col, key       = _locate(account_number, symbol, ticket)
+
+    # updated_at = heure serveur de l'écriture (curseur du dashboard) : un événement
+    # écrit en retard (journal, rejeu, autre shard) reste visible en lecture incrémentale
+    if event["op"] == "open":
+        update = {
+            "$currentDate": {"updated_at": True},
+            "$setOnInsert": {
+                "ticket":     ticket,
+                "symbol":     symbol,
+                "type":       event["type"],
+                "open_price": float(event["price"]),
+                "open_time":  ts,
+                "status":     "OPEN",
+                "account":    account_number,
+                "profit":     None,
+            },
+        }
+    else:
+        update = {"$set": {
+            "close_price": float(event["price"]),
+            "close_time":  ts,
+            "profit":      round(float(event["profit"]), 2),
+            "status":      event["status"],
+        }, "$currentDate": {"updated_at": True}}
+        if STORAGE_SCHEMA == "UNIFIED":
+            # Le symbole est indispensable aux index composés, même pour une sync tardive
+            update["$setOnInsert"] = {"symbol": symbol}
+    return col, key, update
+
+
+# ═══════════════════════════════════════════════════════════════
+# JOURNAL D'ÉCRITURES DIFFÉRÉES
+# ═══════════════════════════════════════════════════════════════
+
+class TradeJournal:
+    """
+    Write-behind des événements de trade.
+    record() ajoute l'événement à un fichier append-only puis à une file mémoire
+    et rend la main immédiatement ; un thread écrit les lots via bulk_write.
+    Si MongoDB est indisponible, le lot est retenté avec backoff ; au démarrage,
+    le fichier est rejoué. Les écritures étant des upserts idempotents, rejouer
+    un événement déjà écrit est sans effet : aucun enregistrement n'est perdu.
+    Le fichier est vidé dès que tout ce qu'il contient a été écrit en base.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100,
+                 flush_interval: float = 1.0, max_retry_delay: float = 60.0):
+        self.path            = path
+        self.batch_size      = batch_size
+        self.flush_interval  = flush_interval
+        self.max_retry_delay = max_retry_delay
+
+        self._queue     = queue.Queue()
+        self._file_lock = threading.Lock()
+        self._seq       = 0      # dernier événement journalisé
+        self._committed = 0      # dernier événement écrit en base
+        self._thread    = None
+        self._task_mode = False
+        self._stopping  = threading.Event()
+
+        self.written        = 0
+        self.last_latency   = 0.0    # secondes, dernier bulk_write réussi
+        self.failures       = 0
+
+    # ── Cycle de vie ───────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        if self._task_mode:
+            return not self._stopping.is_set()
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, writer_thread: bool = True):
+        """
+        Rejoue le fichier puis démarre le writer. writer_thread=False : le writer
+        est lancé par l'appelant en tâche asyncio (run_async).
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        replayed = self._replay()
+        if replayed:
+            logging.info(f"💾 Journal DB : {replayed} événement(s) rejoué(s)")
+        if not writer_thread:
+            self._task_mode = True
+            return
+        self._thread = threading.Thread(target=self._run, name="DB-Writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Vide la file puis arrête le writer ; le reliquat reste dans le fichier."""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+        if self.depth():
+            logging.warning(f"💾 Journal DB : {self.depth()} événement(s) conservé(s) sur disque")
+
+    async def stop_async(self, task: asyncio.Task, timeout: float = 10.0):
+        """Équivalent de stop() pour le writer lancé en tâche asyncio."""
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(task, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        if self.depth():
+            logging.warning(f"💾 Journal DB : {self.depth()} événement(s) conservé(s) sur disque")
+
+    def depth(self) -> int:
+        return self._seq - self._committed
+
+    # ── Producteurs ────────────────────────────────────────────
+
+    def record(self, event: dict):
+        with self._file_lock:
+            self._seq += 1
+            event = dict(event, seq=self._seq)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(event, default=_json_default) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._queue.put(event)
+
+    def _replay(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with self._file_lock, open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue   # Ligne tronquée (arrêt brutal pendant l'écriture)
+                event["ts"] = datetime.fromisoformat(event["ts"])
+                self._seq   = max(self._seq, event.get("seq", 0))
+                self._queue.put(event)
+                count += 1
+        self._committed = max(0, self._seq - count)
+        return count
+
+    # ── Writer ─────────────────────────────────────────────────
+
+    def _run(self):
+        delay = 1.0
+        batch = []
+        while True:
+            if not batch:
+                batch = self._next_batch()
+                if not batch:
+                    if self._stopping.is_set():
+                        return
+                    continue
+            if self._write_batch(batch):
+                batch, delay = [], 1.0
+                continue
+            if self._stopping.is_set():
+                return
+            self._stopping.wait(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def run_async(self):
+        """
+        Writer sous forme de tâche asyncio (orchestrator.py) : lecture de la file
+        et bulk_write restent dans un thread dédié, la boucle n'est jamais bloquée.
+        Se termine une fois la file vidée après stop_async().
+        """
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="DB-Writer") as pool:
+            delay = 1.0
+            batch = []
+            while True:
+                if not batch:
+                    batch = await loop.run_in_executor(pool, self._next_batch)
+                    if not batch:
+                        if self._stopping.is_set():
+                            return
+                        continue
+                if await loop.run_in_executor(pool, self._write_batch, batch):
+                    batch, delay = [], 1.0
+                    continue
+                if self._stopping.is_set():
+                    return
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def _write_batch(self, batch: list) -> bool:
+        try:
+            t0 = time.perf_counter()
+            self._write(batch)
+            self.last_latency = time.perf_counter() - t0
+            observe("db_write_seconds", self.last_latency, mode="batch")
+            self.written     += len(batch)
+            self._commit(batch[-1]["seq"])
+            return True
+        except Exception as e:
+            self.failures += 1
+            logging.error(f"💾 Journal DB : écriture différée échouée ({len(batch)} évt) : {e}")
+            return False
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list):
+        """Un bulk_write ordonné par collection (l'ordre open → close est conservé)."""
+        grouped: dict = {}
+        for event in batch:
+            col, key, update = _build_write(event)
+            grouped.setdefault(col.full_name, (col, []))[1].append(
+                UpdateOne(key, update, upsert=True)
+            )
+        for col, ops in grouped.values():
+            col.bulk_write(ops, ordered=True)
+
+    def _commit(self, seq: int):
+        with self._file_lock:
+            self._committed = max(self._committed, seq)
+            if self._committed >= self._seq:
+                # Tout est en base : le journal repart à zéro
+                open(self.path, "w", encoding="utf-8").close()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(value)}")
+
+
+_journal: TradeJournal | None = None
+
+
+def _submit(event: dict):
+    """Journalise l'événement (write-behind) ou l'écrit directement."""
+    if _journal is not None and _journal.running:
+        _journal.record(event)
+        return
+    col, key, update = _build_write(event)
+    t0 = time.perf_counter()
+    col.update_one(key, update, upsert=True)
+    observe("db_write_seconds", time.perf_counter() - t0, mode="direct")
+
+
 # ═══════════════════════════════════════════════════════════════
 # API PUBLIQUE
 # ═══════════════════════════════════════════════════════════════
 
-def init_db():
-    """Initialise la connexion DB (appelée au démarrage du bot)."""
+def _ping_db():
     try:
         mgr = _get_manager()
         # Test rapide de connectivité
         mgr.client.admin.command('ping')
-        logging.info("💾 MongoDB connecté avec succès")
+        logging.info(f"💾 MongoDB connecté avec succès (schéma {STORAGE_SCHEMA})")
     except Exception as e:
         logging.error(f"❌ Erreur connexion MongoDB : {e}")
 
 
+def init_db(writer_thread: bool = True, background_ping: bool = False):
+    """
+    Initialise la connexion DB (appelée au démarrage du bot).
+    writer_thread=False   : le writer du journal est lancé en tâche asyncio (orchestrator.py).
+    background_ping=True  : test de connectivité (jusqu'à 5 s) sans bloquer le démarrage.
+    """
+    global _journal
+    # Le journal démarre même si MongoDB est injoignable : il rejouera plus tard
+    if DB_WRITE_BEHIND and _journal is None:
+        _journal = TradeJournal(DB_JOURNAL_PATH)
+        _journal.start(writer_thread)
+
+    if background_ping:
+        threading.Thread(target=_ping_db, name="DB-Ping", daemon=True).start()
+    else:
+        _ping_db()
+
+
+def close_db(timeout: float = 10.0):
+    """Écrit les événements en attente avant l'arrêt du bot."""
+    if _journal is not None:
+        _journal.stop(timeout)
+
+
+def get_journal() -> TradeJournal | None:
+    return _journal
+
+
 def save_open(account_number: int, symbol: str, ticket: int,
-              type_trade: str, price: float):
+              type_trade: str, price: float, ts: datetime = None):
     """
     Enregistre l'ouverture d'un trade.
     Utilise upsert pour éviter les doublons en cas de retry.
+    ts : heure d'ouverture réelle (UTC) si elle est connue — position reprise
+    au redémarrage ; par défaut, maintenant.
     """
     try:
-        col = _get_manager().get_collection(account_number, symbol)
-        col.update_one(
-            {"ticket": ticket},
-            {"$setOnInsert": {
-                "ticket":     ticket,
-                "symbol":     symbol,
-                "type":       type_trade,
-                "open_price": float(price),
-                "open_time":  datetime.utcnow(),
-                "status":     "OPEN",
-                "account":    account_number,
-                "profit":     None,
-            }},
-            upsert=True
-        )
+        _submit({
+            "op":      "open",
+            "account": account_number,
+            "symbol":  symbol,
+            "ticket":  ticket,
+            "type":    type_trade,
+            "price":   float(price),
+            "ts":      ts or clock.utcnow(),
+        })
     except Exception as e:
         logging.error(f"save_open [compte {account_number} #{ticket}] : {e}")
 
@@ -91,16 +453,39 @@ def save_close(account_number: int, symbol: str, ticket: int,
     Si le document n'existe pas (sync tardive), il est créé via upsert.
     """
     try:
-        col = _get_manager().get_collection(account_number, symbol)
-        col.update_one(
-            {"ticket": ticket},
-            {"$set": {
-                "close_price": float(price),
-                "close_time":  datetime.utcnow(),
-                "profit":      round(float(profit), 2),
-                "status":      status,
-            }},
-            upsert=True
-        )
+        _submit({
+            "op":      "close",
+            "account": account_number,
+            "symbol":  symbol,
+            "ticket":  ticket,
+            "profit":  float(profit),
+            "price":   float(price),
+            "status":  status,
+            "ts":      clock.utcnow(),
+        })
     except Exception as e:
         logging.error(f"save_close [compte {account_number} #{ticket}] : {e}")
+
+
+def find_open_trades(account_number: int, symbols: list) -> list[dict]:
+    """
+    Trades encore « OPEN » en base pour ces symboles ({'symbol', 'ticket'}).
+    Sert au rapprochement avec les positions du terminal au démarrage.
+    """
+    try:
+        mgr = _get_manager()
+        if STORAGE_SCHEMA == "UNIFIED":
+            query = trades_query(account_number, status="OPEN")
+            query["symbol"] = {"$in": list(symbols)}
+            docs = mgr.get_trades_collection().find(query, {"symbol": 1, "ticket": 1})
+            return [{"symbol": d["symbol"], "ticket": d["ticket"]} for d in docs]
+
+        trades = []
+        for symbol in symbols:
+            col = mgr.get_collection(account_number, symbol)
+            trades.extend({"symbol": symbol, "ticket": d["ticket"]}
+                          for d in col.find({"status": "OPEN"}, {"ticket": 1}))
+        return trades
+    except Exception as e:
+        logging.error(f"find_open_trades [compte {account_number}] : {e}")
+        return []
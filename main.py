@@ -6,22 +6,38 @@ Stratégie : Croisement EMA20/EMA50 avec filtre de tendance M5,
             2% de risque par trade, break-even + trailing stop ATR.
 """
 
-import MetaTrader5 as mt5
 import time
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-from config import SYMBOL, ACCOUNT_NUMBER
-from utils import setup_logging
-from database import init_db
-from connexion import connect_to_mt5, disconnect
+from config import (SYMBOL, ACCOUNT_NUMBER, MAGIC_NUMBER, BAR_ARCHIVE_ENABLED, TICK_RECORDER,
+                    RESAMPLE_ENABLED, ASYNC_RUNTIME, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID,
+                    LOG_LEVEL, LOG_FILE_LEVEL)
+from utils import setup_logging, telegram_queue_depth, get_telegram_dispatcher, shutdown_telegram
+from database import init_db, close_db, get_journal
+from metrics import start_summary_dumper, start_http_server, register_gauge, register_route
+import clock
+import profiler
+from bar_archive import BarArchive
+from bar_store import BAR_STORE
+from tick_recorder import TickRecorder
+from connexion import connect_to_mt5, disconnect, CONNECTION
+from positions import POSITIONS
+from order_scheduler import ORDERS, PRIORITY_TRAIL
+from orchestrator import Orchestrator, run_orchestrator, new_loop
 from strategy import (
     get_signal,
     open_trade,
     monitor_active_trade,
+    run_monitor,
+    recover_open_positions,
+    warm_start,
     is_volatility_good,
+    volatility_retry_delay,
     prepare_trade_request,
+    TF_M1, TF_M15, TF_M30, TF_SECONDS,
     _mt5_lock,          # Mutex partagé entre strategy et main
 )
 
@@ -50,7 +66,7 @@ def execute_trade(symbol: str, signal: dict, multi_manager=None) -> tuple:
         if request is None:
             return None, 0, None
 
-        results = multi_manager.execute_trade_all_accounts(request)
+        results = multi_manager.execute_trade_all_accounts(request, signal.get("_exec_spec"))
 
         if results:
             first   = results[0]
@@ -65,6 +81,11 @@ def execute_trade(symbol: str, signal: dict, multi_manager=None) -> tuple:
         return ticket, lot, ACCOUNT_NUMBER
 
 
+def open_positions_count() -> int:
+    """Jauge /metrics : positions ouvertes portant notre MAGIC_NUMBER."""
+    return POSITIONS.snapshot().count(MAGIC_NUMBER)
+
+
 # ═══════════════════════════════════════════════════════════════
 # BOUCLE D'ANALYSE PAR SYMBOLE
 # ═══════════════════════════════════════════════════════════════
@@ -77,27 +98,24 @@ def run_bot_for_symbol(symbol: str, multi_manager=None):
 
     while True:
         try:
-            # ── Vérification connexion MT5 ──
-            with _mt5_lock:
-                info = mt5.terminal_info()
-            if not info or not info.connected:
-                logging.warning(f"[{symbol}] MT5 non connecté, attente...")
-                time.sleep(5)
+            # ── Connexion MT5 (surveillée par CONNECTION, un seul thread) ──
+            if not CONNECTION.wait(timeout=60):
+                logging.warning(f"[{symbol}] MT5 toujours déconnecté, attente...")
                 continue
 
             # ── Filtre de volatilité ──
             vol_ok, reason = is_volatility_good(symbol)
             if not vol_ok:
-                logging.debug(f"[{symbol}] {reason}")
-                time.sleep(300)
+                # Réveil à la clôture M30 suivante, quand le régime est réévalué
+                delay = volatility_retry_delay(symbol)
+                logging.debug(f"[{symbol}] {reason} → prochaine évaluation dans {delay:.0f}s")
+                clock.sleep(delay)
                 continue
 
-            # ── Position déjà ouverte sur ce symbole ? ──
-            with _mt5_lock:
-                existing = mt5.positions_get(symbol=symbol)
-            if existing:
+            # ── Position déjà ouverte sur ce symbole ? (carnet partagé) ──
+            if POSITIONS.snapshot().has_symbol(symbol):
                 logging.debug(f"[{symbol}] Position déjà ouverte, surveillance...")
-                time.sleep(10)
+                clock.sleep(10)
                 continue
 
             # ── Analyse du signal ──
@@ -115,31 +133,128 @@ def run_bot_for_symbol(symbol: str, multi_manager=None):
                 else:
                     logging.error(f"❌ Échec ouverture trade | {symbol}")
 
-            time.sleep(10)
+            clock.sleep(10)
 
         except Exception as e:
             logging.error(f"❌ Exception thread [{symbol}] : {e}", exc_info=True)
-            time.sleep(10)
+            clock.sleep(10)
+
+
+def run_threads(symbols: list, multi_manager=None, tick_recorder=None):
+    """Runtime historique : un thread par symbole, process maintenu par une boucle d'attente."""
+    threads = []
+
+    # Positions ouvertes avant le démarrage : surveillance reprise immédiatement
+    for monitor in recover_open_positions(symbols):
+        t = threading.Thread(target=run_monitor, args=(monitor,),
+                             name=f"Monitor-{monitor.ticket}", daemon=True)
+        t.start()
+
+    for symbol in symbols:
+        t = threading.Thread(
+            target=run_bot_for_symbol,
+            args=(symbol, multi_manager),
+            name=f"Thread-{symbol}",
+            daemon=True,
+        )
+        t.start()
+        threads.append(t)
+
+    # Boucle principale — maintient le process vivant
+    try:
+        while True:
+            time.sleep(2)
+    except KeyboardInterrupt:
+        logging.info("⏹️ Arrêt demandé par l'utilisateur...")
+        for t in threads:
+            t.join(timeout=2)
+    finally:
+        POSITIONS.stop()
+        ORDERS.stop()
+        if tick_recorder:
+            tick_recorder.stop()
+        if multi_manager:
+            multi_manager.disconnect_all()
+        close_db()
+        disconnect()
+        logging.info("🛑 Bot arrêté proprement")
 
 
 # ═══════════════════════════════════════════════════════════════
 # POINT D'ENTRÉE
 # ═══════════════════════════════════════════════════════════════
 
-if __name__ == "__main__":
+def abort_startup(boot: ThreadPoolExecutor, metrics_server=None):
+    """Échec du démarrage : journal DB vidé, alertes envoyées, services arrêtés, sortie 1."""
+    boot.shutdown(wait=False, cancel_futures=True)
+    close_db()
+    shutdown_telegram()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    exit(1)
+
+
+def main(symbols: list = None, terminal_path: str = None, log_suffix: str = "",
+         multi_account: bool = True):
+    """
+    Démarrage complet du bot (bloquant jusqu'à l'arrêt).
+    symbols / terminal_path / log_suffix : utilisés par supervisor.py pour
+    lancer un shard sur une partie des symboles et son propre terminal.
+    """
+    started = time.perf_counter()
+    symbols = list(symbols or SYMBOL)
+    # Nom de niveau inconnu : getLevelName renvoie une chaîne → INFO
+    console_level, file_level = (
+        lvl if isinstance(lvl, int) else logging.INFO
+        for lvl in (logging.getLevelName(LOG_LEVEL), logging.getLevelName(LOG_FILE_LEVEL))
+    )
     setup_logging(
-        level=logging.INFO,
-        console_level=logging.INFO,
-        file_level=logging.DEBUG,
+        level=min(console_level, file_level),   # Racine : les handlers filtrent ensuite
+        console_level=console_level,
+        file_level=file_level,
+        log_suffix=log_suffix,
     )
 
-    # Initialisation DB
-    init_db()
+    # Runtime asyncio : boucle créée d'abord pour y attacher alertes et writer DB
+    loop = new_loop() if ASYNC_RUNTIME else None
+
+    # Archive de barres : démarrage à chaud des indicateurs + archivage des barres clôturées
+    if BAR_ARCHIVE_ENABLED:
+        BAR_STORE.attach_archive(BarArchive())
+
+    # Initialisation DB : journal prêt immédiatement, test MongoDB (jusqu'à 5 s) en arrière-plan
+    init_db(writer_thread=not ASYNC_RUNTIME, background_ping=True)
+
+    # En parallèle de la connexion terminal : pandas_ta + barres archivées, client Telegram
+    boot   = ThreadPoolExecutor(max_workers=2, thread_name_prefix="Boot")
+    warmed = boot.submit(warm_start, symbols)
+    if not ASYNC_RUNTIME and TELEGRAM_TOKEN and TELEGRAM_CHAT_ID:
+        boot.submit(get_telegram_dispatcher)
+
+    # Résumé périodique des latences (si METRICS_ENABLED=1) + endpoint /metrics
+    start_summary_dumper()
+    register_gauge("telegram_queue_depth", telegram_queue_depth,
+                   "Alertes Telegram en attente d'envoi")
+    register_gauge("db_journal_depth", lambda: get_journal().depth() if get_journal() else 0,
+                   "Événements de trade pas encore écrits en base")
+    register_gauge("open_positions", open_positions_count,
+                   "Positions ouvertes par le bot (MAGIC_NUMBER)")
+    register_gauge("terminal_connected", lambda: int(CONNECTION.is_connected()),
+                   "Terminal MT5 connecté (1) ou en reconnexion (0)")
+    register_gauge("order_queue_depth", ORDERS.depth,
+                   "Ordres en attente dans l'ordonnanceur (toutes priorités)")
+    register_gauge("order_queue_trail_depth", lambda: ORDERS.depth(PRIORITY_TRAIL),
+                   "Modifications SL/TP (trailing) en attente")
+    register_route("/profile", profiler.http_route)
+    metrics_server = start_http_server()
+
+    # Profiler à chaud : fichier de contrôle, SIGUSR1 ou /profile
+    profiler.install()
 
     # Gestion multi-comptes
     multi_manager = None
 
-    if MULTI_ACCOUNT_AVAILABLE and MODE == "MULTI":
+    if multi_account and MULTI_ACCOUNT_AVAILABLE and MODE == "MULTI":
         logging.info("🔗 Mode MULTI-COMPTES activé")
         multi_manager      = MultiAccountManager(ACCOUNTS)
         connection_results = multi_manager.connect_all()
@@ -147,44 +262,57 @@ if __name__ == "__main__":
         logging.info(f"✅ {connected_count}/{len(ACCOUNTS)} compte(s) connecté(s)")
 
         # Connexion du compte principal pour les analyses
-        if not connect_to_mt5():
+        if not connect_to_mt5(terminal_path=terminal_path):
             logging.error("❌ Échec connexion compte principal")
-            exit(1)
+            abort_startup(boot, metrics_server)
     else:
-        if not connect_to_mt5():
+        if not connect_to_mt5(terminal_path=terminal_path):
             logging.error("❌ Échec connexion MT5")
-            exit(1)
+            abort_startup(boot, metrics_server)
+
+    # Préchargement requis avant les premières analyses
+    logging.info(f"⚡ {warmed.result()} barre(s) préchargée(s) depuis l'archive")
+    boot.shutdown()
+
+    # Surveillance de la connexion : re-login / redémarrage sans relancer le bot
+    CONNECTION.start(terminal_path, terminal_lock=_mt5_lock)
+
+    # Carnet de positions : thread dédié, ou tâche de l'orchestrateur en mode asyncio
+    POSITIONS.start(terminal_lock=_mt5_lock, thread=not ASYNC_RUNTIME)
+
+    # Ordonnanceur des ordres : débit par compte, entrées avant trailing, SL coalescés
+    ORDERS.start()
+
+    # Un seul flux M1 par symbole : M15/M30 agrégés localement après vérification
+    if RESAMPLE_ENABLED:
+        BAR_STORE.enable_resampling({tf: TF_SECONDS[tf] for tf in (TF_M15, TF_M30)}, base=TF_M1)
+        for symbol in symbols:
+            for tf in (TF_M15, TF_M30):
+                BAR_STORE.verify_resampling(symbol, tf)
+
+    # Enregistrement des ticks pour le rejeu (sim_terminal.py)
+    tick_recorder = TickRecorder(symbols) if TICK_RECORDER else None
+    if tick_recorder:
+        tick_recorder.start()
 
     logging.info("=" * 65)
     logging.info(f"🚀 BOT DÉMARRÉ (Mode: {MODE})")
     logging.info(f"📊 Stratégie : EMA 20/50 Crossover | 2% risque | R:R 1:2")
     logging.info(f"⏰ Timeframes : M5 (tendance) + M1 (signal)")
-    logging.info(f"📈 Symboles : {', '.join(SYMBOL)}")
+    logging.info(f"📈 Symboles : {', '.join(symbols)}")
+    logging.info(f"⚡ Démarrage : {time.perf_counter() - started:.2f}s")
     logging.info("=" * 65)
 
-    # Démarrage d'un thread par symbole
-    threads = []
-    for symbol in SYMBOL:
-        t = threading.Thread(
-            target=run_bot_for_symbol,
-            args=(symbol, multi_manager),
-            name=f"Thread-{symbol}",
-            daemon=True,
-        )
-        t.start()
-        threads.append(t)
-        time.sleep(2)   # Décalage pour éviter les pics de charge au démarrage
+    if ASYNC_RUNTIME:
+        # Pipelines et moniteurs en tâches asyncio ; arrêt géré par l'orchestrateur
+        try:
+            run_orchestrator(loop, Orchestrator(symbols, execute_trade, multi_manager))
+        finally:
+            if tick_recorder:
+                tick_recorder.stop()
+    else:
+        run_threads(symbols, multi_manager, tick_recorder)
 
-    # Boucle principale — maintient le process vivant
-    try:
-        while True:
-            time.sleep(2)
-    except KeyboardInterrupt:
-        logging.info("⏹️ Arrêt demandé par l'utilisateur...")
-        for t in threads:
-            t.join(timeout=2)
-    finally:
-        if multi_manager:
-            multi_manager.disconnect_all()
-        disconnect()
-        logging.info("🛑 Bot arrêté proprement")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+"""
+Instrumentation légère du pipeline M30 → M15 → M1.
+Histogrammes de durées (secondes) par étape, par symbole et par appel terminal,
+attente du verrou MT5 mesurée séparément du temps d'appel.
+
+Désactivé (METRICS_ENABLED=0) : les timers renvoient un context manager vide
+partagé et les décorateurs appellent directement la fonction — coût négligeable.
+
+Compteurs et jauges (cycles, signaux, ordres, SL, files d'attente) sont toujours
+tenus ; METRICS_PORT > 0 les expose au format texte Prometheus sur /metrics.
+"""
+import functools
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from config import METRICS_ENABLED, METRICS_DUMP_INTERVAL, METRICS_HOST, METRICS_PORT
+
+# Bornes supérieures des buckets (secondes) — de 0.5 ms à 30 s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NULL = nullcontext()
+_enabled = METRICS_ENABLED
+
+
+def enable(flag: bool = True):
+    """Active / désactive l'instrumentation à chaud."""
+    global _enabled
+    _enabled = flag
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+# ═══════════════════════════════════════════════════════════════
+# HISTOGRAMMES
+# ═══════════════════════════════════════════════════════════════
+
+class Histogram:
+    """Histogramme cumulatif à buckets fixes (compatible format Prometheus)."""
+
+    __slots__ = ("buckets", "counts", "sum", "count", "max", "_lock")
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts  = [0] * (len(buckets) + 1)   # dernier = +Inf
+        self.sum     = 0.0
+        self.count   = 0
+        self.max     = 0.0
+        self._lock   = threading.Lock()
+
+    def observe(self, value: float):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum   += value
+            self.count += 1
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Quantile approché (borne supérieure du bucket, plafonnée au max observé)."""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen   = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self.buckets[idx], self.max) if idx < len(self.buckets) else self.max
+        return self.max
+
+
+def _label_key(labels: dict) -> tuple:
+    """Labels triés, valeurs en texte : un même label peut recevoir 10009 puis "none"."""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Histogrammes indexés par (nom, labels triés)."""
+
+    def __init__(self):
+        self._histograms: dict = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        key  = (name, _label_key(labels))
+        hist = self._histograms.get(key)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(key, Histogram())
+        return hist
+
+    def items(self) -> list:
+        with self._lock:
+            return list(self._histograms.items())
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+REGISTRY = Registry()
+
+
+# ═══════════════════════════════════════════════════════════════
+# COMPTEURS ET JAUGES
+# ═══════════════════════════════════════════════════════════════
+
+class Counters:
+    """Compteurs monotones indexés par (nom, labels triés)."""
+
+    def __init__(self):
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, name: str, **labels) -> float:
+        return self._values.get((name, _label_key(labels)), 0)
+
+    def items(self) -> list:
+        with self._lock:
+            return list(self._values.items())
+
+
+COUNTERS = Counters()
+
+# Jauges évaluées à chaque scrape : nom → (fonction, description)
+_gauges: dict = {}
+
+# Descriptions (# HELP) des séries exportées
+HELP = {
+    "analysis_cycles_total":   "Cycles d'analyse M30→M15→M1 par symbole",
+    "signals_total":           "Issues de l'analyse : signal ou motif de rejet",
+    "orders_sent_total":       "Ordres d'ouverture envoyés au terminal",
+    "order_results_total":     "Résultats d'ordres par retcode (10009 = exécuté)",
+    "sl_modifications_total":  "Modifications SL/TP (trailing, break-even)",
+    "order_jobs_total":        "Envois de l'ordonnanceur d'ordres par priorité",
+    "order_coalesced_total":   "Modifications SL/TP remplacées par une cible plus récente",
+    "order_throttled_total":   "Ordres retenus par le seau à jetons de leur compte",
+    "order_broker_throttled_total": "Réponses « trop de requêtes » du broker",
+    "order_queue_wait_seconds": "Attente des ordres dans l'ordonnanceur",
+    "stage_seconds":           "Durée des étapes du pipeline",
+    "terminal_call_seconds":   "Durée des appels au terminal MT5",
+    "lock_wait_seconds":       "Attente d'acquisition des verrous",
+    "lock_held_seconds":       "Durée de détention des verrous",
+    "db_write_seconds":        "Latence des écritures MongoDB (lots)",
+}
+
+
+def inc(name: str, amount: float = 1, **labels):
+    """Incrémente un compteur (toujours actif, indépendant de METRICS_ENABLED)."""
+    COUNTERS.inc(name, amount, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """
+    Ajoute une observation à un histogramme, même instrumentation désactivée :
+    réservé aux événements peu fréquents (écritures DB, ordres).
+    """
+    REGISTRY.histogram(name, **labels).observe(value)
+
+
+def register_gauge(name: str, func, help_text: str = ""):
+    """Déclare une jauge calculée au moment du scrape (func() → nombre)."""
+    _gauges[name] = (func, help_text)
+
+
+# ═══════════════════════════════════════════════════════════════
+# TIMERS
+# ═══════════════════════════════════════════════════════════════
+
+class _Timer:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist: Histogram):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0)
+        return False
+
+
+def timer(name: str, **labels):
+    """Context manager : durée du bloc → histogramme `name{labels}`."""
+    if not _enabled:
+        return _NULL
+    return _Timer(REGISTRY.histogram(name, **labels))
+
+
+def stage_timer(stage: str, symbol: str):
+    """Durée d'une étape du pipeline pour un symbole."""
+    if not _enabled:
+        return _NULL
+    return _Timer(REGISTRY.histogram("stage_seconds", stage=stage, symbol=symbol))
+
+
+def terminal_timer(call: str, symbol: str = ""):
+    """Durée d'un appel au terminal MT5 (hors attente du verrou)."""
+    if not _enabled:
+        return _NULL
+    return _Timer(REGISTRY.histogram("terminal_call_seconds", call=call, symbol=symbol))
+
+
+def timed_stage(stage: str):
+    """
+    Décorateur : mesure la fonction comme étape `stage`.
+    Le symbole est lu dans le premier argument positionnel.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            symbol = args[0] if args and isinstance(args[0], str) else ""
+            with _Timer(REGISTRY.histogram("stage_seconds", stage=stage, symbol=symbol)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TimedLock:
+    """
+    Verrou dont le temps d'attente (acquisition) est mesuré séparément
+    du temps pendant lequel il est détenu.
+    S'utilise exactement comme threading.Lock (with / acquire / release).
+    """
+
+    def __init__(self, name: str):
+        self.name     = name
+        self._lock    = threading.Lock()
+        self._held_t0 = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if not _enabled:
+            return self._lock.acquire(blocking, timeout)
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        t1 = time.perf_counter()
+        REGISTRY.histogram("lock_wait_seconds", lock=self.name).observe(t1 - t0)
+        self._held_t0 = t1 if ok else 0.0
+        return ok
+
+    def release(self):
+        held, self._held_t0 = self._held_t0, 0.0
+        self._lock.release()
+        if held and _enabled:
+            REGISTRY.histogram("lock_held_seconds", lock=self.name).observe(time.perf_counter() - held)
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+# ═══════════════════════════════════════════════════════════════
+# RÉSUMÉ PÉRIODIQUE
+# ═══════════════════════════════════════════════════════════════
+
+def _format_labels(labels: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def summary() -> list:
+    """Résumé trié par temps total : (nom, labels, count, p50, p95, max, total)."""
+    rows = []
+    for (name, labels), hist in REGISTRY.items():
+        if hist.count:
+            rows.append((name, _format_labels(labels), hist.count,
+                         hist.quantile(0.5), hist.quantile(0.95), hist.max, hist.sum))
+    rows.sort(key=lambda r: r[-1], reverse=True)
+    return rows
+
+
+def log_summary(limit: int = 25):
+    rows = summary()
+    if not rows:
+        return
+    logging.info("⏱️ Latences (count | p50 | p95 | max | total)")
+    for name, labels, count, p50, p95, mx, total in rows[:limit]:
+        logging.info("   %-22s %-45s %6d | %7.1fms | %7.1fms | %7.1fms | %7.2fs",
+                     name, labels[:45], count, p50 * 1e3, p95 * 1e3, mx * 1e3, total)
+
+
+def start_summary_dumper(interval: float = METRICS_DUMP_INTERVAL) -> threading.Thread | None:
+    """Écrit périodiquement le résumé des latences dans les logs."""
+    if interval <= 0:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            if _enabled:
+                log_summary()
+
+    t = threading.Thread(target=_loop, name="Metrics-Dump", daemon=True)
+    t.start()
+    return t
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXPORT PROMETHEUS
+# ═══════════════════════════════════════════════════════════════
+
+def _prom_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    body = ",".join(
+        '%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+def render_prometheus() -> str:
+    """Toutes les séries au format d'exposition texte Prometheus."""
+    lines   = []
+    typed   = set()
+    prefix  = "synfxbot_"
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {prefix}{name} {HELP[name]}")
+            lines.append(f"# TYPE {prefix}{name} {kind}")
+
+    for (name, labels), value in sorted(COUNTERS.items(), key=lambda kv: kv[0]):
+        header(name, "counter")
+        lines.append(f"{prefix}{name}{_prom_labels(labels)} {value}")
+
+    for name, (func, help_text) in sorted(_gauges.items()):
+        try:
+            value = float(func())
+        except Exception as e:
+            logging.debug(f"Jauge {name} indisponible : {e}")
+            continue
+        if help_text:
+            HELP.setdefault(name, help_text)
+        header(name, "gauge")
+        lines.append(f"{prefix}{name} {value}")
+
+    for (name, labels), hist in sorted(REGISTRY.items(), key=lambda kv: kv[0]):
+        header(name, "histogram")
+        cumulative = 0
+        for bound, n in zip(hist.buckets, hist.counts):
+            cumulative += n
+            lines.append(f"{prefix}{name}_bucket{_prom_labels(labels, (('le', bound),))} {cumulative}")
+        lines.append(f"{prefix}{name}_bucket{_prom_labels(labels, (('le', '+Inf'),))} {hist.count}")
+        lines.append(f"{prefix}{name}_sum{_prom_labels(labels)} {hist.sum}")
+        lines.append(f"{prefix}{name}_count{_prom_labels(labels)} {hist.count}")
+
+    return "\n".join(lines) + "\n"
+
+
+# Routes additionnelles de l'endpoint : chemin → func(query) → texte
+_routes: dict = {}
+
+
+def register_route(path: str, func):
+    """Ajoute une route GET (ex. /profile) à l'endpoint métriques."""
+    _routes[path] = func
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/metrics":
+            body = render_prometheus()
+        elif url.path in _routes:
+            body = _routes[url.path](parse_qs(url.query))
+        else:
+            self.send_error(404)
+            return
+        body = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass   # Pas de log par scrape
+
+
+def start_http_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> ThreadingHTTPServer | None:
+    """Démarre l'endpoint /metrics dans un thread (port 0 = désactivé)."""
+    if port <= 0:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logging.error(f"❌ Endpoint métriques indisponible ({host}:{port}) : {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="Metrics-HTTP", daemon=True).start()
+    logging.info(f"📈 Métriques exposées sur http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,127 @@
+"""
+Migration du stockage MongoDB : schéma PER_SYMBOL → schéma UNIFIED.
+Copie chaque collection trading_bot_{compte} / {symbole} dans la collection
+unique {DB_NAME} / {COLLECTION_NAME}, indexée par (account, symbol, open_time)
+et (account, status).
+
+La migration est idempotente (upsert sur account + ticket) : elle peut être
+relancée sans créer de doublons. Les collections sources ne sont pas supprimées.
+Une fois terminée, passer STORAGE_SCHEMA=UNIFIED dans le .env.
+"""
+import argparse
+import logging
+import re
+
+from pymongo import UpdateOne
+
+from accounts_config import ACCOUNTS
+from config import DB_NAME, COLLECTION_NAME, SYMBOL
+from database import _get_manager, ensure_trades_indexes, safe_symbol
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+BATCH_SIZE = 1000
+_ACCOUNT_DB = re.compile(r"^trading_bot_(\d+)$")
+
+# Nom de collection → symbole d'origine (safe_symbol n'est pas réversible : casse, parenthèses)
+_COLLECTION_SYMBOLS = {safe_symbol(s): s for s in SYMBOL}
+
+
+def discover_accounts(client) -> list[int]:
+    """Liste les comptes présents en base (bases nommées trading_bot_{compte})."""
+    found = []
+    for name in client.list_database_names():
+        match = _ACCOUNT_DB.match(name)
+        if match:
+            found.append(int(match.group(1)))
+    return sorted(found)
+
+
+def symbol_for_collection(col_name: str) -> str:
+    """Symbole d'une collection PER_SYMBOL : config.SYMBOL, sinon reconstruction approximative."""
+    symbol = _COLLECTION_SYMBOLS.get(col_name)
+    if symbol is None:
+        symbol = col_name.replace("_", " ").title()
+        logging.warning(f"⚠️ {col_name} absent de config.SYMBOL → symbole deviné : « {symbol} »")
+    return symbol
+
+
+def migrate_account(client, target, account_number: int, dry_run: bool = False) -> int:
+    """Copie toutes les collections d'un compte vers la collection unifiée."""
+    db    = client[f"trading_bot_{account_number}"]
+    total = 0
+
+    for col_name in db.list_collection_names():
+        ops    = []
+        copied = 0
+        symbol = None
+        for doc in db[col_name].find():
+            doc.pop("_id", None)
+            doc["account"] = doc.get("account") or account_number
+            # Ancienne sync tardive : le symbole peut manquer, on le déduit de la collection
+            if not doc.get("symbol"):
+                symbol        = symbol or symbol_for_collection(col_name)
+                doc["symbol"] = symbol
+            ops.append(UpdateOne(
+                {"account": doc["account"], "ticket": doc["ticket"]},
+                {"$set": doc},
+                upsert=True,
+            ))
+            if len(ops) >= BATCH_SIZE:
+                copied += _flush(target, ops, dry_run)
+                ops = []
+        copied += _flush(target, ops, dry_run)
+        logging.info(f"   {col_name:<25} → {copied} trade(s)")
+        total += copied
+
+    return total
+
+
+def _flush(target, ops: list, dry_run: bool) -> int:
+    if not ops:
+        return 0
+    if not dry_run:
+        target.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migration PER_SYMBOL → UNIFIED")
+    parser.add_argument("--all", action="store_true",
+                        help="Migrer toutes les bases trading_bot_* (pas seulement accounts_config)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Compter les documents sans rien écrire")
+    args = parser.parse_args()
+
+    client = _get_manager().client
+    target = client[DB_NAME][COLLECTION_NAME]
+
+    if args.all:
+        accounts = discover_accounts(client)
+    else:
+        accounts = [a.account_number for a in ACCOUNTS]
+
+    print("=== MIGRATION DU STOCKAGE DES TRADES ===")
+    print(f"Cible : {DB_NAME}.{COLLECTION_NAME} | Comptes : {accounts}")
+    if args.dry_run:
+        print("Mode simulation : aucune écriture.")
+
+    confirm = input("Tapez 'O' pour continuer : ")
+    if confirm.strip().lower() != "o":
+        print("Annulé.")
+        return
+
+    if not args.dry_run:
+        ensure_trades_indexes(target)
+
+    for account_number in accounts:
+        logging.info(f"🔄 Migration compte {account_number}...")
+        count = migrate_account(client, target, account_number, args.dry_run)
+        logging.info(f"✅ Compte {account_number} : {count} trade(s) migré(s)")
+
+    print("=== MIGRATION TERMINÉE ===")
+    print("Activer le nouveau schéma avec STORAGE_SCHEMA=UNIFIED dans le .env")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,25 @@ Permet de connecter et d'exécuter des trades sur plusieurs comptes simultanéme
 
 Fix appliqué : utilisation du mutex _mt5_lock depuis strategy.py pour sérialiser
                toutes les opérations MT5 et éviter les conflits entre threads.
+
+Dimensionnement : size_orders() calcule le lot de chaque compte avant l'envoi,
+à partir du solde en cache (connect_account au démarrage, puis relu dans la
+session de chaque ordre, une fois l'ordre envoyé) et de la spec du symbole lue
+par prepare_trade_request — aucun aller-retour terminal avant les ordres ni
+session supplémentaire après.
 """
 import MetaTrader5 as mt5
 import logging
-import time
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 
+import clock
 from database import save_open
+from metrics import inc
+from order_scheduler import ORDERS, PRIORITY_URGENT
+from strategy import lot_for_risk, RISK_PER_TRADE
 
-# Mutex partagé (importé depuis strategy pour cohérence globale)
-# On utilise un lock local ici car strategy n'est pas encore chargé à ce stade
+# Verrou des sessions multi-comptes : une séquence connexion → opération → déconnexion à la fois
 import threading
 _local_lock = threading.Lock()
 
@@ -26,7 +34,7 @@ class AccountConfig:
     password:        str
     server:          str
     name:            str   = ""
-    risk_multiplier: float = 1.0   # 1.0 = même lot que le compte maître
+    risk_multiplier: float = 1.0   # × RISK_PER_TRADE (1.0 = même % de risque que le maître)
     enabled:         bool  = True
 
 
@@ -60,7 +68,7 @@ class MultiAccountManager:
             try:
                 if mt5.terminal_info():
                     mt5.shutdown()
-                    time.sleep(0.5)
+                    clock.sleep(0.5)
 
                 if not mt5.initialize():
                     logging.error(f"❌ Init MT5 échoué pour {account.account_number}: {mt5.last_error()}")
@@ -102,7 +110,16 @@ class MultiAccountManager:
 
     def execute_trade_on_account(self, account_number: int,
                                   trade_request: dict) -> Optional[dict]:
-        """Exécute un trade sur un compte spécifique (reconnexion → ordre → déconnexion)."""
+        """
+        Exécute un trade sur un compte spécifique (reconnexion → ordre → déconnexion).
+        trade_request est envoyé tel quel (volume déjà dimensionné par size_orders).
+        """
+        return ORDERS.call(lambda: self._send_on_account(account_number, trade_request),
+                           account=account_number, priority=PRIORITY_URGENT,
+                           symbol=trade_request["symbol"])
+
+    def _send_on_account(self, account_number: int, trade_request: dict) -> Optional[dict]:
+        """Séquence reconnexion → ordre → déconnexion (travail de l'ordonnanceur)."""
         account_config = next(
             (a for a in self.accounts if a.account_number == account_number), None
         )
@@ -114,7 +131,7 @@ class MultiAccountManager:
                 # Reconnexion au compte cible
                 if mt5.terminal_info():
                     mt5.shutdown()
-                    time.sleep(0.3)
+                    clock.sleep(0.3)
 
                 if not mt5.initialize():
                     logging.error(f"❌ Init MT5 échoué pour compte {account_number}")
@@ -127,20 +144,13 @@ class MultiAccountManager:
                     mt5.shutdown()
                     return None
 
-                # Ajustement du volume selon le multiplicateur de risque
-                if account_config.risk_multiplier != 1.0:
-                    orig                   = trade_request.get("volume", 0.01)
-                    trade_request["volume"] = round(
-                        orig * account_config.risk_multiplier,
-                        2
-                    )
-                    logging.info(
-                        f"📊 Volume ajusté {account_number}: {orig} → {trade_request['volume']} "
-                        f"(×{account_config.risk_multiplier})"
-                    )
-
+                inc("orders_sent_total", symbol=trade_request["symbol"], account=account_number)
                 result = mt5.order_send(trade_request)
+                # Solde relu dans la même session, après l'envoi : lot du prochain signal
+                self._cache_balance(account_number)
                 mt5.shutdown()
+                inc("order_results_total", symbol=trade_request["symbol"], account=account_number,
+                    retcode=result.retcode if result is not None else "none")
 
                 if result is None:
                     logging.error(f"❌ order_send retourné None pour {account_number}")
@@ -176,22 +186,69 @@ class MultiAccountManager:
                     pass
                 return None
 
-    def execute_trade_all_accounts(self, trade_request_template: dict) -> List[dict]:
-        """Exécute le même trade sur tous les comptes actifs."""
+    def execute_trade_all_accounts(self, trade_request_template: dict, spec=None) -> List[dict]:
+        """
+        Exécute le même trade sur tous les comptes actifs, chacun avec son propre lot.
+        spec : symbol_info lu par prepare_trade_request (dimensionnement des suiveurs).
+        """
+        orders  = self.size_orders(trade_request_template, spec)
         results = []
-        for account in self.accounts:
-            if not account.enabled:
-                continue
-            # Copie indépendante pour chaque compte
-            result = self.execute_trade_on_account(
-                account.account_number,
-                trade_request_template.copy()
-            )
+        for account_number, request in orders.items():
+            result = self.execute_trade_on_account(account_number, request)
             if result:
                 results.append(result)
-            time.sleep(0.5)
+            clock.sleep(0.5)
         return results
 
+    # ── Dimensionnement par compte ─────────────────────────────
+
+    def size_orders(self, trade_request_template: dict, spec=None) -> Dict[int, dict]:
+        """
+        Prépare, en un seul lot et avant tout envoi, la requête de chaque compte
+        actif : lot calculé sur le solde en cache du compte et la spec du symbole
+        fournie → chaque compte risque RISK_PER_TRADE × risk_multiplier de son
+        propre solde, sans appel terminal. Le modèle n'est jamais modifié.
+        """
+        symbol  = trade_request_template["symbol"]
+        sl_dist = abs(trade_request_template["price"] - trade_request_template["sl"])
+
+        orders = {}
+        for account in self.accounts:
+            if not account.enabled:
+                continue
+            cached = self.account_info_cache.get(account.account_number)
+            volume = trade_request_template["volume"]
+            if cached is None or spec is None:
+                logging.warning(
+                    f"⚠️ Lot {account.account_number} [{symbol}] : "
+                    f"{'solde' if cached is None else 'spec symbole'} indisponible "
+                    f"→ lot du maître {volume:.2f}"
+                )
+            else:
+                volume = lot_for_risk(cached["balance"], RISK_PER_TRADE * account.risk_multiplier,
+                                      sl_dist, spec)
+                logging.info(
+                    f"📊 Lot {account.account_number} [{symbol}] : Solde={cached['balance']:.2f} | "
+                    f"Risque={RISK_PER_TRADE * account.risk_multiplier:.2%} | Lot={volume:.2f}"
+                )
+            orders[account.account_number] = {**trade_request_template, "volume": volume}
+        return orders
+
+    def _cache_balance(self, account_number: int):
+        """Met à jour le solde en cache depuis la session ouverte (sans effet en cas d'échec)."""
+        cached = self.account_info_cache.get(account_number)
+        if cached is None:
+            return
+        try:
+            info = mt5.account_info()
+        except Exception as e:
+            logging.warning(f"⚠️ Solde {account_number} non relu : {e}")
+            return
+        if info is None:
+            return
+        cached["balance"] = info.balance
+        cached["equity"]  = info.equity
+
     # ── Utilitaires ────────────────────────────────────────────
 
     def get_account_info(self, account_number: int) -> Optional[dict]:
@@ -0,0 +1,241 @@
+"""
+Runtime asyncio du bot (ASYNC_RUNTIME=1) — remplace les threads par symbole.
+  - un pipeline par symbole et un moniteur par position : tâches asyncio ;
+  - appels terminal (MT5) confinés à un exécuteur mono-thread « Thread-Terminal » :
+    les appels sont sérialisés sans contention de verrou ;
+  - alertes Telegram et writer du journal DB : tâches de la même boucle ;
+  - arrêt propre : annulation des tâches, journal vidé, alertes envoyées.
+
+Les fonctions de strategy.py restent synchrones : chaque étape (filtre de
+volatilité, signal, ouverture, passe de surveillance) est exécutée d'un bloc
+dans l'exécuteur terminal ; les attentes entre étapes ne coûtent plus de thread.
+"""
+import asyncio
+import logging
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from database import close_db, get_journal
+from connexion import disconnect, CONNECTION
+from positions import POSITIONS
+from order_scheduler import ORDERS
+from strategy import (
+    get_signal,
+    is_volatility_good,
+    volatility_retry_delay,
+    TradeMonitor,
+    MONITOR_INTERVAL,
+    recover_open_positions,
+    register_monitor,
+    unregister_monitor,
+)
+from utils import start_telegram
+
+LOOP_INTERVAL = 10    # secondes entre deux analyses d'un symbole (comme run_bot_for_symbol)
+
+
+class Orchestrator:
+    """Boucle asyncio : pipelines par symbole, moniteurs de positions, services."""
+
+    def __init__(self, symbols: list, execute_trade, multi_manager=None):
+        """
+        execute_trade : callable (symbol, signal, multi_manager) → (ticket, lot, compte),
+                        exécuté dans l'exécuteur terminal.
+        """
+        self.symbols       = list(symbols)
+        self.execute_trade = execute_trade
+        self.multi_manager = multi_manager
+        self.monitors: dict = {}                 # ticket → TradeMonitor
+        self._terminal     = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Thread-Terminal")
+        self._tasks: set   = set()
+        self._finishing    = set()               # moniteurs en cours d'enregistrement de clôture
+        self._stop         = None                # asyncio.Event, créé dans la boucle
+        self._journal_task = None
+        self._closed       = False
+
+    # ── Outils ───────────────────────────────────────────────────
+    async def terminal(self, fn, *args, **kwargs):
+        """Exécute un appel bloquant (terminal MT5) dans l'exécuteur dédié."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._terminal, partial(fn, *args, **kwargs))
+
+    def spawn(self, coro, name: str) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def request_stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    # ── Tâches ───────────────────────────────────────────────────
+    async def symbol_pipeline(self, symbol: str):
+        """Équivalent asyncio de main.run_bot_for_symbol."""
+        logging.info(f"🔍 Démarrage analyse | {symbol}")
+        while True:
+            try:
+                if not CONNECTION.is_connected():
+                    # Reconnexion en cours (thread MT5-Connection) : reprise dès le retour
+                    await asyncio.sleep(1)
+                    continue
+
+                vol_ok, reason = await self.terminal(is_volatility_good, symbol)
+                if not vol_ok:
+                    delay = await self.terminal(volatility_retry_delay, symbol)
+                    logging.debug(f"[{symbol}] {reason} → prochaine évaluation dans {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                monitored = any(m.symbol == symbol for m in self.monitors.values())
+                if monitored or POSITIONS.snapshot().has_symbol(symbol):
+                    logging.debug(f"[{symbol}] Position déjà ouverte, surveillance...")
+                    await asyncio.sleep(LOOP_INTERVAL)
+                    continue
+
+                signal_ = await self.terminal(get_signal, symbol)
+                if signal_:
+                    logging.info(f"🎯 [{symbol}] SIGNAL {signal_['type']} | {signal_['reason']}")
+                    ticket, lot, acc_num = await self.terminal(
+                        self.execute_trade, symbol, signal_, self.multi_manager)
+                    if ticket:
+                        self.watch(TradeMonitor(symbol, ticket, lot, signal_, acc_num))
+                    else:
+                        logging.error(f"❌ Échec ouverture trade | {symbol}")
+
+                await asyncio.sleep(LOOP_INTERVAL)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"❌ Exception pipeline [{symbol}] : {e}", exc_info=True)
+                await asyncio.sleep(LOOP_INTERVAL)
+
+    async def position_book(self):
+        """Carnet de positions : un relevé par cycle pour tous les pipelines et moniteurs."""
+        while True:
+            try:
+                await self.terminal(POSITIONS.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"❌ Exception carnet de positions : {e}")
+            await asyncio.sleep(POSITIONS.interval)
+
+    def watch(self, monitor: TradeMonitor) -> asyncio.Task:
+        """Lance la surveillance d'une position (tâche monitor-{ticket})."""
+        self.monitors[monitor.ticket] = monitor
+        return self.spawn(self.monitor(monitor), name=f"monitor-{monitor.ticket}")
+
+    async def monitor(self, monitor: TradeMonitor):
+        """Équivalent asyncio de strategy.monitor_active_trade."""
+        loop  = asyncio.get_running_loop()
+        woken = asyncio.Event()
+        monitor.on_close = lambda: loop.call_soon_threadsafe(woken.set)
+        register_monitor(monitor)   # Réveil anticipé à la fermeture (carnet de positions)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(woken.wait(), MONITOR_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                # Réveil consommé : pas de boucle à vide si la passe ne confirme pas la fermeture
+                woken.clear()
+                monitor.closed.clear()
+                try:
+                    alive = await self.terminal(monitor.step)
+                except Exception as e:
+                    logging.error(f"❌ Exception surveillance #{monitor.ticket} : {e}", exc_info=True)
+                    continue
+                if not alive:
+                    # Non annulable à l'arrêt : la clôture doit être enregistrée
+                    self._finishing.add(asyncio.current_task())
+                    await asyncio.sleep(1)   # Le deal de sortie arrive après la fermeture
+                    await self.terminal(monitor.record_close, 0)
+                    return
+        finally:
+            self._finishing.discard(asyncio.current_task())
+            self.monitors.pop(monitor.ticket, None)
+            unregister_monitor(monitor)
+
+    # ── Cycle de vie ─────────────────────────────────────────────
+    async def run(self):
+        """Démarre les tâches puis attend un arrêt (signal ou request_stop)."""
+        loop       = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass   # Windows : Ctrl+C remonte en KeyboardInterrupt (voir run_orchestrator)
+
+        journal = get_journal()
+        if journal is not None:
+            self._journal_task = loop.create_task(journal.run_async(), name="db-writer")
+
+        self.spawn(self.position_book(), name="position-book")
+
+        # Positions ouvertes avant le démarrage : moniteurs repris avant les pipelines
+        for monitor in await self.terminal(recover_open_positions, self.symbols):
+            self.watch(monitor)
+
+        for symbol in self.symbols:
+            self.spawn(self.symbol_pipeline(symbol), name=f"pipeline-{symbol}")
+
+        try:
+            await self._stop.wait()
+        finally:
+            await self.shutdown()
+
+    async def shutdown(self):
+        """Annule pipelines et moniteurs, vide journal et alertes, déconnecte."""
+        if self._closed:
+            return
+        self._closed = True
+        logging.info("⏹️ Arrêt de l'orchestrateur...")
+
+        tasks = list(self._tasks)
+        for task in tasks:
+            if task not in self._finishing:
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Ordres urgents encore en file envoyés, trailing abandonné
+        await asyncio.get_running_loop().run_in_executor(None, ORDERS.stop)
+
+        if self.multi_manager:
+            await self.terminal(self.multi_manager.disconnect_all)
+
+        journal = get_journal()
+        if journal is not None and self._journal_task is not None:
+            await journal.stop_async(self._journal_task)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, close_db)
+
+        # disconnect() envoie l'alerte d'arrêt puis attend le dispatcher, qui tourne
+        # sur cette boucle : l'attente se fait hors de la boucle
+        await self.terminal(disconnect)
+        self._terminal.shutdown(wait=True)
+        logging.info("🛑 Bot arrêté proprement")
+
+
+def run_orchestrator(loop: asyncio.AbstractEventLoop, orchestrator: Orchestrator):
+    """Exécute l'orchestrateur sur `loop` jusqu'à l'arrêt (bloquant)."""
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(orchestrator.run())
+    except KeyboardInterrupt:
+        logging.info("⏹️ Arrêt demandé par l'utilisateur...")
+        loop.run_until_complete(orchestrator.shutdown())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+
+def new_loop() -> asyncio.AbstractEventLoop:
+    """Boucle de l'orchestrateur, créée avant la connexion : le dispatcher Telegram
+    y est attaché dès le démarrage et les premières alertes y sont envoyées."""
+    loop = asyncio.new_event_loop()
+    start_telegram(loop)
+    return loop
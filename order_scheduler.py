@@ -0,0 +1,231 @@
+"""
+Ordonnanceur des ordres sortants — un seul point d'envoi vers le broker.
+  - seau à jetons par compte (ORDER_RATE ordres/s, rafale ORDER_BURST) :
+    le trailing ne peut plus saturer le terminal ni déclencher le throttling broker ;
+  - priorités : entrées et clôtures (PRIORITY_URGENT) passent avant les
+    ajustements de SL (PRIORITY_TRAIL) ;
+  - coalescence : une modification SL/TP en attente pour un ticket est remplacée
+    par la plus récente (seule la dernière cible est envoyée, l'ancienne est annulée) ;
+  - retcode TOO_MANY_REQUESTS : le seau du compte est vidé (pause automatique).
+
+    future = ORDERS.submit(send, account=..., priority=PRIORITY_TRAIL, key=("sltp", ticket))
+    result = ORDERS.call(send, account=..., priority=PRIORITY_URGENT)     # bloquant
+
+`send` est un appelable sans argument qui effectue l'envoi (et prend lui-même
+le verrou terminal). Sans thread démarré (outils, simulation), l'envoi est
+exécuté immédiatement dans le thread appelant : le rejeu reste déterministe.
+"""
+import logging
+import threading
+from concurrent.futures import Future
+
+import MetaTrader5 as mt5
+
+import clock
+from config import ORDER_RATE, ORDER_BURST
+from metrics import inc, observe
+
+PRIORITY_URGENT = 0     # entrées, clôtures
+PRIORITY_TRAIL  = 1     # break-even, trailing stop
+
+_PRIORITY_NAMES = {PRIORITY_URGENT: "urgent", PRIORITY_TRAIL: "trail"}
+
+# 10024 : trop de requêtes (constante absente des anciennes versions du paquet)
+_RETCODE_TOO_MANY_REQUESTS = getattr(mt5, "TRADE_RETCODE_TOO_MANY_REQUESTS", 10024)
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons/s, au plus `burst` en réserve."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate    = rate
+        self.burst   = burst
+        self.tokens  = burst
+        self.updated = clock.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens  = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 = tout de suite)."""
+        self._refill(now)
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.tokens = 0
+
+
+class _Job:
+    __slots__ = ("send", "account", "priority", "key", "symbol", "future", "seq", "queued_at",
+                 "throttled")
+
+    def __init__(self, send, account, priority, key, symbol, seq):
+        self.send      = send
+        self.account   = account
+        self.priority  = priority
+        self.key       = key
+        self.symbol    = symbol
+        self.future    = Future()
+        self.seq       = seq
+        self.queued_at = clock.monotonic()
+        self.throttled = False          # déjà compté comme retenu par son seau
+
+
+class OrderScheduler:
+    """
+    File d'ordres servie par le thread « Order-Scheduler ». Un compte limité
+    par son seau ne bloque pas les autres : le premier travail prêt, par
+    (priorité, ordre d'arrivée), est envoyé.
+    """
+
+    def __init__(self, rate: float = ORDER_RATE, burst: float = ORDER_BURST):
+        self.rate      = rate
+        self.burst     = burst
+        self._buckets  = {}            # compte → TokenBucket
+        self._pending  = []            # travaux en attente
+        self._by_key   = {}            # clé de coalescence → _Job en attente
+        self._seq      = 0
+        self._cond     = threading.Condition()
+        self._stop     = False
+        self._thread   = None
+
+    # ── Cycle de vie ─────────────────────────────────────────────
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop   = False
+        self._thread = threading.Thread(target=self._run, name="Order-Scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Arrêt : les travaux urgents en attente sont envoyés, le trailing est abandonné."""
+        with self._cond:
+            self._stop = True
+            for job in [j for j in self._pending if j.priority != PRIORITY_URGENT]:
+                self._remove(job)
+                job.future.cancel()
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # ── Soumission ───────────────────────────────────────────────
+    def submit(self, send, account: int, priority: int = PRIORITY_URGENT,
+               key=None, symbol: str = "") -> Future:
+        """
+        Met `send` en file. Avec `key`, un travail encore en attente portant la
+        même clé est remplacé (son future est annulé) : seule la dernière cible part.
+        """
+        if not self.running():
+            return self._run_inline(send, account, priority, symbol)
+
+        with self._cond:
+            self._seq += 1
+            job = _Job(send, account, priority, key, symbol, self._seq)
+            previous = self._by_key.get(key) if key is not None else None
+            if previous is not None:
+                # Remplacement sur place : le travail garde sa position dans la file
+                job.seq, job.queued_at = previous.seq, previous.queued_at
+                self._remove(previous)
+                previous.future.cancel()
+                inc("order_coalesced_total", account=account, symbol=symbol)
+            self._pending.append(job)
+            if key is not None:
+                self._by_key[key] = job
+            self._cond.notify()
+        return job.future
+
+    def call(self, send, account: int, priority: int = PRIORITY_URGENT,
+             key=None, symbol: str = ""):
+        """submit() puis attente du résultat (exception de `send` propagée)."""
+        return self.submit(send, account, priority, key, symbol).result()
+
+    def depth(self, priority: int = None) -> int:
+        with self._cond:
+            if priority is None:
+                return len(self._pending)
+            return sum(1 for j in self._pending if j.priority == priority)
+
+    # ── Envoi ────────────────────────────────────────────────────
+    def _run_inline(self, send, account, priority, symbol) -> Future:
+        future = Future()
+        self._execute(send, account, priority, symbol, future)
+        return future
+
+    def _execute(self, send, account, priority, symbol, future: Future):
+        inc("order_jobs_total", account=account, priority=_PRIORITY_NAMES.get(priority, priority))
+        try:
+            result = send()
+        except BaseException as e:
+            future.set_exception(e)
+            return
+        if getattr(result, "retcode", None) == _RETCODE_TOO_MANY_REQUESTS:
+            inc("order_broker_throttled_total", account=account, symbol=symbol)
+            logging.warning(f"🚦 Broker : trop de requêtes (compte {account}) → pause des envois")
+            with self._cond:
+                self._bucket(account).drain(clock.monotonic())
+        future.set_result(result)
+
+    def _bucket(self, account: int) -> TokenBucket:
+        bucket = self._buckets.get(account)
+        if bucket is None:
+            bucket = self._buckets[account] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _remove(self, job: _Job):
+        self._pending.remove(job)
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+
+    def _next_job(self):
+        """(travail prêt, None) ou (None, attente en s avant le prochain jeton)."""
+        now  = clock.monotonic()
+        wait = None
+        for job in sorted(self._pending, key=lambda j: (j.priority, j.seq)):
+            delay = self._bucket(job.account).delay(now)
+            if delay == 0:
+                self._bucket(job.account).take(now)
+                self._remove(job)
+                return job, None
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stop and not self._pending:
+                        return
+                    job, wait = self._next_job()
+                    if job is not None:
+                        break
+                    for j in self._pending:
+                        if not j.throttled:
+                            j.throttled = True
+                            inc("order_throttled_total", account=j.account, symbol=j.symbol)
+                    self._cond.wait(wait)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            observe("order_queue_wait_seconds", clock.monotonic() - job.queued_at,
+                    priority=_PRIORITY_NAMES.get(job.priority, job.priority))
+            try:
+                self._execute(job.send, job.account, job.priority, job.symbol, job.future)
+            except Exception as e:
+                logging.error(f"OrderScheduler : {e}")
+
+
+ORDERS = OrderScheduler()
@@ -0,0 +1,147 @@
+"""
+Carnet de positions partagé — un seul positions_get() par cycle pour tout le bot.
+  - PositionSnapshot : instantané immuable, indexé par ticket et par symbole ;
+  - PositionBook.refresh() : relève toutes les positions, publie un nouvel
+    instantané et notifie les abonnés des ouvertures / fermetures ;
+  - rafraîchi par le thread « Position-Book » (runtime threads) ou par une tâche
+    de l'orchestrateur (ASYNC_RUNTIME=1) ; à défaut (outils, rejeu), à la demande.
+
+Les boucles par symbole et les moniteurs lisent l'instantané au lieu
+d'interroger le terminal : le coût terminal ne dépend plus du nombre de
+symboles ni de positions surveillées.
+"""
+import logging
+import threading
+from types import MappingProxyType
+
+import MetaTrader5 as mt5
+
+import clock
+from config import POSITION_REFRESH_INTERVAL
+from connexion import CONNECTION
+from metrics import inc, terminal_timer
+
+
+class PositionSnapshot:
+    """Positions du terminal à un instant donné (lecture seule)."""
+
+    __slots__ = ("positions", "by_ticket", "by_symbol", "taken_at", "ok")
+
+    def __init__(self, positions: tuple = (), taken_at: float = 0.0, ok: bool = False):
+        by_symbol: dict = {}
+        for p in positions:
+            by_symbol.setdefault(p.symbol, []).append(p)
+        self.positions = tuple(positions)
+        self.by_ticket = MappingProxyType({p.ticket: p for p in positions})
+        self.by_symbol = MappingProxyType({s: tuple(ps) for s, ps in by_symbol.items()})
+        self.taken_at  = taken_at     # clock.monotonic() du relevé
+        self.ok        = ok           # False : aucun relevé réussi (terminal indisponible)
+
+    def get(self, ticket: int):
+        return self.by_ticket.get(ticket)
+
+    def for_symbol(self, symbol: str) -> tuple:
+        return self.by_symbol.get(symbol, ())
+
+    def has_symbol(self, symbol: str) -> bool:
+        return symbol in self.by_symbol
+
+    def count(self, magic: int = None) -> int:
+        if magic is None:
+            return len(self.positions)
+        return sum(1 for p in self.positions if p.magic == magic)
+
+
+class PositionBook:
+    """
+    Publie le dernier PositionSnapshot et diffuse les événements
+    ("open" | "close", position) aux abonnés.
+    Un relevé en échec (None, terminal déconnecté) conserve l'instantané
+    précédent : aucune fermeture n'est déduite d'une erreur terminal.
+    """
+
+    def __init__(self, interval: float = POSITION_REFRESH_INTERVAL):
+        self.interval     = interval
+        self._snapshot    = PositionSnapshot()
+        self._subscribers = []
+        self._lock        = None      # verrou terminal partagé (strategy._mt5_lock)
+        self._refreshing  = threading.Lock()
+        self._stop        = threading.Event()
+        self._thread      = None
+
+    # ── Cycle de vie ─────────────────────────────────────────────
+    def start(self, terminal_lock=None, thread: bool = True):
+        """thread=False : le rafraîchissement est piloté par l'appelant (orchestrateur)."""
+        self._lock = terminal_lock
+        self.refresh()
+        if thread and not (self._thread and self._thread.is_alive()):
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="Position-Book", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def reset(self):
+        """Instantané vide (nouvelle simulation : horloge repartie de zéro)."""
+        self._snapshot = PositionSnapshot()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error(f"PositionBook : {e}")
+
+    # ── Abonnements ──────────────────────────────────────────────
+    def subscribe(self, callback):
+        """callback(event, position) appelé depuis le thread de rafraîchissement."""
+        self._subscribers.append(callback)
+
+    # ── Lecture ──────────────────────────────────────────────────
+    def snapshot(self) -> PositionSnapshot:
+        """Dernier instantané ; relevé à la demande s'il est périmé (rien ne le rafraîchit)."""
+        snap = self._snapshot
+        if clock.monotonic() - snap.taken_at > 2 * self.interval:
+            return self.refresh()
+        return snap
+
+    # ── Relevé ───────────────────────────────────────────────────
+    def refresh(self) -> PositionSnapshot:
+        """Un positions_get() pour toutes les positions, puis publication + événements."""
+        if not self._refreshing.acquire(blocking=False):
+            return self._snapshot            # Relevé déjà en cours dans un autre thread
+        try:
+            if not CONNECTION.is_connected():
+                return self._snapshot
+            with terminal_timer("positions_get"):
+                if self._lock is None:
+                    positions = mt5.positions_get()
+                else:
+                    with self._lock:
+                        positions = mt5.positions_get()
+            if positions is None:
+                return self._snapshot
+
+            previous       = self._snapshot
+            self._snapshot = PositionSnapshot(positions, clock.monotonic(), ok=True)
+            if previous.ok:
+                self._publish(previous, self._snapshot)
+            return self._snapshot
+        finally:
+            self._refreshing.release()
+
+    def _publish(self, previous: PositionSnapshot, current: PositionSnapshot):
+        opened = [p for t, p in current.by_ticket.items() if t not in previous.by_ticket]
+        closed = [p for t, p in previous.by_ticket.items() if t not in current.by_ticket]
+        for event, positions in (("open", opened), ("close", closed)):
+            for position in positions:
+                inc("position_events_total", event=event, symbol=position.symbol)
+                for callback in self._subscribers:
+                    try:
+                        callback(event, position)
+                    except Exception as e:
+                        logging.error(f"PositionBook abonné ({event} #{position.ticket}) : {e}")
+
+
+POSITIONS = PositionBook()
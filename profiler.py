@@ -0,0 +1,157 @@
+"""
+Profiler par échantillonnage, activable à chaud sans redémarrer le bot.
+Capture les piles des threads du bot (symboles, moniteurs, ordonnanceur,
+carnet de positions, boucle asyncio… ; filtre PROFILE_THREADS) pendant
+N secondes et écrit un fichier au format "collapsed stacks" (une ligne par pile :
+frame1;frame2;... count), lisible par flamegraph.pl, speedscope ou inferno.
+
+Déclencheurs :
+  - fichier de contrôle PROFILE_TRIGGER_FILE (contenu optionnel : durée en s)
+  - signal SIGUSR1 (POSIX uniquement)
+  - endpoint HTTP /profile?seconds=N (si l'endpoint métriques est actif)
+
+Au repos : aucun hook installé dans l'interpréteur ; seul un thread vérifie
+l'existence du fichier de contrôle toutes les PROFILE_POLL_INTERVAL secondes.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from config import PROFILE_TRIGGER_FILE, PROFILE_DIR, PROFILE_POLL_INTERVAL, PROFILE_THREADS
+
+DEFAULT_DURATION = 30.0
+SAMPLE_INTERVAL  = 0.005   # 200 Hz
+# Préfixes de noms de threads profilés ; vide = tous sauf l'infrastructure ci-dessous
+THREAD_PREFIXES  = tuple(p.strip() for p in PROFILE_THREADS.split(",") if p.strip())
+EXCLUDED_THREADS = ("Profiler", "Metrics-")   # profiler lui-même, export des métriques
+
+_running = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _profiled(name: str, prefixes: tuple) -> bool:
+    if prefixes:
+        return name.startswith(prefixes)
+    return not name.startswith(EXCLUDED_THREADS)
+
+
+def sample_stacks(duration: float, interval: float = SAMPLE_INTERVAL,
+                  thread_prefixes: tuple = THREAD_PREFIXES) -> Counter:
+    """
+    Échantillonne les piles des threads dont le nom commence par l'un des
+    thread_prefixes (vide : tous les threads hors EXCLUDED_THREADS).
+    """
+    stacks   = Counter()
+    own      = threading.get_ident()
+    deadline = time.monotonic() + duration
+
+    while time.monotonic() < deadline:
+        names  = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        for ident, frame in frames.items():
+            name = names.get(ident, "")
+            if ident == own or not _profiled(name, thread_prefixes):
+                continue
+            parts = []
+            while frame is not None:
+                parts.append(_frame_label(frame))
+                frame = frame.f_back
+            parts.append(name.replace(" ", "_"))
+            stacks[";".join(reversed(parts))] += 1
+        del frames
+        time.sleep(interval)
+    return stacks
+
+
+def write_collapsed(stacks: Counter, path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+def run_profile(duration: float = DEFAULT_DURATION) -> str | None:
+    """Profile pendant `duration` secondes ; None si un profil est déjà en cours."""
+    if not _running.acquire(blocking=False):
+        logging.warning("🔬 Profil déjà en cours, demande ignorée")
+        return None
+    try:
+        logging.info(f"🔬 Profil démarré ({duration:.0f}s)")
+        stacks = sample_stacks(duration)
+        path   = os.path.join(PROFILE_DIR, f"profile_{datetime.now():%Y%m%d_%H%M%S}.folded")
+        write_collapsed(stacks, path)
+        logging.info(f"🔬 Profil écrit : {path} ({sum(stacks.values())} échantillons)")
+        return path
+    except Exception as e:
+        logging.error(f"❌ Erreur profil : {e}")
+        return None
+    finally:
+        _running.release()
+
+
+def trigger(duration: float = DEFAULT_DURATION) -> bool:
+    """Lance un profil en arrière-plan. Retourne False si un profil est déjà en cours."""
+    if _running.locked():
+        return False
+    threading.Thread(target=run_profile, args=(duration,),
+                     name="Profiler", daemon=True).start()
+    return True
+
+
+# ═══════════════════════════════════════════════════════════════
+# DÉCLENCHEURS
+# ═══════════════════════════════════════════════════════════════
+
+def _read_duration(path: str) -> float:
+    try:
+        with open(path, encoding="utf-8") as f:
+            content = f.read().strip()
+        return float(content) if content else DEFAULT_DURATION
+    except (OSError, ValueError):
+        return DEFAULT_DURATION
+
+
+def _watch_trigger_file(path: str, poll: float):
+    while True:
+        time.sleep(poll)
+        if os.path.exists(path):
+            duration = _read_duration(path)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            trigger(duration)
+
+
+def http_route(query: dict) -> str:
+    """Route /profile?seconds=N de l'endpoint métriques."""
+    try:
+        duration = float(query.get("seconds", [DEFAULT_DURATION])[0])
+    except ValueError:
+        duration = DEFAULT_DURATION
+    if trigger(duration):
+        return f"profil démarré ({duration:.0f}s) → {PROFILE_DIR}\n"
+    return "profil déjà en cours\n"
+
+
+def install(trigger_file: str = PROFILE_TRIGGER_FILE, poll: float = PROFILE_POLL_INTERVAL):
+    """
+    Installe les déclencheurs (à appeler depuis le thread principal).
+    Exemple : `echo 60 > profile.request` → profil de 60 s.
+    """
+    if trigger_file and poll > 0:
+        threading.Thread(target=_watch_trigger_file, args=(trigger_file, poll),
+                         name="Profiler-Watch", daemon=True).start()
+
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: trigger())
@@ -0,0 +1,588 @@
+"""
+Terminal MT5 simulé, alimenté par des ticks enregistrés (tick_recorder.py).
+Expose le sous-ensemble de l'API MetaTrader5 utilisé par le bot :
+symbol_info_tick, symbol_info, copy_rates_from_pos / copy_rates_range (barres
+reconstruites à partir des bids), copy_ticks_from, positions_get, order_send
+(ouverture, clôture, SLTP), history_deals_get, account_info, terminal_info…
+ainsi que les constantes (TIMEFRAME_*, TRADE_*, ORDER_*, DEAL_*).
+
+Le temps du terminal est celui du dernier tick rejoué ; SL et TP sont
+déclenchés au premier tick qui les franchit (exécution au prix de ce tick).
+
+Exemple (rejeu accéléré ×20 d'une séance enregistrée) :
+    term   = SimulatedTerminal.from_recording(["Volatility 100 Index"], start_msc, end_msc)
+    driver = ReplayDriver(term, speed=20)
+    with patch_mt5(term):
+        driver.start()
+        monitor_active_trade(...)      # le code du bot appelle term au lieu de mt5
+
+Simulation en temps virtuel (clock.VirtualClock, rejouable à l'identique) :
+    python sim_terminal.py --start-msc 1700432000000
+"""
+import contextlib
+import logging
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from tick_recorder import TICK_DTYPE, load_ticks, load_spec
+
+# ═══════════════════════════════════════════════════════════════
+# STRUCTURES (mêmes champs que les namedtuples MetaTrader5)
+# ═══════════════════════════════════════════════════════════════
+
+Tick = namedtuple("Tick", "time bid ask last volume time_msc flags volume_real")
+SymbolInfo = namedtuple("SymbolInfo", "name point digits stops_level trade_tick_size "
+                        "trade_tick_value trade_contract_size volume_min volume_max volume_step")
+AccountInfo = namedtuple("AccountInfo", "login balance equity profit margin_free currency leverage")
+TerminalInfo = namedtuple("TerminalInfo", "connected trade_allowed")
+TradePosition = namedtuple("TradePosition", "ticket time time_msc type magic identifier symbol volume "
+                           "price_open sl tp price_current profit swap comment")
+TradeDeal = namedtuple("TradeDeal", "ticket order time time_msc type entry magic position_id volume "
+                       "price commission swap profit symbol comment")
+OrderSendResult = namedtuple("OrderSendResult", "retcode deal order volume price bid ask comment request")
+
+RATES_DTYPE = np.dtype([
+    ("time", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+    ("tick_volume", "<u8"), ("spread", "<i4"), ("real_volume", "<u8"),
+])
+TICKS_DTYPE = np.dtype([
+    ("time", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("last", "<f8"), ("volume", "<u8"),
+    ("time_msc", "<i8"), ("flags", "<u4"), ("volume_real", "<f8"),
+])
+
+DEFAULT_SPEC = {
+    "point": 0.01, "digits": 2, "stops_level": 0, "trade_tick_size": 0.01,
+    "trade_tick_value": 0.01, "trade_contract_size": 1.0,
+    "volume_min": 0.01, "volume_max": 100.0, "volume_step": 0.01,
+}
+
+
+def tf_seconds(timeframe: int) -> int:
+    """Durée d'une barre : M* = minutes, H* = 0x4000 | heures, D1 = 0x4018."""
+    if timeframe == SimulatedTerminal.TIMEFRAME_D1:
+        return 86400
+    if timeframe & 0x4000:
+        return (timeframe & 0xFF) * 3600
+    return timeframe * 60
+
+
+def _to_seconds(value) -> int:
+    return int(value.timestamp()) if hasattr(value, "timestamp") else int(value)
+
+
+class SimulatedTerminal:
+    """Terminal simulé : rejoue des ticks par symbole, exécute les ordres au marché."""
+
+    # ── Constantes MetaTrader5 ───────────────────────────────────
+    TIMEFRAME_M1, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30 = 1, 5, 15, 30
+    TIMEFRAME_H1, TIMEFRAME_H4, TIMEFRAME_D1 = 0x4001, 0x4004, 0x4018
+    TRADE_ACTION_DEAL, TRADE_ACTION_SLTP = 1, 6
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL, ORDER_TYPE_BUY_LIMIT, ORDER_TYPE_SELL_LIMIT = 0, 1, 2, 3
+    ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+    ORDER_TIME_GTC = 0
+    POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+    DEAL_TYPE_BUY, DEAL_TYPE_SELL = 0, 1
+    DEAL_ENTRY_IN, DEAL_ENTRY_OUT = 0, 1
+    TRADE_RETCODE_DONE           = 10009
+    TRADE_RETCODE_INVALID        = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_STOPS  = 10016
+    TRADE_RETCODE_MARKET_CLOSED  = 10018
+    COPY_TICKS_ALL, COPY_TICKS_INFO, COPY_TICKS_TRADE = -1, 1, 2
+
+    def __init__(self, ticks: dict, specs: dict = None, balance: float = 10_000.0,
+                 login: int = 0, history=None):
+        """
+        ticks   : {symbole: tableau TICK_DTYPE trié}
+        specs   : {symbole: dict SPEC_FIELDS} (défaut : DEFAULT_SPEC)
+        history : BarArchive optionnelle — barres antérieures au premier tick,
+                  pour que les indicateurs disposent d'historique dès le départ.
+        """
+        self._ticks   = {s: np.asarray(t, TICK_DTYPE) for s, t in ticks.items()}
+        self._cursor  = {s: 0 for s in self._ticks}        # ticks déjà rejoués
+        self._specs   = {s: {**DEFAULT_SPEC, **(specs or {}).get(s, {})} for s in self._ticks}
+        self._history = history
+        self._lock    = threading.RLock()
+        self._bars    = {}          # cache (symbole, tf) → (curseur, barres, 1er tick de la dernière barre)
+        self.login_id = login
+        self.balance  = float(balance)
+        self.now_msc  = min((int(t["time_msc"][0]) for t in self._ticks.values() if len(t)), default=0)
+        self.positions: dict = {}
+        self.deals: list     = []
+        self._next_ticket    = 1
+
+    @classmethod
+    def from_recording(cls, symbols: list, start_msc: int | None = None, end_msc: int | None = None,
+                       **kwargs) -> "SimulatedTerminal":
+        """Charge ticks et caractéristiques enregistrés par tick_recorder."""
+        ticks = {s: load_ticks(s, start_msc, end_msc) for s in symbols}
+        specs = {s: load_spec(s) for s in symbols}
+        return cls(ticks, specs, **kwargs)
+
+    # ── Horloge ──────────────────────────────────────────────────
+    def advance(self, until_msc: int):
+        """Rejoue tous les ticks jusqu'à until_msc inclus ; déclenche SL/TP."""
+        with self._lock:
+            for symbol, ticks in self._ticks.items():
+                old = self._cursor[symbol]
+                new = int(np.searchsorted(ticks["time_msc"], until_msc, "right"))
+                if new > old:
+                    self._cursor[symbol] = new
+                    self._check_stops(symbol, ticks[old:new])
+            self.now_msc = max(self.now_msc, until_msc)
+
+    def timeline(self) -> np.ndarray:
+        """Instants (ms) de tous les ticks, tous symboles confondus, triés et uniques."""
+        times = [t["time_msc"] for t in self._ticks.values() if len(t)]
+        return np.unique(np.concatenate(times)) if times else np.empty(0, np.int64)
+
+    # ── Session ──────────────────────────────────────────────────
+    def initialize(self, *args, **kwargs) -> bool:
+        return True
+
+    def login(self, *args, **kwargs) -> bool:
+        return True
+
+    def shutdown(self):
+        return None
+
+    def last_error(self):
+        return (1, "Success")
+
+    def terminal_info(self):
+        return TerminalInfo(connected=True, trade_allowed=True)
+
+    def account_info(self):
+        with self._lock:
+            floating = sum(self._profit(p, self._close_price(p)) for p in self.positions.values())
+            equity   = self.balance + floating
+            return AccountInfo(self.login_id, self.balance, equity, floating, equity, "USD", 100)
+
+    # ── Marché ───────────────────────────────────────────────────
+    def symbol_info(self, symbol: str):
+        if symbol not in self._specs:
+            return None
+        return SymbolInfo(name=symbol, **self._specs[symbol])
+
+    def _tick_row(self, symbol: str):
+        cursor = self._cursor.get(symbol, 0)
+        return self._ticks[symbol][cursor - 1] if cursor else None
+
+    def symbol_info_tick(self, symbol: str):
+        with self._lock:
+            row = self._tick_row(symbol) if symbol in self._ticks else None
+        if row is None:
+            return None
+        msc = int(row["time_msc"])
+        return Tick(msc // 1000, float(row["bid"]), float(row["ask"]), float(row["last"]),
+                    int(row["volume"]), msc, int(row["flags"]), float(row["volume"]))
+
+    def copy_ticks_from(self, symbol: str, date_from, count: int, flags: int = -1):
+        with self._lock:
+            if symbol not in self._ticks:
+                return None
+            ticks = self._ticks[symbol][:self._cursor[symbol]]
+        lo   = int(np.searchsorted(ticks["time_msc"], _to_seconds(date_from) * 1000, "left"))
+        rows = ticks[lo:lo + count]
+        out  = np.zeros(len(rows), TICKS_DTYPE)
+        out["time"], out["time_msc"] = rows["time_msc"] // 1000, rows["time_msc"]
+        for name in ("bid", "ask", "last", "flags"):
+            out[name] = rows[name]
+        out["volume"], out["volume_real"] = rows["volume"], rows["volume"]
+        return out
+
+    def _rates(self, symbol: str, timeframe: int) -> np.ndarray:
+        """
+        Barres (historique + barres reconstruites depuis les bids) jusqu'à maintenant.
+        Cache incrémental : seuls les ticks depuis l'ouverture de la dernière barre
+        sont réagrégés quand le curseur avance.
+        """
+        with self._lock:
+            cursor = self._cursor.get(symbol, 0)
+            cached = self._bars.get((symbol, timeframe))
+            if cached and cached[0] == cursor:
+                return cached[1]
+            all_ticks = self._ticks[symbol]
+
+        period = tf_seconds(timeframe)
+        if cached and cached[2] is not None and cached[0] < cursor:
+            # Dernière barre recalculée + barres nouvelles
+            _, previous, last_start = cached
+            built, starts = self._build_bars(symbol, all_ticks[last_start:cursor], period)
+            rates = np.concatenate([previous[:-1], built])
+            last_start += int(starts[-1])
+        else:
+            built, starts = self._build_bars(symbol, all_ticks[:cursor], period)
+            last_start    = int(starts[-1]) if len(starts) else None
+            rates         = built
+            if self._history is not None:
+                first = int(built["time"][0]) if len(built) else self.now_msc // 1000 // period * period
+                past  = np.asarray(self._history.load(symbol, timeframe))
+                past  = past[past["time"] < first]
+                if len(past):
+                    head = np.zeros(len(past), RATES_DTYPE)
+                    for name in past.dtype.names:
+                        head[name] = past[name]
+                    rates = np.concatenate([head, built])
+
+        with self._lock:
+            self._bars[(symbol, timeframe)] = (cursor, rates, last_start)
+        return rates
+
+    def _build_bars(self, symbol: str, ticks: np.ndarray, period: int) -> tuple:
+        """Agrège des ticks en barres ; retourne (barres, index du premier tick de chaque barre)."""
+        if not len(ticks):
+            return np.zeros(0, RATES_DTYPE), np.zeros(0, np.int64)
+        secs  = ticks["time_msc"] // 1000
+        keys  = secs - secs % period
+        # Ticks triés : une nouvelle barre commence à chaque changement de clé
+        start = np.r_[0, np.nonzero(np.diff(keys))[0] + 1]
+        bid   = ticks["bid"]
+        ends  = np.r_[start[1:], len(ticks)]
+        built = np.zeros(len(start), RATES_DTYPE)
+        built["time"]        = keys[start]
+        built["open"]        = bid[start]
+        built["high"]        = np.maximum.reduceat(bid, start)
+        built["low"]         = np.minimum.reduceat(bid, start)
+        built["close"]       = bid[ends - 1]
+        built["tick_volume"] = ends - start
+        last  = ends - 1
+        built["spread"]      = np.round((ticks["ask"][last] - bid[last])
+                                        / self._specs[symbol]["point"]).astype(np.int64)
+        return built, start
+
+    def copy_rates_from_pos(self, symbol: str, timeframe: int, start_pos: int, count: int):
+        if symbol not in self._ticks:
+            return None
+        rates = self._rates(symbol, timeframe)
+        end   = len(rates) - start_pos
+        return rates[max(0, end - count):max(0, end)].copy()
+
+    def copy_rates_range(self, symbol: str, timeframe: int, date_from, date_to):
+        if symbol not in self._ticks:
+            return None
+        rates = self._rates(symbol, timeframe)
+        times = rates["time"]
+        lo = np.searchsorted(times, _to_seconds(date_from), "left")
+        hi = np.searchsorted(times, _to_seconds(date_to), "right")
+        return rates[lo:hi].copy()
+
+    # ── Positions et historique ──────────────────────────────────
+    def positions_get(self, symbol: str = None, ticket: int = None, group: str = None):
+        with self._lock:
+            found = [p for p in self.positions.values()
+                     if (symbol is None or p["symbol"] == symbol)
+                     and (ticket is None or p["ticket"] == ticket)]
+            return tuple(self._position_tuple(p) for p in found)
+
+    def positions_total(self) -> int:
+        return len(self.positions)
+
+    def history_deals_get(self, date_from=None, date_to=None, position: int = None,
+                          group: str = None, ticket: int = None):
+        with self._lock:
+            deals = list(self.deals)
+        if position is not None:
+            return tuple(d for d in deals if d.position_id == position)
+        if ticket is not None:
+            return tuple(d for d in deals if d.ticket == ticket)
+        lo = _to_seconds(date_from) if date_from is not None else 0
+        hi = _to_seconds(date_to) if date_to is not None else sys.maxsize
+        return tuple(d for d in deals if lo <= d.time <= hi)
+
+    # ── Ordres ───────────────────────────────────────────────────
+    def order_send(self, request: dict):
+        with self._lock:
+            action = request.get("action")
+            if action == self.TRADE_ACTION_SLTP:
+                return self._modify(request)
+            if action == self.TRADE_ACTION_DEAL and request.get("position"):
+                return self._close_request(request)
+            if action == self.TRADE_ACTION_DEAL:
+                return self._open(request)
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment="Invalid request")
+
+    def order_check(self, request: dict):
+        return None
+
+    def _result(self, retcode: int, request: dict, deal: int = 0, order: int = 0,
+                price: float = 0.0, comment: str = "Request executed"):
+        row = self._tick_row(request.get("symbol", "")) if request.get("symbol") in self._ticks else None
+        bid = float(row["bid"]) if row is not None else 0.0
+        ask = float(row["ask"]) if row is not None else 0.0
+        return OrderSendResult(retcode, deal, order, float(request.get("volume", 0.0)),
+                               price, bid, ask, comment, request)
+
+    def _stops_ok(self, symbol: str, price: float, sl: float, tp: float) -> bool:
+        spec     = self._specs[symbol]
+        min_dist = spec["stops_level"] * spec["point"]
+        return all(not level or abs(price - level) >= min_dist for level in (sl, tp))
+
+    def _open(self, request: dict):
+        symbol = request.get("symbol")
+        row    = self._tick_row(symbol) if symbol in self._ticks else None
+        if row is None:
+            return self._result(self.TRADE_RETCODE_MARKET_CLOSED, request, comment="Market closed")
+
+        spec   = self._specs[symbol]
+        volume = float(request.get("volume", 0.0))
+        if not spec["volume_min"] <= volume <= spec["volume_max"]:
+            return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, comment="Invalid volume")
+
+        is_buy = request.get("type") == self.ORDER_TYPE_BUY
+        price  = float(row["ask"] if is_buy else row["bid"])
+        sl, tp = float(request.get("sl", 0.0)), float(request.get("tp", 0.0))
+        if not self._stops_ok(symbol, price, sl, tp):
+            return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, comment="Invalid stops")
+
+        ticket = self._new_ticket()
+        self.positions[ticket] = {
+            "ticket": ticket, "time_msc": self.now_msc,
+            "type": self.POSITION_TYPE_BUY if is_buy else self.POSITION_TYPE_SELL,
+            "magic": request.get("magic", 0), "symbol": symbol, "volume": volume,
+            "price_open": price, "sl": sl, "tp": tp, "comment": request.get("comment", ""),
+        }
+        deal = self._add_deal(self.positions[ticket], self.DEAL_ENTRY_IN, price, 0.0)
+        return self._result(self.TRADE_RETCODE_DONE, request, deal=deal, order=ticket, price=price)
+
+    def _modify(self, request: dict):
+        position = self.positions.get(request.get("position"))
+        if position is None:
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment="Position not found")
+        sl, tp = float(request.get("sl", 0.0)), float(request.get("tp", 0.0))
+        if not self._stops_ok(position["symbol"], self._close_price(position), sl, tp):
+            return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, comment="Invalid stops")
+        position["sl"], position["tp"] = sl, tp
+        return self._result(self.TRADE_RETCODE_DONE, request, order=position["ticket"])
+
+    def _close_request(self, request: dict):
+        position = self.positions.get(request.get("position"))
+        if position is None:
+            return self._result(self.TRADE_RETCODE_INVALID, request, comment="Position not found")
+        price = self._close_price(position)
+        deal  = self._close(position, price, "close")
+        return self._result(self.TRADE_RETCODE_DONE, request, deal=deal,
+                            order=position["ticket"], price=price)
+
+    # ── Exécution interne ────────────────────────────────────────
+    def _new_ticket(self) -> int:
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _close_price(self, position: dict) -> float:
+        row = self._tick_row(position["symbol"])
+        if row is None:
+            return position["price_open"]
+        return float(row["bid"] if position["type"] == self.POSITION_TYPE_BUY else row["ask"])
+
+    def _profit(self, position: dict, price: float) -> float:
+        spec = self._specs[position["symbol"]]
+        diff = price - position["price_open"]
+        if position["type"] == self.POSITION_TYPE_SELL:
+            diff = -diff
+        return diff / spec["trade_tick_size"] * spec["trade_tick_value"] * position["volume"]
+
+    def _add_deal(self, position: dict, entry: int, price: float, profit: float,
+                  comment: str = "") -> int:
+        is_buy = position["type"] == self.POSITION_TYPE_BUY
+        if entry == self.DEAL_ENTRY_OUT:
+            is_buy = not is_buy
+        ticket = self._new_ticket()
+        self.deals.append(TradeDeal(
+            ticket=ticket, order=ticket, time=self.now_msc // 1000, time_msc=self.now_msc,
+            type=self.DEAL_TYPE_BUY if is_buy else self.DEAL_TYPE_SELL, entry=entry,
+            magic=position["magic"], position_id=position["ticket"], volume=position["volume"],
+            price=price, commission=0.0, swap=0.0, profit=round(profit, 2),
+            symbol=position["symbol"], comment=comment,
+        ))
+        return ticket
+
+    def _close(self, position: dict, price: float, comment: str) -> int:
+        profit = self._profit(position, price)
+        self.balance += round(profit, 2)
+        del self.positions[position["ticket"]]
+        return self._add_deal(position, self.DEAL_ENTRY_OUT, price, profit, comment)
+
+    def _check_stops(self, symbol: str, ticks: np.ndarray):
+        """Clôture les positions dont le SL ou le TP est franchi par ces ticks."""
+        for position in [p for p in self.positions.values() if p["symbol"] == symbol]:
+            is_buy = position["type"] == self.POSITION_TYPE_BUY
+            prices = ticks["bid"] if is_buy else ticks["ask"]
+            sl, tp = position["sl"], position["tp"]
+            if is_buy:
+                hit_sl = prices <= sl if sl else np.zeros(len(prices), bool)
+                hit_tp = prices >= tp if tp else np.zeros(len(prices), bool)
+            else:
+                hit_sl = prices >= sl if sl else np.zeros(len(prices), bool)
+                hit_tp = prices <= tp if tp else np.zeros(len(prices), bool)
+            hits = np.nonzero(hit_sl | hit_tp)[0]
+            if len(hits):
+                i = hits[0]
+                now, self.now_msc = self.now_msc, int(ticks["time_msc"][i])
+                self._close(position, float(prices[i]), "[sl]" if hit_sl[i] else "[tp]")
+                self.now_msc = now
+
+    def _position_tuple(self, p: dict) -> TradePosition:
+        price = self._close_price(p)
+        return TradePosition(
+            ticket=p["ticket"], time=p["time_msc"] // 1000, time_msc=p["time_msc"], type=p["type"],
+            magic=p["magic"], identifier=p["ticket"], symbol=p["symbol"], volume=p["volume"],
+            price_open=p["price_open"], sl=p["sl"], tp=p["tp"], price_current=price,
+            profit=round(self._profit(p, price), 2), swap=0.0, comment=p["comment"],
+        )
+
+
+# ═══════════════════════════════════════════════════════════════
+# REJEU
+# ═══════════════════════════════════════════════════════════════
+
+class ReplayDriver:
+    """
+    Fait avancer un SimulatedTerminal au rythme des ticks enregistrés.
+    speed=1 : temps réel ; speed=20 : 20× plus vite ; speed=0 : sans attente.
+    """
+
+    def __init__(self, terminal: SimulatedTerminal, speed: float = 1.0, on_tick=None):
+        self.terminal = terminal
+        self.speed    = speed
+        self.on_tick  = on_tick      # rappel optionnel (time_msc) après chaque pas
+        self.done     = threading.Event()
+        self._stop    = threading.Event()
+        self._thread  = None
+
+    def run(self, until_msc: int | None = None):
+        timeline = self.terminal.timeline()
+        if until_msc is not None:
+            timeline = timeline[timeline <= until_msc]
+        if not len(timeline):
+            self.done.set()
+            return
+
+        t0, wall0 = int(timeline[0]), time.monotonic()
+        for msc in timeline:
+            if self._stop.is_set():
+                break
+            if self.speed > 0:
+                delay = wall0 + (int(msc) - t0) / 1000 / self.speed - time.monotonic()
+                if delay > 0:
+                    self._stop.wait(delay)
+            self.terminal.advance(int(msc))
+            if self.on_tick:
+                self.on_tick(int(msc))
+        self.done.set()
+        logging.info(f"🎞️ Rejeu terminé ({len(timeline)} instants)")
+
+    def start(self, until_msc: int | None = None):
+        self._thread = threading.Thread(target=self.run, args=(until_msc,),
+                                        name="Replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+@contextlib.contextmanager
+def patch_mt5(terminal: SimulatedTerminal, modules: list = None):
+    """
+    Remplace l'attribut `mt5` des modules du bot par le terminal simulé
+    (par défaut : tous les modules chargés qui importent MetaTrader5).
+    """
+    real    = sys.modules.get("MetaTrader5")
+    targets = modules or [m for m in list(sys.modules.values())
+                          if m is not None and real is not None and getattr(m, "mt5", None) is real]
+    saved   = [(m, m.mt5) for m in targets]
+    for m in targets:
+        m.mt5 = terminal
+    try:
+        yield terminal
+    finally:
+        for m, original in saved:
+            m.mt5 = original
+
+
+# ═══════════════════════════════════════════════════════════════
+# SIMULATION EN TEMPS VIRTUEL
+# ═══════════════════════════════════════════════════════════════
+
+def simulate(terminal: SimulatedTerminal, symbols: list, start: float | None = None,
+             end: float | None = None, timeout: float | None = None) -> list[dict]:
+    """
+    Exécute les boucles du bot (main.run_bot_for_symbol) contre `terminal` sur
+    une horloge virtuelle (clock.VirtualClock), de `start` à `end` (secondes,
+    heure serveur ; défaut : premier / dernier tick). Les ticks antérieurs à
+    `start` servent d'historique aux indicateurs (M30 : ~4 jours). Le temps saute d'une
+    attente à la suivante : une journée se rejoue en quelques secondes, à
+    l'identique d'une exécution à l'autre.
+    Retourne les événements de trade (save_open / save_close) au lieu de les
+    écrire en base. Les threads de simulation restent bloqués au-delà de `end`.
+    """
+    import clock
+    import database
+    import main
+    import strategy
+
+    timeline = terminal.timeline()
+    if not len(timeline):
+        return []
+    start = int(start if start is not None else int(timeline[0]) // 1000 + 1)
+    end   = end if end is not None else int(timeline[-1]) / 1000
+    terminal.advance(start * 1000)
+
+    events = []
+    vclock = clock.VirtualClock(start, on_advance=lambda t: terminal.advance(int(t * 1000)))
+    submit, database._submit = database._submit, events.append
+    strategy.reset_state()
+    try:
+        with clock.install(vclock), patch_mt5(terminal):
+            for symbol in symbols:
+                vclock.spawn(main.run_bot_for_symbol, symbol, name=f"Sim-{symbol}")
+            if not vclock.run(end, timeout):
+                logging.warning("⚠️ Simulation interrompue (délai réel dépassé)")
+    finally:
+        database._submit = submit
+    return events
+
+
+def main():
+    import argparse
+    import hashlib
+    import json
+
+    parser = argparse.ArgumentParser(description="Simulation du bot en temps virtuel sur des ticks enregistrés")
+    parser.add_argument("--symbols", nargs="+", default=None, help="Symboles (défaut : config.SYMBOL)")
+    parser.add_argument("--from-msc", type=int, default=None, help="Début (time_msc, défaut : tout)")
+    parser.add_argument("--to-msc", type=int, default=None, help="Fin (time_msc, défaut : tout)")
+    parser.add_argument("--start-msc", type=int, default=None,
+                        help="Début de la simulation (ticks antérieurs = historique des indicateurs)")
+    parser.add_argument("--history", action="store_true",
+                        help="Historique de barres antérieur depuis l'archive (bar_archive)")
+    args = parser.parse_args()
+
+    from config import SYMBOL
+    from bar_archive import BarArchive
+    from utils import setup_logging
+
+    setup_logging(level=logging.WARNING, console_level=logging.WARNING, log_suffix="-sim")
+    symbols  = args.symbols or SYMBOL
+    terminal = SimulatedTerminal.from_recording(symbols, args.from_msc, args.to_msc,
+                                                history=BarArchive() if args.history else None)
+    wall0  = time.perf_counter()
+    start  = args.start_msc / 1000 if args.start_msc is not None else None
+    events = simulate(terminal, symbols, start)
+    closes = [e for e in events if e["op"] == "close"]
+
+    digest = hashlib.sha256(json.dumps(events, default=str, sort_keys=True).encode()).hexdigest()
+    print(f"{len(events)} événement(s) | {len(closes)} trade(s) fermé(s) | "
+          f"P&L {sum(e['profit'] for e in closes):+.2f} | solde {terminal.account_info().balance:.2f}")
+    print(f"Empreinte {digest[:16]} | {time.perf_counter() - wall0:.1f}s réelles")
+
+
+if __name__ == "__main__":
+    main()
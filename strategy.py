@@ -8,17 +8,23 @@ Risk Management    : 2% du capital | SL = 1.5×ATR | TP = SL×2 | Break-Even + T
 Fix appliqué       : respect du stop_level MT5 (Invalid stops 10016)
 """
 
-import time
 import threading
+from collections import deque
+from concurrent.futures import CancelledError, Future
 import pandas as pd
-import pandas_ta as ta
 import MetaTrader5 as mt5
 import numpy as np
 import logging
 from datetime import datetime
 
-from database import save_open, save_close
-from utils import send_telegram_alert
+from bar_store import BAR_STORE
+import clock
+from connexion import CONNECTION
+from positions import POSITIONS
+from order_scheduler import ORDERS, PRIORITY_URGENT, PRIORITY_TRAIL
+from database import save_open, save_close, find_open_trades
+from utils import send_telegram_alert, log_record
+from metrics import TimedLock, stage_timer, terminal_timer, timed_stage, inc
 from config import SYMBOL, MAGIC_NUMBER, ACCOUNT_NUMBER
 
 # ═══════════════════════════════════════════════════════════════
@@ -51,21 +57,38 @@ RISK_PER_TRADE = 0.02
 BREAKEVEN_R    = 1.0
 
 # Mutex global MT5 — partagé avec main.py et multi_account.py
-_mt5_lock = threading.Lock()
+# (TimedLock : temps d'attente mesuré séparément quand METRICS_ENABLED=1)
+_mt5_lock = TimedLock("mt5")
 
 
 # ═══════════════════════════════════════════════════════════════
 # LOGGING HELPER
 # ═══════════════════════════════════════════════════════════════
 
-def log_step(symbol: str, step: str, message: str, level: str = "info"):
+_LEVELS = {"debug": logging.DEBUG, "warning": logging.WARNING, "error": logging.ERROR}
+_logger = logging.getLogger()
+
+
+def log_step(symbol: str, step: str, message: str, *args, level: str = "info"):
     """
     Affiche chaque étape d'analyse clairement dans la console.
     Format : [SYMBOLE           ] [ÉTAPE   ] message
+    Formatage paresseux : `message` peut contenir des %-placeholders remplis par
+    `args` ; le formatage n'a lieu que si le niveau est actif, dans le thread
+    du listener de logging.
     """
-    tag  = f"[{symbol[:20]:<20}] [{step:<8}]"
-    full = f"{tag} {message}"
-    getattr(logging, level if level in ("debug", "warning", "error") else "info")(full)
+    lvl = _LEVELS.get(level, logging.INFO)
+    if not _logger.isEnabledFor(lvl):
+        return
+    if not args:
+        message = message.replace("%", "%%")
+    _logger.log(lvl, "[%-20s] [%-8s] " + message, symbol[:20], step, *args)
+
+
+def _outcome(kind: str, symbol: str, outcome: str, **fields):
+    """Issue d'une étape d'analyse : compteur Prometheus + enregistrement structuré."""
+    inc("signals_total", symbol=symbol, outcome=outcome)
+    log_record(kind, symbol=symbol, outcome=outcome, **fields)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -73,23 +96,29 @@ def log_step(symbol: str, step: str, message: str, level: str = "info"):
 # ═══════════════════════════════════════════════════════════════
 
 def get_price_data(symbol: str, timeframe: int, bars: int = 200) -> pd.DataFrame:
-    """Récupère les données OHLCV."""
-    try:
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars)
-        if rates is None or len(rates) == 0:
-            return pd.DataFrame()
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        return df
-    except Exception as e:
-        logging.error(f"get_price_data [{symbol}] tf={timeframe} : {e}")
-        return pd.DataFrame()
+    """
+    Récupère les données OHLCV depuis le magasin partagé (bar_store) : seules les
+    barres nouvelles sont lues au terminal ; le DataFrame est une vue en lecture seule.
+    """
+    return BAR_STORE.frame(symbol, timeframe, bars)
+
+
+def warm_start(symbols: list) -> int:
+    """
+    Démarrage : import de pandas_ta et amorçage des séries depuis l'archive,
+    sans appel terminal (exécuté en parallèle de la connexion).
+    Retourne le nombre de barres chargées.
+    """
+    _ta()
+    return sum(BAR_STORE.preload(symbol, tf, bars)
+               for symbol in symbols for tf, bars in TF_BARS.items())
 
 
 def get_current_tick(symbol: str):
     """Retourne le tick courant ou None."""
     try:
-        return mt5.symbol_info_tick(symbol)
+        with terminal_timer("symbol_info_tick", symbol):
+            return mt5.symbol_info_tick(symbol)
     except Exception as e:
         logging.error(f"get_current_tick [{symbol}] : {e}")
         return None
@@ -99,13 +128,25 @@ def get_current_tick(symbol: str):
 # INDICATEURS
 # ═══════════════════════════════════════════════════════════════
 
+# pandas_ta : import différé (arbre d'import lourd), préchargé par warm_start() au démarrage
+_ta_module = None
+
+
+def _ta():
+    global _ta_module
+    if _ta_module is None:
+        import pandas_ta
+        _ta_module = pandas_ta
+    return _ta_module
+
+
 def calc_ema(series: pd.Series, period: int) -> pd.Series:
-    result = ta.ema(series, length=period)
+    result = _ta().ema(series, length=period)
     return result if result is not None else pd.Series(dtype=float)
 
 
 def calc_atr(df: pd.DataFrame, period: int = ATR_PERIOD) -> pd.Series:
-    result = ta.atr(df['high'], df['low'], df['close'], length=period)
+    result = _ta().atr(df['high'], df['low'], df['close'], length=period)
     return result if result is not None else pd.Series(dtype=float)
 
 
@@ -119,7 +160,8 @@ def get_min_stop_distance(symbol: str) -> float:
     MT5 définit stops_level en 'points' → conversion en prix.
     """
     try:
-        info = mt5.symbol_info(symbol)
+        with terminal_timer("symbol_info", symbol):
+            info = mt5.symbol_info(symbol)
         if info is None:
             return 0.0
         return info.stops_level * info.point
@@ -156,39 +198,56 @@ def enforce_min_stop(symbol: str, entry: float, sl: float, tp: float,
 # SIZING DYNAMIQUE (2% du capital)
 # ═══════════════════════════════════════════════════════════════
 
+def lot_for_risk(balance: float, risk_percent: float, sl_distance: float, info) -> float:
+    """
+    Volume qui risque risk_percent de `balance` pour un SL à `sl_distance`
+    (calcul pur : `info` = symbol_info du symbole, ou tout objet équivalent).
+    """
+    if sl_distance <= 0:
+        return 0.01
+
+    distance_ticks = sl_distance / info.trade_tick_size
+    cost_per_lot   = distance_ticks * info.trade_tick_value
+
+    if cost_per_lot == 0:
+        return info.volume_min
+
+    lot = balance * risk_percent / cost_per_lot
+    lot = round(lot / info.volume_step) * info.volume_step
+    lot = max(info.volume_min, min(info.volume_max, lot))
+    return float(lot)
+
+
 def get_dynamic_lot(symbol: str, entry_price: float, sl_price: float,
-                    risk_percent: float = RISK_PER_TRADE) -> float:
-    """Calcule le volume pour risquer exactement risk_percent du capital."""
+                    risk_percent: float = RISK_PER_TRADE, info=None) -> float:
+    """
+    Calcule le volume pour risquer exactement risk_percent du capital.
+    info : symbol_info déjà lu par l'appelant (sinon lu ici).
+    """
     try:
-        account_info = mt5.account_info()
+        with terminal_timer("account_info", symbol):
+            account_info = mt5.account_info()
         if not account_info:
             return 0.01
 
         balance     = account_info.balance
-        risk_amount = balance * risk_percent
         distance_sl = abs(entry_price - sl_price)
 
         if distance_sl == 0:
             return 0.01
 
-        info = mt5.symbol_info(symbol)
+        if info is None:
+            with terminal_timer("symbol_info", symbol):
+                info = mt5.symbol_info(symbol)
         if not info:
             return 0.01
 
-        distance_ticks = distance_sl / info.trade_tick_size
-        cost_per_lot   = distance_ticks * info.trade_tick_value
-
-        if cost_per_lot == 0:
-            return info.volume_min
-
-        lot = risk_amount / cost_per_lot
-        lot = round(lot / info.volume_step) * info.volume_step
-        lot = max(info.volume_min, min(info.volume_max, lot))
+        lot = lot_for_risk(balance, risk_percent, distance_sl, info)
 
         log_step(symbol, "LOT",
-                 f"Solde={balance:.2f} | Risque={risk_amount:.2f} | "
-                 f"SL_dist={distance_sl:.5f} | Lot calculé={lot:.2f}")
-        return float(lot)
+                 "Solde=%.2f | Risque=%.2f | SL_dist=%.5f | Lot calculé=%.2f",
+                 balance, balance * risk_percent, distance_sl, lot)
+        return lot
 
     except Exception as e:
         logging.error(f"get_dynamic_lot [{symbol}] : {e}")
@@ -235,8 +294,8 @@ def analyze_timeframe(symbol: str, timeframe: int) -> str:
     else:
         trend, emoji = 'NEUTRAL', '➡️'
 
-    log_step(symbol, tf_label,
-             f"{emoji} Tendance={trend} | Prix={cl:.5f} | EMA20={e20:.5f} | EMA50={e50:.5f}")
+    log_step(symbol, tf_label, "%s Tendance=%s | Prix=%.5f | EMA20=%.5f | EMA50=%.5f",
+             emoji, trend, cl, e20, e50)
     return trend
 
 
@@ -275,8 +334,8 @@ def detect_ema_crossover_m1(symbol: str) -> dict | None:
         return None
 
     log_step(symbol, "M1-SIG",
-             f"EMA20={e20_cur:.5f} EMA50={e50_cur:.5f} ATR={atr_val:.5f} | "
-             f"Prev : EMA20={e20_prev:.5f} EMA50={e50_prev:.5f}")
+             "EMA20=%.5f EMA50=%.5f ATR=%.5f | Prev : EMA20=%.5f EMA50=%.5f",
+             e20_cur, e50_cur, atr_val, e20_prev, e50_prev)
 
     sl_dist_raw = ATR_SL_MULT * atr_val
 
@@ -320,51 +379,63 @@ def detect_ema_crossover_m1(symbol: str) -> dict | None:
 # ANALYSE MULTI-TIMEFRAME PRINCIPALE
 # ═══════════════════════════════════════════════════════════════
 
+@timed_stage("get_signal")
 def get_signal(symbol: str) -> dict | None:
     """
     Analyse complète M30 → M15 → M1.
     La tendance M30 est directrice ; M15 doit être aligné avant de chercher le signal M1.
     """
+    inc("analysis_cycles_total", symbol=symbol)
     logging.info("─" * 65)
-    log_step(symbol, "ANALYSE", f"🔎 Début analyse multi-timeframe (M30 → M15 → M1)")
+    log_step(symbol, "ANALYSE", "🔎 Début analyse multi-timeframe (M30 → M15 → M1)")
 
     # ÉTAPE 1 — Tendance M30 (directrice)
-    trend_m30 = analyze_timeframe(symbol, TF_M30)
+    with stage_timer("trend_m30", symbol):
+        trend_m30 = analyze_timeframe(symbol, TF_M30)
     if trend_m30 == 'NEUTRAL':
         log_step(symbol, "ANALYSE",
                  "⛔ Tendance M30 neutre → analyse arrêtée", level="warning")
+        _outcome("signal", symbol, "m30_neutral", m30=trend_m30)
         return None
     log_step(symbol, "ANALYSE",
-             f"📌 Tendance directrice M30={trend_m30} → M15 et M1 doivent être alignés")
+             "📌 Tendance directrice M30=%s → M15 et M1 doivent être alignés", trend_m30)
 
     # ÉTAPE 2 — Confirmation M15
-    trend_m15 = analyze_timeframe(symbol, TF_M15)
+    with stage_timer("trend_m15", symbol):
+        trend_m15 = analyze_timeframe(symbol, TF_M15)
     if trend_m15 != trend_m30:
         log_step(symbol, "ANALYSE",
-                 f"⛔ M15={trend_m15} ≠ M30={trend_m30} → pas de trade", level="warning")
+                 "⛔ M15=%s ≠ M30=%s → pas de trade", trend_m15, trend_m30, level="warning")
+        _outcome("signal", symbol, "m15_misaligned", m30=trend_m30, m15=trend_m15)
         return None
-    log_step(symbol, "ANALYSE", f"✅ M15 aligné avec M30 ({trend_m15})")
+    log_step(symbol, "ANALYSE", "✅ M15 aligné avec M30 (%s)", trend_m15)
 
     log_step(symbol, "ANALYSE",
-             f"🟢 M30 + M15 ALIGNÉS ({trend_m30}) → recherche signal M1")
+             "🟢 M30 + M15 ALIGNÉS (%s) → recherche signal M1", trend_m30)
 
     # ÉTAPE 3 — Signal M1
-    signal = detect_ema_crossover_m1(symbol)
+    with stage_timer("signal_m1", symbol):
+        signal = detect_ema_crossover_m1(symbol)
 
     if signal is None:
         log_step(symbol, "ANALYSE", "— Pas de signal M1 pour l'instant")
+        _outcome("signal", symbol, "no_crossover", m30=trend_m30, m15=trend_m15)
         return None
 
     if (trend_m30 == 'UP' and signal['type'] != 'BUY') or \
        (trend_m30 == 'DOWN' and signal['type'] != 'SELL'):
         log_step(symbol, "ANALYSE",
-                 f"⛔ Signal M1={signal['type']} opposé à M30={trend_m30} → ignoré",
+                 "⛔ Signal M1=%s opposé à M30=%s → ignoré", signal['type'], trend_m30,
                  level="warning")
+        _outcome("signal", symbol, "opposite", m30=trend_m30, m15=trend_m15,
+                 type=signal['type'])
         return None
 
-    log_step(symbol, "SIGNAL",
-             f"🎯 SIGNAL VALIDÉ : {signal['type']} | "
-             f"Entry={signal['entry_price']:.5f} SL={signal['sl']:.5f} TP={signal['tp']:.5f}")
+    log_step(symbol, "SIGNAL", "🎯 SIGNAL VALIDÉ : %s | Entry=%.5f SL=%.5f TP=%.5f",
+             signal['type'], signal['entry_price'], signal['sl'], signal['tp'])
+    _outcome("signal", symbol, "signal", m30=trend_m30, m15=trend_m15,
+             type=signal['type'], entry=float(signal['entry_price']),
+             sl=float(signal['sl']), tp=float(signal['tp']), atr=float(signal['atr']))
     return signal
 
 
@@ -372,36 +443,159 @@ def get_signal(symbol: str) -> dict | None:
 # FILTRE VOLATILITÉ
 # ═══════════════════════════════════════════════════════════════
 
+VOL_BARS       = 50      # Fenêtre M30 du filtre (ATR courant vs moyenne)
+VOL_THRESHOLD  = 0.70    # ATR courant >= 70% de la moyenne → marché actif
+BAR_CLOSE_LAG  = 2       # Secondes après la clôture broker avant lecture de la barre
+
+TF_SECONDS = {
+    TF_M30: 1800,
+    TF_M15: 900,
+    TF_M1:  60,
+}
+
+
+class VolatilityRegime:
+    """
+    Régime de volatilité M30 d'un symbole, maintenu incrémentalement sur les
+    barres clôturées : ATR de Wilder mis à jour barre par barre et fenêtre
+    glissante des ATR pour la moyenne. Réévalué uniquement à la clôture M30.
+    """
+
+    def __init__(self):
+        self.bar_time   = 0        # Heure (serveur) de la dernière barre clôturée intégrée
+        self.prev_close = 0.0
+        self.atr        = float("nan")
+        self.history    = deque(maxlen=VOL_BARS - ATR_PERIOD)
+        self.ok         = False
+        self.reason     = "Non évalué"
+        self.next_check = 0.0      # clock.monotonic() de la prochaine clôture M30
+
+    def seed(self, df: pd.DataFrame):
+        """Initialisation complète depuis VOL_BARS barres clôturées."""
+        atr = calc_atr(df, ATR_PERIOD).dropna()
+        self.history.clear()
+        self.history.extend(float(v) for v in atr)
+        self.atr        = float(atr.iloc[-1]) if not atr.empty else float("nan")
+        self.prev_close = float(df['close'].iloc[-1])
+        self.bar_time   = int(df['time'].iloc[-1].timestamp())
+
+    def update(self, high: float, low: float, close: float, bar_time: int):
+        """Intègre une nouvelle barre clôturée (RMA de Wilder, comme ta.atr)."""
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.atr        = (self.atr * (ATR_PERIOD - 1) + tr) / ATR_PERIOD
+        self.prev_close = close
+        self.bar_time   = bar_time
+        self.history.append(self.atr)
+
+
+_vol_regimes: dict = {}
+
+
+def seconds_until_next_bar(symbol: str, timeframe: int = TF_M30) -> float:
+    """
+    Délai jusqu'à la clôture de la barre en cours, calculé sur l'heure serveur
+    du dernier tick (les barres MT5 sont alignées sur l'heure du broker).
+    """
+    period = TF_SECONDS[timeframe]
+    tick   = get_current_tick(symbol)
+    if not tick:
+        return 60.0
+    return float(period - tick.time % period + BAR_CLOSE_LAG)
+
+
+@timed_stage("is_volatility_good")
 def is_volatility_good(symbol: str) -> tuple:
-    """Vérifie si l'ATR M30 est > 70% de sa moyenne → marché actif."""
+    """
+    Vérifie si l'ATR M30 est > 70% de sa moyenne → marché actif.
+    Le régime est calculé sur les barres M30 clôturées et mis en cache jusqu'à
+    la clôture suivante : entre deux clôtures, aucun appel terminal.
+    """
+    regime = _vol_regimes.setdefault(symbol, VolatilityRegime())
+    if clock.monotonic() < regime.next_check:
+        return regime.ok, regime.reason
+
     log_step(symbol, "VOL", "Vérification volatilité (ATR M30)...")
-    df = get_price_data(symbol, TF_M30, 50)
-    if df.empty:
-        log_step(symbol, "VOL", "❌ Pas de données M30", level="warning")
-        return False, "Pas de données M30"
+    if not _refresh_regime(symbol, regime):
+        return regime.ok, regime.reason
 
-    atr = calc_atr(df, ATR_PERIOD)
-    if atr.empty or len(atr.dropna()) < 5:
-        log_step(symbol, "VOL", "❌ ATR insuffisant", level="warning")
-        return False, "ATR insuffisant"
+    regime.next_check = clock.monotonic() + seconds_until_next_bar(symbol, TF_M30)
 
-    current_atr = atr.iloc[-1]
-    avg_atr     = atr.dropna().mean()
+    current_atr = regime.atr
+    avg_atr     = sum(regime.history) / len(regime.history)
 
-    if current_atr < avg_atr * 0.70:
+    if current_atr < avg_atr * VOL_THRESHOLD:
         msg = f"⚠️ Marché calme : ATR={current_atr:.5f} < 70% moy={avg_atr:.5f}"
         log_step(symbol, "VOL", msg, level="warning")
+        _outcome("volatility", symbol, "low_volatility",
+                 atr=float(current_atr), avg=float(avg_atr))
+        regime.ok, regime.reason = False, msg
         return False, msg
 
-    log_step(symbol, "VOL",
-             f"✅ Volatilité OK : ATR={current_atr:.5f} / moy={avg_atr:.5f}")
+    log_step(symbol, "VOL", "✅ Volatilité OK : ATR=%.5f / moy=%.5f", current_atr, avg_atr)
+    log_record("volatility", symbol=symbol, outcome="ok", atr=float(current_atr), avg=float(avg_atr))
+    regime.ok, regime.reason = True, "OK"
     return True, "OK"
 
 
+def _refresh_regime(symbol: str, regime: VolatilityRegime) -> bool:
+    """
+    Intègre les barres M30 clôturées depuis la dernière évaluation : seules les
+    barres manquantes sont lues (magasin de barres partagé).
+    """
+    period = TF_SECONDS[TF_M30]
+    if regime.bar_time:
+        tick    = get_current_tick(symbol)
+        missing = int((tick.time - regime.bar_time) // period) - 1 if tick else VOL_BARS
+    else:
+        missing = VOL_BARS
+
+    if 0 < missing < VOL_BARS:
+        df = _closed_bars(symbol, TF_M30, missing)
+        if not df.empty:
+            # Unité explicite : 'time' peut être en datetime64[ns] (pandas < 2, autre source)
+            times = df['time'].to_numpy().astype("datetime64[s]").astype(np.int64)
+            for bar_time, high, low, close in zip(times, df['high'], df['low'], df['close']):
+                if int(bar_time) > regime.bar_time:
+                    regime.update(float(high), float(low), float(close), int(bar_time))
+            return True
+
+    if missing == 0 and regime.history:
+        return True
+
+    # Premier passage ou trop de barres manquées : recalcul complet
+    df = _closed_bars(symbol, TF_M30, VOL_BARS)
+    if df.empty:
+        log_step(symbol, "VOL", "❌ Pas de données M30", level="warning")
+        regime.ok, regime.reason, regime.next_check = False, "Pas de données M30", 0.0
+        return False
+
+    regime.seed(df)
+    if len(regime.history) < 5:
+        log_step(symbol, "VOL", "❌ ATR insuffisant", level="warning")
+        regime.ok, regime.reason, regime.next_check = False, "ATR insuffisant", 0.0
+        return False
+    return True
+
+
+def _closed_bars(symbol: str, timeframe: int, bars: int) -> pd.DataFrame:
+    """Barres clôturées uniquement (la barre en formation, position 0, est exclue)."""
+    df = BAR_STORE.frame(symbol, timeframe, bars + 1)
+    return df.iloc[:-1] if not df.empty else df
+
+
+def volatility_retry_delay(symbol: str) -> float:
+    """Délai avant la prochaine évaluation utile du régime (clôture M30 suivante)."""
+    regime = _vol_regimes.get(symbol)
+    if regime is None or regime.next_check == 0.0:
+        return 60.0
+    return max(1.0, regime.next_check - clock.monotonic())
+
+
 # ═══════════════════════════════════════════════════════════════
 # PRÉPARATION ET EXÉCUTION DES TRADES
 # ═══════════════════════════════════════════════════════════════
 
+@timed_stage("prepare_trade_request")
 def prepare_trade_request(symbol: str, signal: dict) -> tuple:
     """
     Prépare la requête MT5 avec SL/TP validés.
@@ -421,7 +615,10 @@ def prepare_trade_request(symbol: str, signal: dict) -> tuple:
     tp_raw       = entry_price + sl_dist * RR_RATIO if is_buy else entry_price - sl_dist * RR_RATIO
     sl, tp, sl_dist_final = enforce_min_stop(symbol, entry_price, sl_raw, tp_raw, is_buy)
 
-    lot = get_dynamic_lot(symbol, entry_price, sl, RISK_PER_TRADE)
+    # Spec du symbole lue une fois : lot du maître et des comptes suiveurs (multi-comptes)
+    with terminal_timer("symbol_info", symbol):
+        spec = mt5.symbol_info(symbol)
+    lot = get_dynamic_lot(symbol, entry_price, sl, RISK_PER_TRADE, info=spec)
 
     log_step(symbol, "EXEC",
              f"Ordre préparé | {signal['type']} @ {entry_price:.5f} | "
@@ -447,11 +644,13 @@ def prepare_trade_request(symbol: str, signal: dict) -> tuple:
     signal['_exec_sl']    = sl
     signal['_exec_tp']    = tp
     signal['_exec_lot']   = lot
+    signal['_exec_spec']  = spec
     signal['sl_dist']     = sl_dist_final
 
     return request, lot, entry_price
 
 
+@timed_stage("open_trade")
 def open_trade(symbol: str, signal: dict) -> tuple:
     """Exécute un trade (single-account). Returns: (ticket, lot)."""
     request, lot, entry_price = prepare_trade_request(symbol, signal)
@@ -460,8 +659,14 @@ def open_trade(symbol: str, signal: dict) -> tuple:
 
     log_step(symbol, "EXEC", "📤 Envoi ordre MT5...")
 
-    with _mt5_lock:
-        result = mt5.order_send(request)
+    def send():
+        with _mt5_lock, terminal_timer("order_send", symbol):
+            return mt5.order_send(request)
+
+    inc("orders_sent_total", symbol=symbol, account=ACCOUNT_NUMBER)
+    result = ORDERS.call(send, account=ACCOUNT_NUMBER, priority=PRIORITY_URGENT, symbol=symbol)
+    inc("order_results_total", symbol=symbol, account=ACCOUNT_NUMBER,
+        retcode=result.retcode if result is not None else "none")
 
     if result is None:
         log_step(symbol, "EXEC", "❌ order_send a retourné None", level="error")
@@ -509,7 +714,20 @@ def open_trade(symbol: str, signal: dict) -> tuple:
 # ═══════════════════════════════════════════════════════════════
 
 def modify_sl_tp(symbol: str, ticket: int, new_sl: float, new_tp: float) -> bool:
-    """Modifie SL et TP d'une position ouverte."""
+    """Modifie SL et TP d'une position ouverte (attend l'envoi ; False si remplacé)."""
+    try:
+        return submit_sl_tp(symbol, ticket, new_sl, new_tp).result()
+    except CancelledError:
+        return False
+
+
+def submit_sl_tp(symbol: str, ticket: int, new_sl: float, new_tp: float,
+                 account_number: int = ACCOUNT_NUMBER) -> Future:
+    """
+    Met la modification en file (priorité trailing) sans attendre : une cible
+    plus récente pour le même ticket remplace celle encore en attente.
+    Future → bool (annulé si remplacé).
+    """
     request = {
         "action":   mt5.TRADE_ACTION_SLTP,
         "symbol":   symbol,
@@ -518,112 +736,210 @@ def modify_sl_tp(symbol: str, ticket: int, new_sl: float, new_tp: float) -> bool
         "tp":       float(new_tp),
         "magic":    MAGIC_NUMBER,
     }
-    with _mt5_lock:
-        result = mt5.order_send(request)
 
-    if result is None or result.retcode != mt5.TRADE_RETCODE_DONE:
-        comment = result.comment if result else "None"
-        log_step(symbol, "TRAIL",
-                 f"❌ Échec modify SL/TP #{ticket} : {comment}", level="error")
-        return False
-    return True
+    def send() -> bool:
+        with _mt5_lock, terminal_timer("order_send_sltp", symbol):
+            result = mt5.order_send(request)
+
+        ok = result is not None and result.retcode == mt5.TRADE_RETCODE_DONE
+        inc("sl_modifications_total", symbol=symbol, result="ok" if ok else "failed")
+        if not ok:
+            comment = result.comment if result else "None"
+            log_step(symbol, "TRAIL",
+                     f"❌ Échec modify SL/TP #{ticket} : {comment}", level="error")
+        return ok
+
+    return ORDERS.submit(send, account=account_number, priority=PRIORITY_TRAIL,
+                         key=("sltp", account_number, ticket), symbol=symbol)
 
 
 # ═══════════════════════════════════════════════════════════════
 # SURVEILLANCE — Break-Even + Trailing Stop
 # ═══════════════════════════════════════════════════════════════
 
-def monitor_active_trade(symbol: str, ticket: int, lot: float,
-                          signal: dict, account_number: int = None):
-    """Surveillance active avec break-even et trailing stop basé sur ATR."""
-    acc_num      = account_number if account_number is not None else ACCOUNT_NUMBER
-    entry_price  = signal.get('_exec_entry', signal['entry_price'])
-    sl_dist      = signal['sl_dist']
-    risk_amount  = sl_dist * lot
-    is_buy       = signal['type'] == 'BUY'
-    breakeven_ok = False
-    best_price   = entry_price
+MONITOR_INTERVAL = 5     # secondes entre deux passes de surveillance
 
-    log_step(symbol, "WATCH",
-             f"👁️ Surveillance | Ticket={ticket} | {signal['type']} @ {entry_price:.5f} "
-             f"| Lot={lot:.2f} | Risk≈{risk_amount:.2f}")
-
-    while True:
-        time.sleep(5)
 
-        with _mt5_lock:
-            pos_list = mt5.positions_get(ticket=ticket)
+class TradeMonitor:
+    """
+    État de surveillance d'une position (break-even + trailing stop ATR).
+    step() effectue une passe ; la boucle (thread ou tâche asyncio) est à l'appelant.
+    """
 
-        if not pos_list:
+    def __init__(self, symbol: str, ticket: int, lot: float,
+                 signal: dict, account_number: int = None):
+        self.symbol       = symbol
+        self.ticket       = ticket
+        self.lot          = lot
+        self.acc_num      = account_number if account_number is not None else ACCOUNT_NUMBER
+        self.entry_price  = signal.get('_exec_entry', signal['entry_price'])
+        self.sl_dist      = signal['sl_dist']
+        self.risk_amount  = self.sl_dist * lot
+        self.is_buy       = signal['type'] == 'BUY'
+        self.breakeven_ok = False
+        self.best_price   = self.entry_price
+        self.opened_at    = clock.monotonic()
+        self.closed       = threading.Event()   # posé par le carnet de positions
+        self.on_close     = None                # rappel de réveil (tâche asyncio de l'orchestrateur)
+
+        log_step(symbol, "WATCH",
+                 f"👁️ Surveillance | Ticket={ticket} | {signal['type']} @ {self.entry_price:.5f} "
+                 f"| Lot={lot:.2f} | Risk≈{self.risk_amount:.2f}")
+
+    def step(self) -> bool:
+        """Une passe de surveillance. Retourne False quand la position est fermée."""
+        symbol, ticket, is_buy = self.symbol, self.ticket, self.is_buy
+
+        # Terminal déconnecté : surveillance suspendue, état (meilleur prix, SL) conservé
+        if not CONNECTION.is_connected():
+            return True
+
+        # Instantané partagé ; un relevé antérieur à l'ouverture ne prouve rien
+        snapshot = POSITIONS.snapshot()
+        if not snapshot.ok or snapshot.taken_at < self.opened_at:
+            return True
+        position = snapshot.get(ticket)
+        if position is None:
             log_step(symbol, "WATCH", f"🏁 Position #{ticket} fermée")
-            _record_trade_close(acc_num, symbol, ticket)
-            break
+            return False
 
-        position   = pos_list[0]
         current_sl = position.sl
         current_tp = position.tp
         profit_usd = position.profit
 
         tick = get_current_tick(symbol)
         if not tick:
-            continue
+            return True
 
         current_price = tick.bid if is_buy else tick.ask
 
         df_m1   = get_price_data(symbol, TF_M1, 50)
         atr_now = calc_atr(df_m1, ATR_PERIOD)
         if atr_now.empty or pd.isna(atr_now.iloc[-1]):
-            continue
+            return True
         atr_val = atr_now.iloc[-1]
 
         new_sl  = current_sl
         updated = False
 
         if is_buy:
-            if current_price > best_price:
-                best_price = current_price
+            if current_price > self.best_price:
+                self.best_price = current_price
 
-            if not breakeven_ok and profit_usd >= risk_amount * BREAKEVEN_R:
-                new_sl       = entry_price + (atr_val * 0.1)
-                breakeven_ok = True
+            if not self.breakeven_ok and profit_usd >= self.risk_amount * BREAKEVEN_R:
+                new_sl            = self.entry_price + (atr_val * 0.1)
+                self.breakeven_ok = True
                 log_step(symbol, "BE",
                          f"🔒 BREAK-EVEN activé #{ticket} | SL → {new_sl:.5f} | "
                          f"P&L flottant={profit_usd:+.2f}")
 
-            trailing_sl = best_price - (ATR_TRAIL_MULT * atr_val)
+            trailing_sl = self.best_price - (ATR_TRAIL_MULT * atr_val)
             if trailing_sl > new_sl:
                 new_sl  = trailing_sl
                 updated = True
 
         else:
-            if current_price < best_price or best_price == entry_price:
-                best_price = current_price
+            if current_price < self.best_price or self.best_price == self.entry_price:
+                self.best_price = current_price
 
-            if not breakeven_ok and profit_usd >= risk_amount * BREAKEVEN_R:
-                new_sl       = entry_price - (atr_val * 0.1)
-                breakeven_ok = True
+            if not self.breakeven_ok and profit_usd >= self.risk_amount * BREAKEVEN_R:
+                new_sl            = self.entry_price - (atr_val * 0.1)
+                self.breakeven_ok = True
                 log_step(symbol, "BE",
                          f"🔒 BREAK-EVEN activé #{ticket} | SL → {new_sl:.5f} | "
                          f"P&L flottant={profit_usd:+.2f}")
 
-            trailing_sl = best_price + (ATR_TRAIL_MULT * atr_val)
+            trailing_sl = self.best_price + (ATR_TRAIL_MULT * atr_val)
             if current_sl == 0 or trailing_sl < new_sl:
                 new_sl  = trailing_sl
                 updated = True
 
-        if new_sl != current_sl and (updated or (breakeven_ok and new_sl != current_sl)):
-            if modify_sl_tp(symbol, ticket, new_sl, current_tp):
-                log_step(symbol, "TRAIL",
-                         f"{'📈' if is_buy else '📉'} SL mis à jour #{ticket} | "
-                         f"{current_sl:.5f} → {new_sl:.5f} | "
-                         f"Best={best_price:.5f} | P&L={profit_usd:+.2f}")
+        if new_sl != current_sl and (updated or (self.breakeven_ok and new_sl != current_sl)):
+            # Envoi différé par l'ordonnanceur : la passe suivante n'attend pas le broker
+            best = self.best_price
+
+            def done(future):
+                if not future.cancelled() and future.exception() is None and future.result():
+                    log_step(symbol, "TRAIL",
+                             f"{'📈' if is_buy else '📉'} SL mis à jour #{ticket} | "
+                             f"{current_sl:.5f} → {new_sl:.5f} | "
+                             f"Best={best:.5f} | P&L={profit_usd:+.2f}")
+
+            submit_sl_tp(symbol, ticket, new_sl, current_tp, self.acc_num).add_done_callback(done)
+        return True
+
+    def record_close(self, delay: float = 1.0):
+        _record_trade_close(self.acc_num, self.symbol, self.ticket, delay)
+
+
+_MONITORS: dict = {}    # ticket → TradeMonitor surveillé (thread ou tâche asyncio)
+
+
+def reset_state():
+    """Caches du bot remis à zéro (séries, régimes, positions) : simulation rejouable."""
+    BAR_STORE.clear()
+    POSITIONS.reset()
+    _vol_regimes.clear()
+    _MONITORS.clear()
+
+
+def _on_position_event(event: str, position):
+    monitor = _MONITORS.get(position.ticket)
+    if event == "close" and monitor is not None:
+        monitor.closed.set()
+        if monitor.on_close is not None:
+            monitor.on_close()
+
+
+def register_monitor(monitor: TradeMonitor):
+    """Réveil anticipé de `monitor` quand le carnet de positions voit sa fermeture."""
+    _MONITORS[monitor.ticket] = monitor
+
+
+def unregister_monitor(monitor: TradeMonitor):
+    _MONITORS.pop(monitor.ticket, None)
+
+
+POSITIONS.subscribe(_on_position_event)
 
 
-def _record_trade_close(account_number: int, symbol: str, ticket: int):
+def monitor_active_trade(symbol: str, ticket: int, lot: float,
+                          signal: dict, account_number: int = None):
+    """Surveillance active avec break-even et trailing stop basé sur ATR."""
+    run_monitor(TradeMonitor(symbol, ticket, lot, signal, account_number))
+
+
+def run_monitor(monitor: TradeMonitor):
+    """Boucle de surveillance (thread) jusqu'à la fermeture de la position."""
+    register_monitor(monitor)
+    try:
+        _monitor_loop(monitor)
+    finally:
+        unregister_monitor(monitor)
+
+
+def _monitor_loop(monitor: TradeMonitor):
+    while True:
+        # Réveil anticipé à la fermeture, consommé : si la passe ne la confirme pas
+        # encore (déconnexion, instantané en retard), la suivante attend l'intervalle
+        if clock.wait(monitor.closed, MONITOR_INTERVAL):
+            monitor.closed.clear()
+        try:
+            alive = monitor.step()
+        except Exception as e:
+            logging.error(f"❌ Exception surveillance #{monitor.ticket} : {e}", exc_info=True)
+            continue
+        if not alive:
+            monitor.record_close()
+            break
+
+
+def _record_trade_close(account_number: int, symbol: str, ticket: int, delay: float = 1.0):
     """Récupère le profit réel depuis MT5 et sauvegarde en base."""
-    time.sleep(1)
+    if delay:
+        clock.sleep(delay)   # Laisse au terminal le temps d'enregistrer le deal de sortie
     try:
-        with _mt5_lock:
+        with _mt5_lock, terminal_timer("history_deals_get", symbol):
             history = mt5.history_deals_get(position=ticket)
 
         if not history:
@@ -656,3 +972,97 @@ def _record_trade_close(account_number: int, symbol: str, ticket: int):
     except Exception as e:
         log_step(symbol, "DB",
                  f"❌ Erreur enregistrement #{ticket} : {e}", level="error")
+
+
+# ═══════════════════════════════════════════════════════════════
+# REPRISE DES POSITIONS AU DÉMARRAGE
+# ═══════════════════════════════════════════════════════════════
+
+MAX_RECOVERY_BARS = 10_000    # barres M1 relues au plus pour le meilleur prix
+
+
+def _best_price_since(symbol: str, open_time: int, is_buy: bool, entry: float) -> float:
+    """Meilleur prix atteint depuis l'ouverture (plus haut / plus bas des barres M1)."""
+    tick = get_current_tick(symbol)
+    if not tick:
+        return entry
+    count = min(MAX_RECOVERY_BARS, (tick.time - open_time) // 60 + 2)
+    with _mt5_lock, terminal_timer("copy_rates_from_pos", symbol):
+        rates = mt5.copy_rates_from_pos(symbol, TF_M1, 0, max(count, 1))
+    if rates is None or len(rates) == 0:
+        return entry
+
+    since = rates[rates["time"] >= open_time - open_time % 60]
+    if len(since) == 0:
+        return entry
+    return max(entry, float(since["high"].max())) if is_buy else min(entry, float(since["low"].min()))
+
+
+def monitor_from_position(position) -> TradeMonitor:
+    """
+    Reconstruit l'état de surveillance d'une position ouverte avant le démarrage :
+    entrée = price_open, distance SL depuis le SL initial (repli ATR si le SL a
+    déjà été remonté au-delà de l'entrée), meilleur prix depuis les barres M1.
+    """
+    symbol = position.symbol
+    is_buy = position.type == mt5.POSITION_TYPE_BUY
+    entry  = position.price_open
+
+    sl_dist   = abs(entry - position.sl) if position.sl else 0.0
+    protected = bool(position.sl) and (position.sl >= entry if is_buy else position.sl <= entry)
+    if not sl_dist or protected:
+        atr = calc_atr(get_price_data(symbol, TF_M1, 50), ATR_PERIOD)
+        if not atr.empty and not pd.isna(atr.iloc[-1]):
+            sl_dist = ATR_SL_MULT * float(atr.iloc[-1])
+
+    signal  = {'type': 'BUY' if is_buy else 'SELL', 'entry_price': entry, 'sl_dist': sl_dist}
+    monitor = TradeMonitor(symbol, position.ticket, position.volume, signal, ACCOUNT_NUMBER)
+    monitor.breakeven_ok = protected
+    monitor.best_price   = _best_price_since(symbol, position.time, is_buy, entry)
+    return monitor
+
+
+def recover_open_positions(symbols: list = None) -> list[TradeMonitor]:
+    """
+    Positions du bot (MAGIC_NUMBER) ouvertes avant le démarrage : un seul
+    relevé du carnet de positions, un TradeMonitor par position, puis rapprochement MongoDB :
+      - positions absentes de la base → enregistrées (upsert save_open, avec
+        l'heure d'ouverture de la position) ;
+      - trades « OPEN » en base sans position → clôture enregistrée depuis
+        l'historique (thread DB-Reconcile).
+    """
+    symbols = list(symbols or SYMBOL)
+    snapshot = POSITIONS.refresh()
+    if not snapshot.ok:
+        logging.warning("⚠️ Reprise des positions impossible : positions_get indisponible")
+        return []
+
+    ours     = [p for p in snapshot.positions if p.magic == MAGIC_NUMBER and p.symbol in symbols]
+    monitors = []
+    for position in ours:
+        try:
+            monitors.append(monitor_from_position(position))
+            save_open(ACCOUNT_NUMBER, position.symbol, position.ticket,
+                      'BUY' if position.type == mt5.POSITION_TYPE_BUY else 'SELL',
+                      position.price_open, ts=datetime.utcfromtimestamp(position.time))
+        except Exception as e:
+            log_step(position.symbol, "WATCH",
+                     f"❌ Reprise #{position.ticket} impossible : {e}", level="error")
+
+    # Rapprochement en arrière-plan : la surveillance reprend sans attendre MongoDB
+    threading.Thread(target=_reconcile_open_trades, args=(symbols, {p.ticket for p in ours}),
+                     name="DB-Reconcile", daemon=True).start()
+
+    if monitors:
+        logging.info(f"🔁 {len(monitors)} position(s) reprise(s) : "
+                     f"{', '.join(f'{m.symbol} #{m.ticket}' for m in monitors)}")
+    return monitors
+
+
+def _reconcile_open_trades(symbols: list, open_tickets: set):
+    """Trades « OPEN » en base dont la position n'existe plus : clôture enregistrée."""
+    for trade in find_open_trades(ACCOUNT_NUMBER, symbols):
+        if trade["ticket"] not in open_tickets:
+            log_step(trade["symbol"], "DB",
+                     f"🔁 #{trade['ticket']} fermé pendant l'arrêt → enregistrement")
+            _record_trade_close(ACCOUNT_NUMBER, trade["symbol"], trade["ticket"], delay=0)
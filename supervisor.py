@@ -0,0 +1,276 @@
+"""
+Mode supervisé : répartit config.SYMBOL sur N processus (shards), chacun
+connecté à sa propre installation de terminal (MT5_TERMINAL_PATHS).
+Chaque shard exécute main.main() sur ses symboles : un canal IPC et un GIL
+par shard au lieu d'un seul pour tout le bot.
+
+  - battements de cœur : chaque shard envoie son état au superviseur
+    (connexion terminal, cycles, ordres, files en attente) via une mp.Queue ;
+  - un shard arrêté ou muet depuis SHARD_HEARTBEAT_TIMEOUT est redémarré
+    (backoff exponentiel), sans toucher aux autres ;
+  - ressources propres à chaque shard : logs (v100bot-shard{i}.log), journal DB,
+    archive de barres (BAR_ARCHIVE_DIR/shard{i}), fichier de déclenchement du
+    profiler, port métriques (METRICS_PORT + 1 + i) ;
+  - état des shards : route /shards de l'endpoint métriques du superviseur.
+
+    python supervisor.py            # un shard par chemin de MT5_TERMINAL_PATHS
+    python supervisor.py --shards 2 # nombre imposé (chemins réutilisés en boucle)
+
+Le module n'importe la configuration qu'à l'intérieur des fonctions : chaque
+shard (processus « spawn ») ajuste son environnement avant de la charger.
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+RESTART_MAX_DELAY = 60.0
+STARTUP_GRACE     = 120.0    # secondes sans battement tolérées après (re)démarrage
+
+
+# ═══════════════════════════════════════════════════════════════
+# CÔTÉ SHARD (processus enfant)
+# ═══════════════════════════════════════════════════════════════
+
+def _shard_environment(shard_id: int):
+    """Ressources propres au shard, fixées avant le chargement de config.py."""
+    suffix = f"shard{shard_id}"
+    os.environ["DB_JOURNAL_PATH"]      = os.path.join("data", f"db_journal_{suffix}.jsonl")
+    os.environ["PROFILE_TRIGGER_FILE"] = f"profile.{suffix}.request"
+    os.environ["BAR_ARCHIVE_DIR"]      = os.path.join(
+        os.getenv("BAR_ARCHIVE_DIR", os.path.join("data", "bars")), suffix)
+    port = int(os.getenv("METRICS_PORT", "0"))
+    if port > 0:
+        os.environ["METRICS_PORT"] = str(port + 1 + shard_id)
+
+
+def _heartbeat_loop(shard_id: int, beats: mp.Queue, interval: float):
+    from metrics import COUNTERS
+    from database import get_journal
+    from connexion import CONNECTION
+    from utils import telegram_queue_depth
+
+    def total(name: str) -> float:
+        return sum(v for (n, _), v in COUNTERS.items() if n == name)
+
+    while True:
+        try:
+            journal = get_journal()
+            beats.put({
+                "shard":          shard_id,
+                "pid":            os.getpid(),
+                "ts":             time.time(),
+                "connected":      CONNECTION.is_connected(),
+                "cycles":         total("analysis_cycles_total"),
+                "orders":         total("orders_sent_total"),
+                "journal_depth":  journal.depth() if journal else 0,
+                "telegram_depth": telegram_queue_depth(),
+            })
+        except Exception as e:
+            logging.error(f"Shard {shard_id} : battement de cœur impossible : {e}")
+        time.sleep(interval)
+
+
+def run_shard(shard_id: int, symbols: list, terminal_path: str, beats: mp.Queue,
+              interval: float):
+    """Point d'entrée d'un shard : main.main() restreint à ses symboles."""
+    _shard_environment(shard_id)
+    import main
+
+    threading.Thread(target=_heartbeat_loop, args=(shard_id, beats, interval),
+                     name="Shard-Heartbeat", daemon=True).start()
+    try:
+        main.main(symbols=symbols, terminal_path=terminal_path,
+                  log_suffix=f"-shard{shard_id}", multi_account=False)
+    except KeyboardInterrupt:
+        pass
+
+
+# ═══════════════════════════════════════════════════════════════
+# CÔTÉ SUPERVISEUR
+# ═══════════════════════════════════════════════════════════════
+
+class Shard:
+    def __init__(self, shard_id: int, symbols: list, terminal_path: str):
+        self.id            = shard_id
+        self.symbols       = symbols
+        self.terminal_path = terminal_path
+        self.process       = None
+        self.started_at    = 0.0
+        self.last_beat     = None      # dernier battement reçu (dict)
+        self.restarts      = 0
+        self.next_start    = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def status(self, timeout: float) -> str:
+        if not self.alive:
+            return "down"
+        beat = self.last_beat
+        if beat is None or beat["ts"] < self.started_at:
+            return "starting"
+        if time.time() - beat["ts"] > timeout:
+            return "silent"
+        return "ok" if beat["connected"] else "disconnected"
+
+
+def partition(symbols: list, n: int) -> list[list]:
+    """Répartition déterministe (symbole i → shard i mod n)."""
+    return [symbols[i::n] for i in range(n)]
+
+
+class Supervisor:
+    def __init__(self, symbols: list, terminal_paths: list, shards: int = 0,
+                 heartbeat_interval: float = 5.0, heartbeat_timeout: float = 60.0):
+        n = shards or len(terminal_paths)
+        n = max(1, min(n, len(symbols)))
+        self.ctx       = mp.get_context("spawn")
+        self.beats     = self.ctx.Queue()
+        self.interval  = heartbeat_interval
+        self.timeout   = heartbeat_timeout
+        self.shards    = [Shard(i, part, terminal_paths[i % len(terminal_paths)])
+                          for i, part in enumerate(partition(symbols, n))]
+        self._stopping = False
+
+    # ── Processus ────────────────────────────────────────────────
+    def start_shard(self, shard: Shard):
+        shard.process = self.ctx.Process(
+            target=run_shard,
+            args=(shard.id, shard.symbols, shard.terminal_path, self.beats, self.interval),
+            name=f"Shard-{shard.id}",
+        )
+        shard.process.start()
+        shard.started_at = time.time()
+        logging.info(f"🧩 Shard {shard.id} démarré (pid {shard.process.pid}) | "
+                     f"{', '.join(shard.symbols)} | {shard.terminal_path}")
+
+    def restart_shard(self, shard: Shard, reason: str):
+        from utils import send_telegram_alert
+
+        if shard.alive:
+            shard.process.terminate()
+            shard.process.join(10)
+        delay = min(RESTART_MAX_DELAY, 2 ** shard.restarts)
+        shard.restarts  += 1
+        shard.next_start = time.time() + delay
+        shard.process    = None
+        logging.warning(f"⚠️ Shard {shard.id} {reason} → redémarrage dans {delay:.0f}s "
+                        f"(#{shard.restarts})")
+        send_telegram_alert(f"⚠️ Shard {shard.id} ({', '.join(shard.symbols)}) {reason} "
+                            f"→ redémarrage", force=True)
+
+    # ── Boucle ───────────────────────────────────────────────────
+    def run(self):
+        for shard in self.shards:
+            self.start_shard(shard)
+        try:
+            while not self._stopping:
+                self._drain_beats(timeout=1.0)
+                self._check_shards()
+        except KeyboardInterrupt:
+            logging.info("⏹️ Arrêt du superviseur demandé...")
+        finally:
+            self.stop()
+
+    def _drain_beats(self, timeout: float):
+        try:
+            beat = self.beats.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while beat is not None:
+            if 0 <= beat["shard"] < len(self.shards):
+                self.shards[beat["shard"]].last_beat = beat
+            try:
+                beat = self.beats.get_nowait()
+            except queue.Empty:
+                beat = None
+
+    def _check_shards(self):
+        now = time.time()
+        for shard in self.shards:
+            if shard.process is None:
+                if now >= shard.next_start:
+                    self.start_shard(shard)
+                continue
+            if not shard.alive:
+                self.restart_shard(shard, f"arrêté (code {shard.process.exitcode})")
+                continue
+            beat     = shard.last_beat
+            last_ts  = beat["ts"] if beat and beat["ts"] >= shard.started_at else None
+            deadline = (last_ts + self.timeout) if last_ts else (shard.started_at + STARTUP_GRACE)
+            if now > deadline:
+                self.restart_shard(shard, "sans battement de cœur")
+            elif last_ts and now - shard.started_at > STARTUP_GRACE and shard.restarts:
+                shard.restarts = 0   # Stable depuis le redémarrage : backoff remis à zéro
+
+    def stop(self, timeout: float = 20.0):
+        """Les shards reçoivent Ctrl+C de la console ; les retardataires sont terminés."""
+        self._stopping = True
+        deadline = time.time() + timeout
+        for shard in self.shards:
+            if shard.process is not None:
+                shard.process.join(max(0.0, deadline - time.time()))
+                if shard.process.is_alive():
+                    shard.process.terminate()
+        logging.info("🛑 Superviseur arrêté")
+
+    # ── Observabilité ────────────────────────────────────────────
+    def alive_count(self) -> int:
+        return sum(1 for s in self.shards if s.status(self.timeout) == "ok")
+
+    def restarts_total(self) -> int:
+        return sum(s.restarts for s in self.shards)
+
+    def http_route(self, query: dict) -> str:
+        """Route /shards : une ligne par shard."""
+        lines = []
+        for s in self.shards:
+            beat = s.last_beat or {}
+            age  = f"{time.time() - beat['ts']:.0f}s" if beat else "-"
+            lines.append(
+                f"shard={s.id} status={s.status(self.timeout)} pid={beat.get('pid', '-')} "
+                f"beat={age} restarts={s.restarts} cycles={beat.get('cycles', 0):.0f} "
+                f"orders={beat.get('orders', 0):.0f} journal={beat.get('journal_depth', 0)} "
+                f"telegram={beat.get('telegram_depth', 0)} symbols={','.join(s.symbols)}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    from config import (SYMBOL, MT5_TERMINAL_PATH, MT5_TERMINAL_PATHS,
+                        SHARD_HEARTBEAT_INTERVAL, SHARD_HEARTBEAT_TIMEOUT)
+    from metrics import register_gauge, register_route, start_http_server
+    from utils import setup_logging, shutdown_telegram
+
+    parser = argparse.ArgumentParser(description="Bot réparti sur plusieurs terminaux MT5")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="Nombre de shards (défaut : un par chemin de MT5_TERMINAL_PATHS)")
+    args = parser.parse_args()
+
+    setup_logging(log_suffix="-supervisor")
+    paths = MT5_TERMINAL_PATHS or [MT5_TERMINAL_PATH]
+    if args.shards > len(paths):
+        logging.warning(f"⚠️ {args.shards} shards pour {len(paths)} terminal(aux) : "
+                        f"plusieurs shards partageront une installation")
+
+    supervisor = Supervisor(SYMBOL, paths, args.shards,
+                            SHARD_HEARTBEAT_INTERVAL, SHARD_HEARTBEAT_TIMEOUT)
+    register_gauge("shards_ok", supervisor.alive_count, "Shards connectés et vivants")
+    register_gauge("shard_restarts", supervisor.restarts_total, "Redémarrages de shards en cours de backoff")
+    register_route("/shards", supervisor.http_route)
+    start_http_server()
+
+    logging.info(f"🧩 Superviseur : {len(supervisor.shards)} shard(s) pour {len(SYMBOL)} symbole(s)")
+    try:
+        supervisor.run()
+    finally:
+        shutdown_telegram()
+
+
+if __name__ == "__main__":
+    main()
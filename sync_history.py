@@ -8,9 +8,9 @@ Corrections appliquées :
 """
 import MetaTrader5 as mt5
 import logging
-import time
-from datetime import datetime, timedelta
+from datetime import timedelta
 
+import clock
 from accounts_config import ACCOUNTS
 from database import save_close, save_open
 from config import MAGIC_NUMBER
@@ -37,8 +37,8 @@ def sync_account(account_config, days: int = 30):
         return
 
     # ── Récupération historique ────────────────────────────────
-    from_date = datetime.now() - timedelta(days=days)
-    to_date   = datetime.now() + timedelta(days=1)
+    from_date = clock.now() - timedelta(days=days)
+    to_date   = clock.now() + timedelta(days=1)
 
     deals = mt5.history_deals_get(from_date, to_date)
     mt5.shutdown()
@@ -88,7 +88,7 @@ def sync_account(account_config, days: int = 30):
         f"✅ Compte {account_config.account_number} : "
         f"{count_open} ouvertures, {count_close} fermetures synchronisées."
     )
-    time.sleep(1)
+    clock.sleep(1)
 
 
 def main():
@@ -0,0 +1,60 @@
+"""
+Préparation commune des tests.
+  - ressources persistantes (archive de barres, journal DB, MongoDB, Telegram)
+    redirigées avant le chargement de config.py ;
+  - sans le paquet MetaTrader5 (hors Windows), le terminal simulé
+    (sim_terminal.SimulatedTerminal) tient lieu de module MetaTrader5 :
+    les constantes sont celles du terminal simulé, les appels passent par
+    patch_mt5(terminal) dans chaque test.
+"""
+import os
+import sys
+import tempfile
+import types
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_WORKDIR = tempfile.mkdtemp(prefix="bot_tests_")
+os.environ.update({
+    "BAR_ARCHIVE_DIR":    os.path.join(_WORKDIR, "bars"),
+    "DB_JOURNAL_PATH":    os.path.join(_WORKDIR, "db_journal.jsonl"),
+    "MONGODB_URI":        "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=200",
+    "TELEGRAM_TOKEN":     "",
+    "METRICS_PORT":       "0",
+    "TICK_RECORDER":      "0",
+    "LOG_ANALYSIS_JSONL": "0",
+})
+
+try:
+    import MetaTrader5  # noqa: F401
+except ImportError:
+    _proxy = types.ModuleType("MetaTrader5")
+    sys.modules["MetaTrader5"] = _proxy
+    from sim_terminal import SimulatedTerminal
+    _proxy.__getattr__ = lambda name: getattr(SimulatedTerminal, name)
+
+from tick_recorder import TICK_DTYPE
+
+T0_MSC = 1_700_000_000_000     # 14/11/2023 22:13:20 UTC
+
+
+def synthetic_ticks(seconds: int, step_ms: int = 2000, seed: int = 1,
+                    drift: float = 0.0, start_msc: int = T0_MSC) -> np.ndarray:
+    """Marche aléatoire (bid) à pas fixe ; spread constant de 0.1."""
+    count = seconds * 1000 // step_ms
+    rng   = np.random.default_rng(seed)
+    ticks = np.zeros(count, TICK_DTYPE)
+    ticks["time_msc"] = start_msc + np.arange(count) * step_ms
+    ticks["bid"]      = 1000 + np.cumsum(rng.normal(drift, 0.6, count))
+    ticks["ask"]      = ticks["bid"] + 0.1
+    ticks["flags"]    = 6
+    return ticks
+
+
+@pytest.fixture
+def make_ticks():
+    return synthetic_ticks
@@ -0,0 +1,61 @@
+"""Archive de barres : reprise après arrêt brutal, index partagé, backfill."""
+import numpy as np
+
+import bar_archive
+from bar_archive import BAR_DTYPE, BarArchive, backfill
+
+M1 = bar_archive.TIMEFRAMES["M1"]
+T0 = 1_700_000_000
+
+
+def _bars(start: int, count: int) -> np.ndarray:
+    out = np.zeros(count, BAR_DTYPE)
+    out["time"]  = T0 + start + 60 * np.arange(count)
+    out["close"] = np.arange(count, dtype=float)
+    return out
+
+
+def test_crash_between_write_and_index_does_not_duplicate(tmp_path):
+    archive = BarArchive(str(tmp_path))
+    archive.append("S", M1, _bars(0, 10))
+    # Arrêt après f.write, avant la mise à jour de l'index
+    with open(archive.path("S", M1), "ab") as f:
+        f.write(_bars(600, 5).tobytes())
+
+    restarted = BarArchive(str(tmp_path))
+    assert restarted.info()["S|M1"]["last"] == T0 + 540            # index en retard
+    assert restarted.last_time("S", M1) == T0 + 840
+    assert restarted.append("S", M1, _bars(0, 20)) == 5        # 900 … 1140 seulement
+    times = restarted.load("S", M1)["time"]
+    assert len(times) == 20 and (np.diff(times) == 60).all()
+    assert restarted.info()["S|M1"]["count"] == 20
+
+
+def test_partial_record_is_truncated_before_append(tmp_path):
+    archive = BarArchive(str(tmp_path))
+    archive.append("S", M1, _bars(0, 3))
+    with open(archive.path("S", M1), "ab") as f:
+        f.write(_bars(180, 1).tobytes()[:20])                  # écriture interrompue
+    assert archive.append("S", M1, _bars(0, 5)) == 2
+    assert (archive.load("S", M1)["time"] - T0).tolist() == [0, 60, 120, 180, 240]
+
+
+def test_instances_sharing_directory_keep_each_other_entries(tmp_path):
+    first, second = BarArchive(str(tmp_path)), BarArchive(str(tmp_path))
+    first.append("A", M1, _bars(0, 3))
+    second.append("B", M1, _bars(0, 4))
+    first.append("A", M1, _bars(0, 5))
+    index = BarArchive(str(tmp_path)).info()
+    assert index["A|M1"]["count"] == 5
+    assert index["B|M1"]["count"] == 4
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith(".tmp")]
+
+
+def test_backfill_with_only_the_forming_bar(tmp_path, monkeypatch):
+    archive = BarArchive(str(tmp_path))
+    archive.append("S", M1, _bars(0, 3))
+    monkeypatch.setattr(bar_archive, "fetch_range", lambda *a: _bars(600, 1))
+    assert backfill(archive, "S", M1, days=1) == 0
+    monkeypatch.setattr(bar_archive, "fetch_range", lambda *a: _bars(600, 3))
+    assert backfill(archive, "S", M1, days=1) == 2
+    assert (archive.load("S", M1)["time"] - T0).tolist() == [0, 60, 120, 600, 660]
@@ -0,0 +1,84 @@
+"""Rééchantillonnage M1 → M15/M30 du magasin de barres comparé aux barres du terminal."""
+import numpy as np
+import pytest
+
+from bar_store import BarStore, COLUMNS, resample
+from sim_terminal import SimulatedTerminal, patch_mt5
+
+M1, M15, M30 = SimulatedTerminal.TIMEFRAME_M1, SimulatedTerminal.TIMEFRAME_M15, SimulatedTerminal.TIMEFRAME_M30
+PERIODS      = {M15: 900, M30: 1800}
+
+
+def _same(ours: dict, ref: np.ndarray) -> bool:
+    return len(ours["time"]) == len(ref) and all(
+        np.array_equal(np.asarray(ours[name]), np.asarray(ref[name], dtype=COLUMNS[name]))
+        for name in COLUMNS
+    )
+
+
+@pytest.fixture
+def terminal(make_ticks):
+    ticks = make_ticks(2 * 86_400, step_ms=5000)
+    term  = SimulatedTerminal({"S": ticks})
+    term.advance(int(ticks["time_msc"][0]) + 86_400_000)     # 1 jour rejoué
+    return term
+
+
+def test_resample_aligns_on_period_boundaries():
+    cols = {
+        "time":        np.array([0, 60, 840, 900, 1740, 1800], np.int64),
+        "open":        np.array([1., 2., 3., 4., 5., 6.]),
+        "high":        np.array([2., 5., 4., 6., 9., 7.]),
+        "low":         np.array([0.5, 1., 2., 3., 4., 5.]),
+        "close":       np.array([2., 3., 4., 5., 6., 7.]),
+        "tick_volume": np.array([1, 2, 3, 4, 5, 6], np.int64),
+    }
+    bars = resample(cols, 900)
+    assert bars["time"].tolist()        == [0, 900, 1800]
+    assert bars["open"].tolist()        == [1., 4., 6.]
+    assert bars["high"].tolist()        == [5., 9., 7.]
+    assert bars["low"].tolist()         == [0.5, 3., 5.]
+    assert bars["close"].tolist()       == [4., 6., 7.]
+    assert bars["tick_volume"].tolist() == [6, 9, 6]
+
+
+@pytest.mark.parametrize("timeframe", [M15, M30])
+def test_resampled_bars_match_terminal(terminal, timeframe):
+    base = terminal.copy_rates_from_pos("S", M1, 0, 24 * 60)
+    ref  = terminal.copy_rates_from_pos("S", timeframe, 0, 24 * 60 // (PERIODS[timeframe] // 60))
+    ours = resample(base, PERIODS[timeframe])
+    # La première barre agrégée peut être tronquée (début de la fenêtre M1)
+    assert _same({name: col[1:] for name, col in ours.items()}, ref[-(len(ours["time"]) - 1):])
+
+
+@pytest.mark.parametrize("timeframe", [M15, M30])
+def test_store_keeps_resampled_series_in_sync(terminal, timeframe):
+    store = BarStore(refresh_interval=0)
+    store.enable_resampling(PERIODS, base=M1)
+    with patch_mt5(terminal):
+        assert store.verify_resampling("S", timeframe)
+        store.refresh("S", timeframe, 50)                    # amorçage (lecture terminal)
+        for _ in range(6):                                   # 6 × 10 min : barres nouvelles + barre en formation
+            terminal.advance(terminal.now_msc + 600_000)
+            series = store.refresh("S", timeframe, 50)
+            ours   = series.view(50)
+            ref    = terminal.copy_rates_from_pos("S", timeframe, 0, 50)
+            assert _same(ours, ref)
+    assert ("S", timeframe) not in store._direct
+
+
+def test_verify_resampling_falls_back_to_direct_reads(terminal, monkeypatch):
+    store = BarStore(refresh_interval=0)
+    store.enable_resampling(PERIODS, base=M1)
+    real  = terminal.copy_rates_from_pos
+
+    def shifted(symbol, timeframe, start_pos, count):
+        rates = real(symbol, timeframe, start_pos, count)
+        if timeframe == M30:
+            rates["high"] += 1.0                              # barres broker différentes de l'agrégat
+        return rates
+
+    monkeypatch.setattr(terminal, "copy_rates_from_pos", shifted)
+    with patch_mt5(terminal):
+        assert not store.verify_resampling("S", M30)
+    assert ("S", M30) in store._direct
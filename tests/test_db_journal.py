@@ -0,0 +1,113 @@
+"""Journal d'écritures différées : rejeu après arrêt brutal, troncature, reprise sur erreur."""
+import time
+from datetime import datetime
+
+import pytest
+
+import database
+from database import TradeJournal
+
+
+class FakeCollection:
+    """bulk_write enregistré ; les `fail` premiers appels lèvent une erreur."""
+
+    full_name = "trading.fake"
+
+    def __init__(self, fail: int = 0):
+        self.fail  = fail
+        self.calls = 0
+        self.ops   = []
+
+    def bulk_write(self, ops, ordered=True):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise ConnectionError("MongoDB injoignable")
+        self.ops.extend(ops)
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    col = FakeCollection()
+    monkeypatch.setattr(database, "_locate", lambda account, symbol, ticket: (col, {"ticket": ticket}))
+    monkeypatch.setattr(database, "UpdateOne", lambda key, update, upsert: (key, update))
+    return col
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "db_journal.jsonl")
+
+
+def _event(ticket: int, op: str = "open") -> dict:
+    event = {"op": op, "account": 1, "symbol": "S", "ticket": ticket,
+             "type": "BUY", "price": 1.5, "ts": datetime(2024, 1, 1, 12, 0, ticket)}
+    if op == "close":
+        event.update(profit=3.0, status="CLOSED")
+    return event
+
+
+def _lines(path: str) -> int:
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def _until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "délai dépassé"
+        time.sleep(0.01)
+
+
+def test_events_are_replayed_after_a_crash(collection, path):
+    crashed = TradeJournal(path)             # writer jamais démarré : arrêt avant toute écriture
+    crashed.record(_event(1))
+    crashed.record(_event(1, "close"))
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "open", "tick')      # ligne tronquée par l'arrêt
+
+    journal = TradeJournal(path, flush_interval=0.05)
+    journal.start()
+    try:
+        _until(lambda: journal.depth() == 0)
+    finally:
+        journal.stop()
+    (open_key, open_update), (close_key, close_update) = collection.ops
+    assert open_key == close_key == {"ticket": 1}
+    assert open_update["$setOnInsert"]["open_time"] == datetime(2024, 1, 1, 12, 0, 1)
+    assert close_update["$set"]["close_time"] == datetime(2024, 1, 1, 12, 0, 1)
+    assert _lines(path) == 0
+
+    journal.record(_event(2))                # numérotation reprise après le rejeu
+    assert journal._seq == 3
+
+
+def test_file_is_truncated_only_once_everything_is_committed(collection, path):
+    journal = TradeJournal(path, batch_size=2, flush_interval=0.05)
+    for ticket in (1, 2, 3):
+        journal.record(_event(ticket))
+
+    assert journal._write_batch(journal._next_batch())
+    assert journal.depth() == 1
+    assert _lines(path) == 3                 # committed (2) < seq (3) : fichier intact
+
+    assert journal._write_batch(journal._next_batch())
+    assert journal.depth() == 0
+    assert _lines(path) == 0
+
+
+def test_failed_bulk_write_keeps_events_on_disk_and_retries(collection, path):
+    collection.fail = 1
+    journal = TradeJournal(path, flush_interval=0.05)
+    journal.start()
+    try:
+        journal.record(_event(1))
+        journal.record(_event(2))
+        _until(lambda: journal.failures == 1)
+        assert journal.depth() == 2
+        assert _lines(path) == 2
+        _until(lambda: journal.depth() == 0)  # nouvelle tentative après backoff
+    finally:
+        journal.stop()
+    assert collection.calls >= 2
+    assert sorted(key["ticket"] for key, _ in collection.ops) == [1, 2]
+    assert _lines(path) == 0
@@ -0,0 +1,17 @@
+"""Export Prometheus des compteurs et histogrammes."""
+from metrics import COUNTERS, inc, observe, render_prometheus
+
+
+def test_mixed_label_types_render():
+    inc("test_results_total", retcode=10009)
+    inc("test_results_total", retcode="none")
+    inc("test_results_total", retcode=10009)
+    observe("test_wait_seconds", 0.01, priority=1)
+    observe("test_wait_seconds", 0.02, priority="urgent")
+
+    text = render_prometheus()
+    assert 'synfxbot_test_results_total{retcode="10009"} 2' in text
+    assert 'synfxbot_test_results_total{retcode="none"} 1' in text
+    assert 'synfxbot_test_wait_seconds_count{priority="1"} 1' in text
+    assert 'synfxbot_test_wait_seconds_count{priority="urgent"} 1' in text
+    assert COUNTERS.get("test_results_total", retcode="10009") == 2
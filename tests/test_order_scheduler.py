@@ -0,0 +1,114 @@
+"""Seau à jetons, priorités et coalescence de l'ordonnanceur d'ordres."""
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from order_scheduler import OrderScheduler, TokenBucket, PRIORITY_URGENT, PRIORITY_TRAIL
+
+
+# ═══════════════════════════════════════════════════════════════
+# Seau à jetons
+# ═══════════════════════════════════════════════════════════════
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=2, burst=3)
+    now    = bucket.updated
+    for _ in range(3):
+        assert bucket.delay(now) == 0
+        bucket.take(now)
+    assert bucket.delay(now) == pytest.approx(0.5)
+    assert bucket.delay(now + 0.5) == 0                    # un jeton rechargé
+    assert bucket.delay(now + 60) == 0
+    assert bucket.tokens == 3                              # plafonné à la rafale
+
+
+def test_token_bucket_drain_and_clock_skew():
+    bucket = TokenBucket(rate=4, burst=5)
+    now    = bucket.updated
+    bucket.drain(now)
+    assert bucket.delay(now) == pytest.approx(0.25)
+    assert bucket.delay(now - 10) == pytest.approx(0.25)   # temps antérieur ignoré
+
+
+# ═══════════════════════════════════════════════════════════════
+# Ordonnanceur
+# ═══════════════════════════════════════════════════════════════
+@pytest.fixture
+def scheduler():
+    sched = OrderScheduler(rate=1000, burst=1000)
+    sched.start()
+    yield sched
+    sched.stop()
+
+
+def _gate(sched, account=1):
+    """Occupe le thread d'envoi jusqu'à `release.set()` : les travaux suivants s'accumulent."""
+    started, release = threading.Event(), threading.Event()
+
+    def send():
+        started.set()
+        release.wait(5)
+    future = sched.submit(send, account=account)
+    assert started.wait(5)
+    return release, future
+
+
+def test_inline_when_not_started():
+    sched = OrderScheduler()
+    caller = []
+    result = sched.call(lambda: caller.append(threading.current_thread()) or "ok", account=1)
+    assert result == "ok"
+    assert caller == [threading.current_thread()]
+    with pytest.raises(ZeroDivisionError):
+        sched.call(lambda: 1 / 0, account=1)
+
+
+def test_urgent_jobs_overtake_trailing(scheduler):
+    sent = []
+    release, gate = _gate(scheduler)
+    futures = [
+        scheduler.submit(lambda: sent.append("trail-1"), account=1, priority=PRIORITY_TRAIL),
+        scheduler.submit(lambda: sent.append("trail-2"), account=1, priority=PRIORITY_TRAIL),
+        scheduler.submit(lambda: sent.append("close"),   account=1, priority=PRIORITY_URGENT),
+    ]
+    assert scheduler.depth() == 3 and scheduler.depth(PRIORITY_TRAIL) == 2
+    release.set()
+    for f in [gate] + futures:
+        f.result(5)
+    assert sent == ["close", "trail-1", "trail-2"]
+
+
+def test_pending_sltp_is_coalesced(scheduler):
+    sent = []
+    release, gate = _gate(scheduler)
+    first  = scheduler.submit(lambda: sent.append(1.10), account=1, priority=PRIORITY_TRAIL, key=("sltp", 7))
+    other  = scheduler.submit(lambda: sent.append("x"),  account=1, priority=PRIORITY_TRAIL, key=("sltp", 8))
+    latest = scheduler.submit(lambda: sent.append(1.20), account=1, priority=PRIORITY_TRAIL, key=("sltp", 7))
+    assert first.cancelled()
+    assert scheduler.depth() == 2
+    release.set()
+    latest.result(5), other.result(5)
+    assert sent == [1.20, "x"]                              # la cible remplacée garde sa place
+
+
+def test_throttled_account_does_not_block_others():
+    sched = OrderScheduler(rate=2, burst=1)
+    sched.start()
+    try:
+        sent = []
+        sched.call(lambda: sent.append("a1"), account=1)    # jeton du compte 1 consommé
+        held = sched.submit(lambda: sent.append("a2"), account=1)
+        sched.call(lambda: sent.append("b1"), account=2)
+        assert sent == ["a1", "b1"] and not held.done()
+        held.result(5)                                      # envoyé au jeton suivant (0,5 s)
+        assert sent == ["a1", "b1", "a2"]
+    finally:
+        sched.stop()
+
+
+def test_too_many_requests_drains_bucket():
+    sched  = OrderScheduler(rate=0.01, burst=5)
+    result = sched.call(lambda: SimpleNamespace(retcode=10024), account=3)
+    assert result.retcode == 10024
+    assert sched._bucket(3).tokens == 0
+    assert sched._bucket(4).tokens == 5                     # autres comptes intacts
@@ -0,0 +1,110 @@
+"""Horloge virtuelle (clock.VirtualClock), rejeu (ReplayDriver) et simulation complète."""
+import hashlib
+import json
+import threading
+
+import clock
+from sim_terminal import SimulatedTerminal, ReplayDriver, simulate
+from conftest import T0_MSC
+
+DAY = 86_400
+
+
+# ── VirtualClock ─────────────────────────────────────────────────
+
+def test_virtual_clock_wakes_participants_in_time_order():
+    vclock   = clock.VirtualClock(start=100)
+    advances = []
+    vclock.on_advance = advances.append
+    log = []
+
+    def worker(name, period, rounds):
+        for _ in range(rounds):
+            clock.sleep(period)
+            log.append((clock.time(), name))
+
+    with clock.install(vclock):
+        vclock.spawn(worker, "a", 3, 3, name="a")
+        vclock.spawn(worker, "b", 2, 4, name="b")
+        assert vclock.run(until=112, timeout=5)
+
+    assert log == [(102, "b"), (103, "a"), (104, "b"), (106, "a"), (106, "b"),
+                   (108, "b"), (109, "a")]
+    assert advances == [102, 103, 104, 106, 108, 109]
+    assert vclock.time() == 109
+
+
+def test_virtual_clock_stops_at_until_and_resumes():
+    vclock = clock.VirtualClock(start=0)
+    ticks  = []
+
+    def ticker():
+        while True:
+            clock.sleep(10)
+            ticks.append(clock.time())
+
+    with clock.install(vclock):
+        vclock.spawn(ticker, name="ticker")
+        assert vclock.run(until=35, timeout=5)
+        assert ticks == [10, 20, 30]
+        assert vclock.run(until=50, timeout=5)
+    assert ticks == [10, 20, 30, 40, 50]
+
+
+def test_virtual_clock_wait_times_out_without_real_delay():
+    vclock = clock.VirtualClock(start=0)
+    event  = threading.Event()
+    result = {}
+
+    def waiter():
+        result["set"] = clock.wait(event, 3600)
+        result["at"]  = clock.time()
+
+    with clock.install(vclock):
+        vclock.spawn(waiter, name="waiter")
+        assert vclock.run(until=7200, timeout=5)
+    assert result == {"set": False, "at": 3600}
+
+
+# ── ReplayDriver ─────────────────────────────────────────────────
+
+def test_replay_driver_advances_terminal_and_triggers_stops(make_ticks):
+    ticks = make_ticks(600, drift=-0.5)            # tendance baissière
+    term  = SimulatedTerminal({"S": ticks})
+    term.advance(int(ticks["time_msc"][0]))
+    price = term.symbol_info_tick("S").ask
+    sent  = term.order_send({"action": term.TRADE_ACTION_DEAL, "symbol": "S", "volume": 1.0,
+                             "type": term.ORDER_TYPE_BUY, "sl": price - 5, "tp": price + 50})
+    assert sent.retcode == term.TRADE_RETCODE_DONE
+
+    seen   = []
+    until  = int(ticks["time_msc"][-1])
+    driver = ReplayDriver(term, speed=0, on_tick=seen.append)
+    driver.run(until)
+
+    assert driver.done.is_set()
+    assert term.now_msc == until
+    assert seen == ticks["time_msc"].tolist()
+    assert term.positions_total() == 0
+    exit_deal = term.history_deals_get(position=sent.order)[-1]
+    assert exit_deal.comment == "[sl]" and exit_deal.profit < 0
+
+
+# ── Simulation complète ──────────────────────────────────────────
+
+def _digest(events: list) -> str:
+    return hashlib.sha256(json.dumps(events, default=str, sort_keys=True).encode()).hexdigest()
+
+
+def _run(make_ticks) -> list:
+    term  = SimulatedTerminal({"S": make_ticks(6 * DAY, drift=0.02)})
+    start = T0_MSC // 1000 + 5 * DAY              # 5 jours d'historique pour les indicateurs M30
+    return simulate(term, ["S"], start=start, end=start + 2 * 3600, timeout=300)
+
+
+def test_simulate_is_deterministic(make_ticks):
+    first  = _run(make_ticks)
+    second = _run(make_ticks)
+    assert first, "la fenêtre simulée doit produire des trades"
+    assert {e["op"] for e in first} <= {"open", "close"}
+    assert _digest(first) == _digest(second)
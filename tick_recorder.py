@@ -0,0 +1,287 @@
+"""
+Enregistreur de ticks — format colonnaire compressé, découpé en tranches.
+Chaque tranche est un fichier .npz (np.savez_compressed) par symbole :
+    data/ticks/{symbole}/{premier_time_msc}_{dernier_time_msc}.npz
+avec les colonnes TICK_DTYPE (time_msc, bid, ask, last, volume, flags).
+Le nom de fichier suffit à sélectionner une plage sans rien ouvrir.
+
+Lecture : load_ticks(symbole, début_msc, fin_msc) → tableau structuré trié.
+Rejeu   : sim_terminal.py (terminal simulé alimenté par ces fichiers).
+
+    python tick_recorder.py record            # enregistrement autonome
+    python tick_recorder.py info              # tranches disponibles
+Dans le bot : TICK_RECORDER=1 démarre l'enregistrement en arrière-plan.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import MetaTrader5 as mt5
+
+from config import (SYMBOL, MT5_TERMINAL_PATH, TICK_DIR, TICK_CHUNK_SIZE,
+                    TICK_CHUNK_SECONDS, TICK_POLL_INTERVAL)
+from metrics import terminal_timer
+
+TICK_DTYPE = np.dtype([
+    ("time_msc", "<i8"),
+    ("bid",      "<f8"),
+    ("ask",      "<f8"),
+    ("last",     "<f8"),
+    ("volume",   "<f8"),
+    ("flags",    "<i4"),
+])
+
+FETCH_COUNT = 10_000    # ticks max par appel copy_ticks_from
+SPEC_FILE   = "spec.json"
+
+# Caractéristiques du symbole conservées à côté des ticks (rejeu : sizing, stop level)
+SPEC_FIELDS = ("point", "digits", "stops_level", "trade_tick_size", "trade_tick_value",
+               "trade_contract_size", "volume_min", "volume_max", "volume_step")
+
+
+def _symbol_dir(root: str, symbol: str) -> str:
+    return os.path.join(root, symbol.replace(" ", "_").replace("/", "_"))
+
+
+def to_ticks(rows) -> np.ndarray:
+    """Convertit des ticks MT5 (copy_ticks_from) au format TICK_DTYPE."""
+    out = np.empty(len(rows), TICK_DTYPE)
+    out["time_msc"] = rows["time_msc"]
+    out["bid"]      = rows["bid"]
+    out["ask"]      = rows["ask"]
+    out["last"]     = rows["last"]
+    out["volume"]   = rows["volume_real"] if "volume_real" in rows.dtype.names else rows["volume"]
+    out["flags"]    = rows["flags"]
+    return out
+
+
+# ═══════════════════════════════════════════════════════════════
+# LECTURE
+# ═══════════════════════════════════════════════════════════════
+
+def load_spec(symbol: str, root: str = TICK_DIR) -> dict:
+    """Caractéristiques enregistrées du symbole ({} si absentes)."""
+    try:
+        with open(os.path.join(_symbol_dir(root, symbol), SPEC_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def list_chunks(symbol: str, root: str = TICK_DIR) -> list[tuple[int, int, str]]:
+    """Tranches (premier_msc, dernier_msc, chemin) d'un symbole, triées."""
+    chunks = []
+    for path in glob.glob(os.path.join(_symbol_dir(root, symbol), "*.npz")):
+        try:
+            first, last = os.path.basename(path)[:-4].split("_")
+            chunks.append((int(first), int(last), path))
+        except ValueError:
+            continue
+    return sorted(chunks)
+
+
+def load_ticks(symbol: str, start_msc: int | None = None, end_msc: int | None = None,
+               root: str = TICK_DIR) -> np.ndarray:
+    """Ticks de [start_msc, end_msc] (bornes incluses), triés par time_msc."""
+    parts = []
+    for first, last, path in list_chunks(symbol, root):
+        if (start_msc is not None and last < start_msc) or (end_msc is not None and first > end_msc):
+            continue
+        with np.load(path) as data:
+            chunk = np.empty(len(data["time_msc"]), TICK_DTYPE)
+            for name in TICK_DTYPE.names:
+                chunk[name] = data[name]
+        parts.append(chunk)
+    if not parts:
+        return np.empty(0, TICK_DTYPE)
+
+    ticks = np.concatenate(parts)
+    ticks = ticks[np.argsort(ticks["time_msc"], kind="stable")]
+    lo = 0 if start_msc is None else np.searchsorted(ticks["time_msc"], start_msc, "left")
+    hi = len(ticks) if end_msc is None else np.searchsorted(ticks["time_msc"], end_msc, "right")
+    return ticks[lo:hi]
+
+
+# ═══════════════════════════════════════════════════════════════
+# ENREGISTREMENT
+# ═══════════════════════════════════════════════════════════════
+
+class _SymbolBuffer:
+    def __init__(self):
+        self.parts    = []
+        self.count    = 0
+        self.opened   = time.monotonic()
+        self.last_msc = 0
+        self.at_last  = 0      # ticks déjà reçus ayant time_msc == last_msc
+
+
+class TickRecorder:
+    """
+    Relève les ticks de chaque symbole toutes les `poll` secondes via
+    copy_ticks_from (repli : symbol_info_tick) et écrit une tranche compressée
+    dès `chunk_size` ticks ou `chunk_seconds` secondes.
+    """
+
+    def __init__(self, symbols: list = None, root: str = TICK_DIR,
+                 chunk_size: int = TICK_CHUNK_SIZE, chunk_seconds: float = TICK_CHUNK_SECONDS,
+                 poll: float = TICK_POLL_INTERVAL):
+        self.symbols       = list(symbols or SYMBOL)
+        self.root          = root
+        self.chunk_size    = chunk_size
+        self.chunk_seconds = chunk_seconds
+        self.poll          = poll
+        self.recorded      = 0
+        self._buffers      = {s: _SymbolBuffer() for s in self.symbols}
+        self._stop         = threading.Event()
+        self._thread       = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        for symbol in self.symbols:
+            self._save_spec(symbol)
+        self._thread = threading.Thread(target=self._run, name="Tick-Recorder", daemon=True)
+        self._thread.start()
+        logging.info(f"🎞️ Enregistrement des ticks → {self.root} ({len(self.symbols)} symbole(s))")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        for symbol in self.symbols:
+            self._flush(symbol)
+
+    def _save_spec(self, symbol: str):
+        try:
+            with terminal_timer("symbol_info", symbol):
+                info = mt5.symbol_info(symbol)
+            if info is None:
+                return
+            folder = _symbol_dir(self.root, symbol)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, SPEC_FILE), "w", encoding="utf-8") as f:
+                json.dump({name: getattr(info, name) for name in SPEC_FIELDS}, f, indent=2)
+        except Exception as e:
+            logging.error(f"TickRecorder spec [{symbol}] : {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            for symbol in self.symbols:
+                try:
+                    self.poll_symbol(symbol)
+                except Exception as e:
+                    logging.error(f"TickRecorder [{symbol}] : {e}")
+            self._stop.wait(self.poll)
+
+    def poll_symbol(self, symbol: str) -> int:
+        """Un relevé : ajoute les ticks nouveaux au tampon du symbole."""
+        buf = self._buffers[symbol]
+        if not buf.last_msc:
+            with terminal_timer("symbol_info_tick", symbol):
+                tick = mt5.symbol_info_tick(symbol)
+            if tick is None:
+                return 0
+            buf.last_msc = tick.time_msc - 1
+
+        with terminal_timer("copy_ticks_from", symbol):
+            rows = mt5.copy_ticks_from(symbol, buf.last_msc // 1000, FETCH_COUNT, mt5.COPY_TICKS_ALL)
+
+        if rows is None:
+            # Repli : dernier tick uniquement
+            with terminal_timer("symbol_info_tick", symbol):
+                tick = mt5.symbol_info_tick(symbol)
+            if tick is None or tick.time_msc <= buf.last_msc:
+                return 0
+            rows = np.array([(tick.time_msc, tick.bid, tick.ask, tick.last,
+                              getattr(tick, "volume_real", tick.volume), tick.flags)], TICK_DTYPE)
+        else:
+            rows = to_ticks(rows)
+
+        new = self._new_ticks(buf, rows)
+        if len(new):
+            buf.parts.append(new)
+            buf.count  += len(new)
+            self.recorded += len(new)
+
+        if buf.count >= self.chunk_size or (
+                buf.count and time.monotonic() - buf.opened >= self.chunk_seconds):
+            self._flush(symbol)
+        return len(new)
+
+    @staticmethod
+    def _new_ticks(buf: _SymbolBuffer, rows: np.ndarray) -> np.ndarray:
+        """Écarte les ticks déjà enregistrés (plusieurs ticks peuvent partager une milliseconde)."""
+        msc   = rows["time_msc"]
+        same  = np.nonzero(msc == buf.last_msc)[0]
+        keep  = msc > buf.last_msc
+        if len(same) > buf.at_last:
+            keep[same[buf.at_last:]] = True
+        new = rows[keep]
+        if len(new):
+            last = int(new["time_msc"][-1])
+            seen = int(np.count_nonzero(new["time_msc"] == last))
+            buf.at_last  = seen + (buf.at_last if last == buf.last_msc else 0)
+            buf.last_msc = last
+        return new
+
+    def _flush(self, symbol: str):
+        buf = self._buffers[symbol]
+        if not buf.count:
+            buf.opened = time.monotonic()
+            return
+        ticks = np.concatenate(buf.parts)
+        folder = _symbol_dir(self.root, symbol)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{ticks['time_msc'][0]}_{ticks['time_msc'][-1]}.npz")
+        np.savez_compressed(path, **{name: ticks[name] for name in TICK_DTYPE.names})
+        buf.parts, buf.count, buf.opened = [], 0, time.monotonic()
+        logging.debug(f"🎞️ {symbol} : {len(ticks)} ticks → {path}")
+
+
+# ═══════════════════════════════════════════════════════════════
+# CLI
+# ═══════════════════════════════════════════════════════════════
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistrement et inventaire des ticks")
+    sub    = parser.add_subparsers(dest="command", required=True)
+    rec    = sub.add_parser("record", help="Enregistrer les ticks jusqu'à Ctrl+C")
+    rec.add_argument("--symbols", nargs="+", default=None, help="Symboles (défaut : config.SYMBOL)")
+    sub.add_parser("info", help="Lister les tranches enregistrées")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(message)s")
+
+    if args.command == "info":
+        for folder in sorted(glob.glob(os.path.join(TICK_DIR, "*"))):
+            symbol = os.path.basename(folder)
+            chunks = list_chunks(symbol)
+            if chunks:
+                logging.info(f"{symbol:<25} {len(chunks):>5} tranche(s)  "
+                             f"{chunks[0][0]} → {chunks[-1][1]} (ms)")
+        return
+
+    if not mt5.initialize(path=MT5_TERMINAL_PATH):
+        logging.error(f"❌ Init MT5 échoué : {mt5.last_error()}")
+        return
+    recorder = TickRecorder(args.symbols)
+    recorder.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.stop()
+        mt5.shutdown()
+        logging.info(f"🎞️ {recorder.recorded} tick(s) enregistré(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,114 @@
 # utils.py - Utilitaires pour logging et Telegram (alertes limitées)
 import logging
 import os
-from datetime import datetime
 import asyncio
+import atexit
+import json
+import queue
 import sys
-from telegram import Bot
-from config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+import threading
+import time
+from collections import deque
+import gzip
+import shutil
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from config import (TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, LOG_ANALYSIS_JSONL,
+                    LOG_RETENTION_DAYS, LOG_DEBUG_SAMPLE_RATE)
+
+# ═══════════════════════════════════════════════════════════════
+# LOGGING — pipeline asynchrone (QueueHandler → QueueListener)
+# ═══════════════════════════════════════════════════════════════
+
+ANALYSIS_LOGGER = "analysis"   # Enregistrements structurés par cycle d'analyse
+
+_listener: QueueListener | None = None
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler sans pré-formatage : le message (%-style) n'est formaté que
+    dans le thread du listener. Le thread appelant se contente d'empiler le record.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Une ligne JSON compacte par record ; les champs viennent de extra={'fields': {...}}."""
+
+    def format(self, record):
+        payload = {"ts": round(record.created, 3), "kind": record.getMessage()}
+        payload.update(getattr(record, "fields", {}))
+        return json.dumps(payload, separators=(",", ":"), default=str)
+
+
+class DebugSampler(logging.Filter):
+    """
+    Laisse passer 1 record DEBUG sur N (N = 1 / rate) ; les autres niveaux
+    passent toujours. Borne le volume disque des traces par cycle.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every   = max(1, round(1 / rate)) if rate > 0 else 0
+        self._count  = 0
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        if self.every == 0:
+            return False
+        self._count += 1
+        return self._count % self.every == 0
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Compresse le fichier du jour écoulé (appelé dans le thread du listener)."""
+    with open(source, "rb") as f_in, gzip.open(dest, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def daily_file_handler(path: str, retention_days: int = LOG_RETENTION_DAYS) -> logging.Handler:
+    """Fichier tourné à minuit, anciens jours compressés, rétention bornée."""
+    handler = TimedRotatingFileHandler(path, when="midnight", backupCount=retention_days,
+                                       encoding="utf-8")
+    handler.namer   = _gzip_namer
+    handler.rotator = _gzip_rotator
+    return handler
+
 
 def setup_logging(
     level=logging.INFO,
     console_level=logging.INFO,      # niveau pour la console (peut être plus verbeux)
     file_level=logging.DEBUG,        # niveau pour le fichier (plus détaillé)
-    log_dir="logs"
+    log_dir="logs",
+    analysis_jsonl=LOG_ANALYSIS_JSONL,
+    debug_sample_rate=LOG_DEBUG_SAMPLE_RATE,
+    log_suffix="",                   # ex. "-shard1" : un fichier par process (supervisor.py)
 ):
     """
     Configure le logging :
       - Console : INFO ou DEBUG selon besoin (immédiatement visible)
-      - Fichier : un log par jour avec niveau DEBUG (tout est tracé)
+      - Fichier : v100bot.log tourné à minuit (v100bot.log.YYYY-MM-DD.gz),
+                  LOG_RETENTION_DAYS jours conservés, DEBUG échantillonnable
+      - Analyse : (optionnel) un JSON par ligne et par cycle d'analyse, même rotation
+    Les threads appelants n'écrivent que dans une file ; le formatage et les
+    écritures console/fichier sont faits par un QueueListener dédié.
     """
+    global _listener
+
     # Création du dossier logs si inexistant
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    # Nom du fichier log quotidien
-    today = datetime.now().strftime("%Y%m%d")
-    log_filename = os.path.join(log_dir, f"v100bot_{today}.log")
+    # Fichier courant ; les jours précédents sont renommés et compressés à minuit
+    log_filename = os.path.join(log_dir, f"v100bot{log_suffix}.log")
 
     # Format commun (plus lisible)
     log_format = "%(asctime)s | %(levelname)-7s | %(message)s"
@@ -36,21 +120,48 @@ def setup_logging(
 
     # Supprime les anciens handlers pour éviter les doublons
     root_logger.handlers.clear()
+    if _listener is not None:
+        _listener.stop()
 
     # 1. Handler console (stdout)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(console_level)
     console_handler.setFormatter(logging.Formatter(log_format, datefmt=date_format))
-    root_logger.addHandler(console_handler)
 
     # 2. Handler fichier
-    file_handler = logging.FileHandler(log_filename, encoding="utf-8")
+    file_handler = daily_file_handler(log_filename)
     file_handler.setLevel(file_level)
+    if debug_sample_rate < 1.0:
+        file_handler.addFilter(DebugSampler(debug_sample_rate))
     file_handler.setFormatter(logging.Formatter(
         "%(asctime)s | %(levelname)-7s | %(name)s | %(message)s",
         datefmt=date_format
     ))
-    root_logger.addHandler(file_handler)
+
+    # 3. File → listener (respect_handler_level : chaque handler garde son niveau)
+    log_queue = queue.SimpleQueue()
+    handlers  = [console_handler, file_handler]
+    root_logger.addHandler(_LazyQueueHandler(log_queue))
+
+    # 4. Enregistrements d'analyse structurés (hors console / fichier texte)
+    analysis_logger = logging.getLogger(ANALYSIS_LOGGER)
+    analysis_logger.handlers.clear()
+    analysis_logger.propagate = False
+    if analysis_jsonl:
+        analysis_queue   = queue.SimpleQueue()
+        analysis_handler = daily_file_handler(os.path.join(log_dir, f"analysis{log_suffix}.jsonl"))
+        analysis_handler.setFormatter(JsonLinesFormatter())
+        analysis_logger.addHandler(_LazyQueueHandler(analysis_queue))
+        analysis_logger.setLevel(logging.INFO)
+        analysis_listener = QueueListener(analysis_queue, analysis_handler)
+        analysis_listener.start()
+        atexit.register(analysis_listener.stop)
+    else:
+        analysis_logger.setLevel(logging.CRITICAL + 1)   # log_record() devient un no-op
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
 
     # Réduire le bruit de certaines bibliothèques
     logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -66,14 +177,255 @@ def setup_logging(
 
     return root_logger
 
+
+def log_record(kind: str, **fields):
+    """
+    Enregistrement structuré (JSON lines) d'un cycle d'analyse.
+    Coût quasi nul si LOG_ANALYSIS_JSONL est désactivé.
+    """
+    logger = logging.getLogger(ANALYSIS_LOGGER)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(kind, extra={"fields": fields})
+
+# ═══════════════════════════════════════════════════════════════
+# TELEGRAM — file d'envoi non bloquante
+# ═══════════════════════════════════════════════════════════════
+
+TELEGRAM_MAX_LEN = 4096   # Limite Telegram par message
+
+
+class TelegramDispatcher:
+    """
+    Envoi des alertes Telegram hors du chemin de trading.
+    Un seul client Bot et une boucle asyncio persistante (thread dédié, ou boucle
+    fournie à start()), alimentés par une file bornée :
+      - submit() ne bloque jamais l'appelant ;
+      - retry avec backoff exponentiel en cas d'échec réseau ;
+      - file pleine → les deux plus anciens messages sont fusionnés si possible,
+        sinon le plus ancien message non prioritaire est abandonné ;
+      - stop() vide la file avant de rendre la main (arrêt du bot).
+    """
+
+    def __init__(self, token: str, chat_id: str, maxsize: int = 100,
+                 max_retries: int = 4, base_delay: float = 1.0):
+        self.token       = token
+        self.chat_id     = chat_id
+        self.maxsize     = maxsize
+        self.max_retries = max_retries
+        self.base_delay  = base_delay
+
+        self._pending  = deque()            # (message, force)
+        self._lock     = threading.Lock()
+        self._loop     = None
+        self._wakeup   = None               # asyncio.Event, créé dans la boucle
+        self._ready    = threading.Event()
+        self._done     = threading.Event()
+        self._thread   = None
+        self._closing  = False
+
+        self.sent      = 0
+        self.failed    = 0
+        self.dropped   = 0
+        self.coalesced = 0
+
+    # ── Cycle de vie ───────────────────────────────────────────
+
+    def start(self, loop: asyncio.AbstractEventLoop | None = None):
+        """Démarre le consommateur : sur `loop` si fournie, sinon dans un thread dédié."""
+        if self._loop is not None:
+            return
+        if loop is not None:
+            # Pas d'attente ici : start() peut être appelé depuis la boucle elle-même
+            self._loop = loop
+            loop.call_soon_threadsafe(lambda: loop.create_task(self._run()))
+            return
+
+        self._loop   = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete,
+                                        args=(self._run(),),
+                                        name="Telegram-Dispatcher", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Envoie les messages en attente puis arrête le consommateur."""
+        if self._loop is None:
+            return True
+        self._closing = True
+        self._notify()
+        flushed = self._done.wait(timeout)
+        if not flushed:
+            logging.warning(f"Telegram : {self.depth()} message(s) non envoyé(s) à l'arrêt")
+        if self._thread:
+            self._thread.join(timeout=1)
+        return flushed
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    # ── Producteurs (n'importe quel thread) ────────────────────
+
+    def submit(self, message: str, force: bool = True):
+        with self._lock:
+            if len(self._pending) >= self.maxsize:
+                self._make_room()
+            self._pending.append((message.strip(), force))
+        self._notify()
+
+    def _make_room(self):
+        """Appelé sous verrou, file pleine : fusion des deux plus anciens, sinon abandon."""
+        if len(self._pending) >= 2:
+            (m1, f1), (m2, f2) = self._pending[0], self._pending[1]
+            merged = f"{m1}\n\n{m2}"
+            if len(merged) <= TELEGRAM_MAX_LEN:
+                self._pending.popleft()
+                self._pending[0] = (merged, f1 or f2)
+                self.coalesced += 1
+                return
+        victim = next((i for i, (_, f) in enumerate(self._pending) if not f), 0)
+        del self._pending[victim]
+        self.dropped += 1
+        logging.warning("Telegram : file pleine, message abandonné")
+
+    def _notify(self):
+        if self._loop is not None and self._wakeup is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wakeup.set)
+            except RuntimeError:
+                pass   # Boucle déjà fermée
+
+    def _pop(self):
+        with self._lock:
+            return self._pending.popleft() if self._pending else None
+
+    # ── Consommateur (boucle asyncio) ──────────────────────────
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        self._ready.set()
+        bot = None
+        try:
+            bot = await self._connect()
+            if bot is None:
+                return
+            while True:
+                try:
+                    item = self._pop()
+                    if item is None:
+                        if self._closing:
+                            break
+                        await self._wakeup.wait()
+                        self._wakeup.clear()
+                        continue
+                    await self._send(bot, item[0])
+                except Exception as e:
+                    # Erreur isolée : le consommateur reste actif, seul _closing l'arrête
+                    logging.error(f"Telegram : erreur du dispatcher : {e}")
+                    await asyncio.sleep(self.base_delay)
+        finally:
+            if bot is not None:
+                try:
+                    await bot.shutdown()
+                except Exception:
+                    pass
+            self._done.set()
+
+    async def _connect(self):
+        """
+        Bot initialisé (get_me), avec le même backoff que les envois, retenté
+        tant que le dispatcher n'est pas arrêté. None si l'arrêt survient avant.
+        """
+        from telegram import Bot   # Import différé : python-telegram-bot ne ralentit pas le démarrage
+        attempt = 0
+        while True:
+            try:
+                bot = Bot(token=self.token)
+                await bot.initialize()
+                if attempt:
+                    logging.info(f"✅ Telegram : connecté après {attempt} tentative(s)")
+                return bot
+            except Exception as e:
+                if self._closing:
+                    logging.error(f"Telegram : arrêt sans connexion, {self.depth()} message(s) "
+                                  f"non envoyé(s) : {e}")
+                    return None
+                delay = min(self.base_delay * 2 ** attempt, 60.0)
+                logging.warning(f"Telegram : initialisation échouée ({e}), nouvel essai dans {delay:.0f}s")
+                attempt += 1
+                # Attente écourtée par stop() (dernière tentative), pas par submit()
+                deadline = time.monotonic() + delay
+                while not self._closing and time.monotonic() < deadline:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), deadline - time.monotonic())
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+
+    async def _send(self, bot, text: str):
+        for attempt in range(self.max_retries + 1):
+            try:
+                await bot.send_message(chat_id=self.chat_id, text=text, parse_mode="HTML")
+                self.sent += 1
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logging.error(f"Échec Telegram : {e}")
+                    return
+                # RetryAfter (flood control) fournit le délai imposé par Telegram
+                delay = getattr(e, "retry_after", None) or self.base_delay * 2 ** attempt
+                if hasattr(delay, "total_seconds"):
+                    delay = delay.total_seconds()
+                await asyncio.sleep(min(float(delay), 60.0))
+
+
+_dispatcher: TelegramDispatcher | None = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_telegram_dispatcher() -> TelegramDispatcher:
+    """Dispatcher global, démarré au premier usage."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+            _dispatcher.start()
+        return _dispatcher
+
+
+def start_telegram(loop: asyncio.AbstractEventLoop):
+    """Crée le dispatcher global sur la boucle de l'orchestrateur (tâche asyncio, pas de thread)."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TelegramDispatcher(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+            _dispatcher.start(loop)
+        return _dispatcher
+
+
+def telegram_queue_depth() -> int:
+    return _dispatcher.depth() if _dispatcher is not None else 0
+
+
+def shutdown_telegram(timeout: float = 10.0):
+    """Vide la file d'alertes (appelé à l'arrêt du bot)."""
+    with _dispatcher_lock:
+        dispatcher = _dispatcher
+    if dispatcher is not None:
+        dispatcher.stop(timeout)
+
+
 def send_telegram_alert(message: str, force=True):
-    """Envoie alerte Telegram seulement pour événements clés (launch, close bot, open/close position)"""
+    """
+    Envoie alerte Telegram seulement pour événements clés (launch, close bot, open/close position).
+    Non bloquant : le message est mis en file et envoyé par le dispatcher.
+    force=False → message abandonnable si la file déborde.
+    """
     if not TELEGRAM_TOKEN or not TELEGRAM_CHAT_ID:
         logging.warning("Config Telegram manquante")
         return
 
     try:
-        bot = Bot(token=TELEGRAM_TOKEN)
-        asyncio.run(bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message.strip(), parse_mode="HTML"))
+        get_telegram_dispatcher().submit(message, force=force)
     except Exception as e:
-        logging.error(f"Échec Telegram : {e}")
\ No newline at end of file
+        logging.error(f"Échec Telegram : {e}")